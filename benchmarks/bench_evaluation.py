@@ -0,0 +1,163 @@
+"""A/B benchmark of the evaluator: four per-criterion calls + uniqueness (five
+calls) against the single-call multi-criterion mode, on a fixed set of decks.
+Reports per-deck latency, LLM calls, Ollama token counts and score agreement."""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+
+# Setup import path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, "ragpptxx"))
+sys.path.append(os.path.join(project_root, "scripts"))
+
+import numpy as np
+import metrics
+from embeddings import VectorStore, open_store
+from evaluation import IdeaEvaluator
+from synthetic import StubEmbedder, generate_decks
+
+MODES = ("five_call", "combined")
+CRITERIA = ("problem_clarity", "solution_quality", "technical_feasibility", "team_capability", "uniqueness")
+
+def synthetic_store(workdir, n, seed=0):
+    """Ingests n synthetic decks (stub embeddings) into a throwaway store. Returns (store, ppt_ids)."""
+    from pipeline import process_document
+
+    store = VectorStore(persist_path=os.path.join(workdir, "chroma"))
+    embedder = StubEmbedder()
+    chunks = [c for i, path in enumerate(generate_decks(os.path.join(workdir, "decks"), n, seed))
+              for c in process_document(path, f"team{i}", 1, verbose=False)]
+    store.add_chunks(chunks, embedder.embed([c["text"] for c in chunks]))
+    return store, sorted({c["ppt_id"] for c in chunks})
+
+def _llm_totals():
+    """Sums of every llm[...] stage (all criteria) plus combined-mode fallbacks, from the metrics registry."""
+    totals = {"calls": 0, "prompt_eval_count": 0, "eval_count": 0, "failures": 0, "early_stops": 0, "fallbacks": 0}
+    for key, s in metrics.summary().items():
+        if key.startswith("llm"):
+            for name in totals:
+                totals[name] += s.get(name, 0) if name != "calls" else s["calls"] - s.get("cache_hits", 0)
+        elif key == "combined_fallback":
+            totals["fallbacks"] += s["items"]
+    return totals
+
+def run_mode(mode, ppt_ids, store, model, ollama_url, concurrency, num_ctx, stream):
+    # No response cache: every deck pays for its calls in both modes
+    evaluator = IdeaEvaluator(model=model, ollama_url=ollama_url, concurrency=concurrency, num_ctx=num_ctx,
+                              stream=stream, combined=mode == "combined", store=store)
+    before = _llm_totals()
+    results, latencies = {}, []
+    for ppt_id in ppt_ids:
+        start = time.perf_counter()
+        results[ppt_id] = evaluator.evaluate(ppt_id)
+        latencies.append(time.perf_counter() - start)
+    after = _llm_totals()
+
+    summary = {name: after[name] - before[name] for name in after}
+    summary.update({
+        "decks": len(ppt_ids),
+        "seconds": round(sum(latencies), 3),
+        "mean_deck_seconds": round(float(np.mean(latencies)), 3),
+        "p50_deck_seconds": round(float(np.percentile(latencies, 50)), 3),
+        "p95_deck_seconds": round(float(np.percentile(latencies, 95)), 3),
+        "calls_per_deck": round(summary["calls"] / len(ppt_ids), 2),
+        "prompt_tokens_per_deck": round(summary["prompt_eval_count"] / len(ppt_ids), 1),
+    })
+    return summary, results
+
+def _ranks(values):
+    order = np.argsort(values, kind="stable")
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(len(values))
+    return ranks
+
+def agreement(a, b):
+    """Per-criterion and total-score agreement between two {ppt_id: result} maps."""
+    ids = sorted(set(a) & set(b))
+    out = {}
+    for key in CRITERIA:
+        x = np.array([a[i]["scores"][key] for i in ids], dtype=float)
+        y = np.array([b[i]["scores"][key] for i in ids], dtype=float)
+        out[key] = {"mean_abs_diff": round(float(np.abs(x - y).mean()), 3),
+                    "exact": round(float((x == y).mean()), 3),
+                    "within_1": round(float((np.abs(x - y) <= 1).mean()), 3)}
+    x = np.array([a[i]["total_score"] for i in ids], dtype=float)
+    y = np.array([b[i]["total_score"] for i in ids], dtype=float)
+    spearman = np.corrcoef(_ranks(x), _ranks(y))[0, 1] if len(ids) > 1 and x.std() and y.std() else None
+    out["total_score"] = {"mean_abs_diff": round(float(np.abs(x - y).mean()), 3),
+                          "spearman": round(float(spearman), 4) if spearman is not None else None}
+    return out
+
+def run_benchmark(ppt_ids, store, model, ollama_url, concurrency=5, num_ctx=2048, stream=False):
+    """Both modes over the same decks. Non-streamed by default: an early-stopped stream
+    never receives Ollama's final line, which carries the token counts."""
+    report = {
+        "meta": {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "model": model, "ollama_url": ollama_url, "concurrency": concurrency, "num_ctx": num_ctx,
+                 "stream": stream, "ppt_ids": ppt_ids},
+        "modes": {},
+    }
+    results = {}
+    for mode in MODES:
+        print(f"Evaluating {len(ppt_ids)} decks ({mode})...")
+        report["modes"][mode], results[mode] = run_mode(mode, ppt_ids, store, model, ollama_url, concurrency,
+                                                             num_ctx, stream)
+    report["agreement"] = agreement(results["five_call"], results["combined"])
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Five-call vs single-call evaluation A/B benchmark")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--ppt-ids", nargs="+", help="Stored decks to evaluate")
+    source.add_argument("--week", type=int, help="The first --limit stored decks of this week (sorted ids)")
+    source.add_argument("--synthetic", type=int, help="N synthetic decks in a temporary store")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--model", default="tinyllama:latest", help="Ollama model to use")
+    parser.add_argument("--ollama-url", default="http://localhost:11434", help="Ollama base URL")
+    parser.add_argument("--stub", action="store_true", help="Run against an in-process stub Ollama")
+    parser.add_argument("--stub-delay", type=float, default=0.5, help="Stub seconds per call")
+    parser.add_argument("--concurrency", type=int, default=5, help="Max concurrent LLM calls per deck")
+    parser.add_argument("--num-ctx", type=int, default=2048)
+    parser.add_argument("--stream", action="store_true", help="Streamed calls (faster, but no token counts)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report")
+    args = parser.parse_args()
+
+    ollama_url = args.ollama_url
+    if args.stub:
+        from stub_ollama import serve_stub
+        ollama_url = f"http://127.0.0.1:{serve_stub(delay=args.stub_delay).server_port}"
+
+    workdir = tempfile.mkdtemp(prefix="eval_bench_") if args.synthetic else None
+    try:
+        if args.synthetic:
+            store, ppt_ids = synthetic_store(workdir, args.synthetic, args.seed)
+        else:
+            store = open_store()
+            if args.week is not None:
+                from evaluate_batch import select_week_ppt_ids
+                ppt_ids = select_week_ppt_ids(store, args.week)[:args.limit]
+            else:
+                ppt_ids = args.ppt_ids
+        report = run_benchmark(ppt_ids, store, args.model, ollama_url, args.concurrency, args.num_ctx,
+                               args.stream)
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'mode':<10} {'deck s':>8} {'p95 s':>8} {'calls':>6} {'prompt tok':>11} {'gen tok':>8} {'fallbacks':>9}")
+    for mode, m in report["modes"].items():
+        print(f"{mode:<10} {m['mean_deck_seconds']:>8.3f} {m['p95_deck_seconds']:>8.3f} {m['calls_per_deck']:>6.2f} "
+              f"{m['prompt_tokens_per_deck']:>11.1f} {m['eval_count'] / m['decks']:>8.1f} {m['fallbacks']:>9}")
+    print("Agreement (five_call vs combined):")
+    print(json.dumps(report["agreement"], indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import tempfile
+
+# Setup import path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, "ragpptxx"))
+
+import fitz
+import numpy as np
+from parser import extract_text
+from template_extractor import extract_sections
+from pipeline import process_document
+from embeddings import ChunkEmbedder, VectorStore
+from synthetic import StubEmbedder, generate_decks
+
+DEFAULT_SIZES = (100, 1000, 10000)
+EMBED_BATCH_SIZE = 1024   # same batching as scripts/ingestion.py
+UPSERT_BATCH_SIZE = 5000
+QUERY_SAMPLE = 200        # similarity queries timed per size
+
+def _timed(fn, items):
+    start = time.perf_counter()
+    out = fn()
+    seconds = time.perf_counter() - start
+    return out, {"seconds": round(seconds, 4), "items": items,
+                 "per_second": round(items / seconds, 2) if seconds else None}
+
+def _embed_all(embedder, texts):
+    parts = [embedder.embed(texts[i:i + EMBED_BATCH_SIZE]) for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    return np.vstack(parts).astype(np.float32, copy=False)
+
+def bench_size(n, deck_dir, store_dir, embedder, seed=0):
+    """Times every ingestion-side stage over n synthetic decks."""
+    decks = generate_decks(deck_dir, n, seed)
+    results = {}
+
+    pages, results["extract_text"] = _timed(lambda: [extract_text(p) for p in decks], n)
+    results["extract_text"]["pages"] = sum(len(p) for p in pages)
+    _, results["extract_sections"] = _timed(lambda: [extract_sections(p) for p in pages], n)
+    del pages
+
+    chunks, results["process_document"] = _timed(
+        lambda: [c for i, p in enumerate(decks) for c in process_document(p, f"team{i % 50}", 1 + i % 4, verbose=False)],
+        n
+    )
+    texts = [c["text"] for c in chunks]
+    embeddings, results["embed"] = _timed(lambda: _embed_all(embedder, texts), len(texts))
+
+    store = VectorStore(persist_path=store_dir, collection_name=f"bench_{n}")
+    batch = min(UPSERT_BATCH_SIZE, store.client.get_max_batch_size())
+    _, results["add_chunks"] = _timed(
+        lambda: [store.add_chunks(chunks[i:i + batch], embeddings[i:i + batch]) for i in range(0, len(chunks), batch)],
+        len(chunks)
+    )
+
+    # Same filtered search as compute_internal_similarity, for a fixed sample of decks
+    idea_rows = [i for i, c in enumerate(chunks) if c["section"] == "idea_problem"]
+    sample = random.Random(seed).sample(idea_rows, min(QUERY_SAMPLE, len(idea_rows)))
+    latencies = []
+    for i in sample:
+        start = time.perf_counter()
+        store.query_similar(embeddings[i].tolist(), n_results=10, where={
+            "$and": [{"section": {"$eq": "idea_problem"}}, {"ppt_id": {"$ne": chunks[i]["ppt_id"]}}]
+        })
+        latencies.append(time.perf_counter() - start)
+    total = sum(latencies)
+    results["query_similar"] = {
+        "seconds": round(total, 4), "items": len(sample),
+        "per_second": round(len(sample) / total, 2) if total else None,
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+    }
+    return results
+
+def run_benchmarks(sizes=DEFAULT_SIZES, embedder_name="stub", workdir=None, seed=0):
+    embedder = StubEmbedder() if embedder_name == "stub" else ChunkEmbedder()
+    keep = workdir is not None
+    workdir = workdir or tempfile.mkdtemp(prefix="ppt_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    store_dir = tempfile.mkdtemp(prefix="chroma_", dir=workdir)
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pymupdf": fitz.VersionBind,
+            "embedder": embedder.model_name,
+            "seed": seed,
+        },
+        "results": {},
+    }
+    try:
+        for n in sizes:
+            print(f"Benchmarking {n} decks...")
+            # decks are shared across sizes: the 10k run reuses the first 1k decks
+            report["results"][str(n)] = bench_size(n, os.path.join(workdir, f"decks_seed{seed}"), store_dir,
+                                                   embedder, seed)
+            for name, r in report["results"][str(n)].items():
+                print(f"  {name:<18} {r['seconds']:>10.3f}s  {r['per_second'] or 0:>12.1f} items/s")
+    finally:
+        if keep:
+            shutil.rmtree(store_dir, ignore_errors=True)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+def compare(report, baseline, tolerance=0.2):
+    """Prints throughput against a baseline. Returns the stages that slowed down by more than `tolerance`."""
+    regressions = []
+    for size, stages in report["results"].items():
+        for name, r in stages.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if not base or not base.get("per_second") or not r.get("per_second"):
+                continue
+            ratio = r["per_second"] / base["per_second"]
+            flag = "  REGRESSION" if ratio < 1 - tolerance else ""
+            print(f"{size:>6} {name:<18} {base['per_second']:>12.1f} -> {r['per_second']:>12.1f} items/s "
+                  f"({ratio:.2f}x){flag}")
+            if flag:
+                regressions.append(f"{size}/{name}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestion-side benchmarks on synthetic decks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--embedder", choices=["stub", "real"], default="stub",
+                        help="stub: deterministic offline vectors; real: ChunkEmbedder (SentenceTransformer)")
+    parser.add_argument("--workdir", help="Keep generated decks here for reuse (default: temporary)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report (e.g. a new baseline)")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed throughput drop before flagging")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.embedder, args.workdir, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"[ERROR] Throughput regressions: {', '.join(regressions)}")
+            sys.exit(1)
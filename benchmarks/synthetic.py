@@ -0,0 +1,89 @@
+import os
+import random
+import hashlib
+import numpy as np
+import fitz  # PyMuPDF
+
+# Header phrasings per section, all matched by ragpptxx/templates.py
+SECTION_HEADERS = {
+    "idea_problem": ["Problem Statement", "Our Idea:", "Your Idea", "Title: {topic}"],
+    "solution_approach": ["Our Solution", "Solution Approach", "How it works", "We propose"],
+    "uniqueness_claim": ["What makes us different", "Why should we select you", "Unlike existing apps"],
+    "tech_stack": ["Tech Stack", "Frontend / Backend", "AI & ML Stack", "Cloud / DevOps"],
+    "team_capability": ["Our Team", "Team Members", "We are a team of"],
+}
+
+# Layouts: one section per page, several sections per page, shuffled with filler, long appendix
+LAYOUTS = ("ordered", "combined", "shuffled", "appendix")
+
+_TOPICS = ["crop yield", "water quality", "campus safety", "food waste", "traffic flow", "elderly care",
+           "air pollution", "mental health", "energy usage", "supply chains", "disaster relief", "e-waste"]
+_WORDS = ("sensor data model users platform realtime dashboard mobile offline secure privacy cost "
+          "latency pipeline community volunteers schools hospitals farmers analytics alerts api "
+          "prototype pilot accuracy dataset survey feedback scale deploy").split()
+
+def _paragraph(rng, n_words):
+    return " ".join(rng.choice(_WORDS) for _ in range(n_words)).capitalize() + "."
+
+def _section_page(rng, section, topic):
+    header = rng.choice(SECTION_HEADERS[section]).format(topic=topic)
+    return f"{header}\n{topic.title()}: {_paragraph(rng, rng.randint(20, 60))}"
+
+def make_deck(path, seed, layout=None, extra_pages=None):
+    """Writes one synthetic deck; the same seed always yields the same deck."""
+    rng = random.Random(seed)
+    layout = layout or LAYOUTS[seed % len(LAYOUTS)]
+    topic = rng.choice(_TOPICS)
+    sections = [_section_page(rng, s, topic) for s in SECTION_HEADERS]
+    filler = [_paragraph(rng, rng.randint(30, 80))
+              for _ in range(extra_pages if extra_pages is not None else rng.randint(0, 6))]
+
+    if layout == "combined":
+        pages = ["\n\n".join(sections[:2]), "\n\n".join(sections[2:])] + filler
+    elif layout == "shuffled":
+        pages = sections + filler
+        rng.shuffle(pages)
+    elif layout == "appendix":
+        pages = sections + filler + [_paragraph(rng, 60) for _ in range(rng.randint(10, 30))]
+    else:
+        pages = sections + filler
+
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(54, 54, page.rect.width - 54, page.rect.height - 54), text, fontsize=11)
+    doc.save(path)
+    doc.close()
+    return path
+
+def generate_decks(directory, n, seed=0):
+    """Ensures `directory` holds decks bench_00000.pdf .. for n decks; existing files are reused."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(n):
+        path = os.path.join(directory, f"bench_{i:05d}.pdf")
+        if not os.path.exists(path):
+            make_deck(path, seed * 1_000_003 + i)
+        paths.append(path)
+    return paths
+
+class StubEmbedder:
+    """Offline, deterministic stand-in for ChunkEmbedder (same embed() contract).
+
+    Vectors are seeded from a hash of the text, so identical text always maps
+    to the same normalized vector and no model or network is needed.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.model_name = f"stub-{dim}"
+
+    def embed(self, texts):
+        if not texts:
+            return np.array([])
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+            out[i] = np.random.default_rng(seed).standard_normal(self.dim, dtype=np.float32)
+        out /= np.linalg.norm(out, axis=1, keepdims=True)
+        return out
@@ -1,5 +1,27 @@
-from .embedder import ChunkEmbedder
-from .chroma_store import VectorStore
-from .similarity import compute_internal_similarity
+import importlib
 
-__all__ = ["ChunkEmbedder", "VectorStore", "compute_internal_similarity"]
+# Heavy dependencies (sentence_transformers, chromadb) are only imported when
+# the corresponding class is first used; see PEP 562.
+_EXPORTS = {
+    "ChunkEmbedder": ".embedder",
+    "EmbeddingCache": ".cache",
+    "VectorStore": ".chroma_store",
+    "ShardedVectorStore": ".sharded_store",
+    "open_store": ".sharded_store",
+    "ExactIndex": ".exact_index",
+    "OnnxEncoder": ".onnx_backend",
+    "compute_internal_similarity": ".similarity",
+    "compute_internal_similarity_batch": ".similarity",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,77 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+def default_cache_path() -> str:
+    """<project_root>/embedding_cache.sqlite"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, "embedding_cache.sqlite")
+
+class EmbeddingCache:
+    """Persistent content-addressed embedding cache (SQLite).
+
+    Keys are sha256(model_name + text); entries are evicted least-recently-used
+    once the cache grows past `max_entries`.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 200_000):
+        self.path = path or default_cache_path()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list[str]) -> dict:
+        """Returns {key: vector} for the keys present in the cache."""
+        found = {}
+        with self._lock:
+            # SQLite caps bound parameters; stay well below the limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: dict):
+        """Stores {key: vector} and evicts the oldest entries past max_entries."""
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, vec in items.items():
+            vec = np.asarray(vec, dtype=np.float32)
+            rows.append((key, vec.shape[-1], vec.tobytes(), now))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,5 +1,5 @@
 import os
-import chromadb
+from ._metrics import stage
 
 class VectorStore:
     """Manages persistent ChromaDB storage for PPT chunks."""
@@ -9,9 +9,15 @@ class VectorStore:
             # Default to <project_root>/chroma_db
             root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             persist_path = os.path.join(root, "chroma_db")
-            
+
+        import chromadb  # deferred: importing chromadb is slow
+        self.persist_path = persist_path
         self.client = chromadb.PersistentClient(path=persist_path)
-        self.collection = self.client.get_or_create_collection(
+        self.collection = self._open_collection(collection_name)
+
+    def _open_collection(self, collection_name: str):
+        """The collection chunks are read from and written to."""
+        return self.client.get_or_create_collection(
             name=collection_name,
             metadata={"hnsw:space": "cosine"}
         )
@@ -30,12 +36,18 @@ class VectorStore:
             "page_range": str(c.get("page_range", ""))
         } for c in chunks]
         
-        self.collection.upsert(
-            ids=ids,
-            embeddings=embeddings,
-            documents=[c["text"] for c in chunks],
-            metadatas=metadatas
-        )
+        with stage("upsert", items=len(chunks)):
+            self.collection.upsert(
+                ids=ids,
+                embeddings=embeddings,
+                documents=[c["text"] for c in chunks],
+                metadatas=metadatas
+            )
+
+    def delete_ppt(self, ppt_id: str, week: int = None):
+        """Removes every chunk of a deck (optionally only one week's chunks)."""
+        where = {"ppt_id": ppt_id} if week is None else {"$and": [{"ppt_id": ppt_id}, {"week": week}]}
+        self.collection.delete(where=where)
 
     def query_similar(self, embedding: list, n_results: int = 10, where: dict = None):
         """Executes nearest-neighbor search."""
@@ -44,3 +56,11 @@ class VectorStore:
             n_results=n_results,
             where=where
         )
+
+    def query_similar_batch(self, embeddings: list, n_results: int = 10, where: dict = None):
+        """Nearest-neighbor search for many embeddings in one request."""
+        return self.collection.query(
+            query_embeddings=embeddings,
+            n_results=n_results,
+            where=where
+        )
@@ -0,0 +1,128 @@
+import numpy as np
+from .chroma_store import VectorStore
+from .similarity import HIGH_SIMILARITY, MODERATE_SIMILARITY, similarity_penalty
+
+def load_section_embeddings(store: VectorStore, week: int = None, section: str = "idea_problem",
+                            page_size: int = 5000):
+    """Loads every stored `section` vector (optionally one week). Returns (metadatas, (N, d) float32 matrix)."""
+    where = {"section": section} if week is None else {"$and": [{"section": section}, {"week": week}]}
+    metadatas, vectors = [], []
+    offset = 0
+    while True:
+        page = store.collection.get(where=where, include=["embeddings", "metadatas"],
+                                    limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        metadatas.extend(page["metadatas"])
+        vectors.append(np.asarray(page["embeddings"], dtype=np.float32))
+        offset += len(page["ids"])
+
+    if not vectors:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    return metadatas, np.vstack(vectors)
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+    def groups(self):
+        out = {}
+        for i in range(len(self.parent)):
+            out.setdefault(self.find(i), []).append(i)
+        return [g for g in out.values() if len(g) > 1]
+
+def all_pairs_similarity(matrix: np.ndarray, ppt_ids: list[str], k: int = 5, memory_limit_mb: float = 256) -> dict:
+    """Blocked all-pairs cosine similarity over normalized vectors.
+
+    Rows sharing a ppt_id never match each other (same rule as
+    compute_internal_similarity). Each block of rows is multiplied against the
+    full matrix, sized so the (block, N) score and mask buffers stay under
+    `memory_limit_mb`.
+
+    Returns {"neighbors": per-row [(row, sim)] top-k, "max_similarity": (N,),
+    "duplicate_clusters": [[rows]] at HIGH_SIMILARITY,
+    "similar_clusters": [[rows]] at MODERATE_SIMILARITY}.
+    """
+    n = len(ppt_ids)
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    _, codes = np.unique(np.asarray(ppt_ids), return_inverse=True)
+
+    # Per (row, column) pair: float32 scores, negated copy and int64 indices for
+    # argpartition, bool masks -> budget ~24 bytes
+    block = max(1, min(n, int(memory_limit_mb * 1024 * 1024 // (24 * max(n, 1)))))
+    k = min(k, max(n - 1, 0))
+
+    neighbors = [[] for _ in range(n)]
+    max_sim = np.zeros(n, dtype=np.float32)
+    duplicates, similar = _UnionFind(n), _UnionFind(n)
+
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        sims = matrix[start:stop] @ matrix.T
+        np.clip(sims, 0.0, 1.0, out=sims)
+        sims[codes[start:stop, None] == codes[None, :]] = -1.0
+
+        max_sim[start:stop] = np.maximum(sims.max(axis=1), 0.0)
+
+        if k > 0:
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            top_sims = np.take_along_axis(sims, top, axis=1)
+            order = np.argsort(-top_sims, axis=1)
+            top, top_sims = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_sims, order, axis=1)
+            for r in range(stop - start):
+                neighbors[start + r] = [(int(j), float(s)) for j, s in zip(top[r], top_sims[r]) if s >= 0.0]
+
+        # Cluster edges (upper triangle only; each pair is seen from both rows)
+        rows, cols = np.nonzero(sims >= MODERATE_SIMILARITY)
+        for r, c, s in zip(rows + start, cols, sims[rows, cols]):
+            if c > r:
+                similar.union(int(r), int(c))
+                if s >= HIGH_SIMILARITY:
+                    duplicates.union(int(r), int(c))
+
+    return {
+        "neighbors": neighbors,
+        "max_similarity": max_sim,
+        "duplicate_clusters": duplicates.groups(),
+        "similar_clusters": similar.groups(),
+    }
+
+def week_duplicate_report(store: VectorStore, week: int = None, k: int = 5, memory_limit_mb: float = 256) -> dict:
+    """Near-duplicate sweep over a week's (or all weeks') idea_problem chunks."""
+    metadatas, matrix = load_section_embeddings(store, week=week)
+    if not metadatas:
+        return {"week": week, "decks": [], "duplicate_clusters": [], "similar_clusters": []}
+
+    ppt_ids = [m["ppt_id"] for m in metadatas]
+    result = all_pairs_similarity(matrix, ppt_ids, k=k, memory_limit_mb=memory_limit_mb)
+
+    def label(i):
+        return {"ppt_id": ppt_ids[i], "week": metadatas[i].get("week")}
+
+    decks = []
+    for i in range(len(ppt_ids)):
+        max_sim = float(result["max_similarity"][i])
+        decks.append({
+            **label(i),
+            "max_similarity": max_sim,
+            "penalty": similarity_penalty(max_sim),
+            "neighbors": [{**label(j), "similarity": s} for j, s in result["neighbors"][i]],
+        })
+
+    return {
+        "week": week,
+        "decks": decks,
+        "duplicate_clusters": [[label(i) for i in g] for g in result["duplicate_clusters"]],
+        "similar_clusters": [[label(i) for i in g] for g in result["similar_clusters"]],
+    }
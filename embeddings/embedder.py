@@ -1,15 +1,106 @@
+import os
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from ._metrics import stage
+from .cache import EmbeddingCache
+
+BACKENDS = ("torch", "onnx")
+
+def _env_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+def add_embedder_arguments(parser):
+    """The embedding flags shared by every entry point that embeds text."""
+    parser.add_argument("--embed-backend", choices=BACKENDS, help="Embedding runtime (default: torch)")
+    parser.add_argument("--onnx-path", help="ONNX model folder or .onnx file (default: models/all-MiniLM-L6-v2)")
+    parser.add_argument("--onnx-file", help="Model file inside --onnx-path, e.g. onnx/model_qint8_avx2.onnx")
+    parser.add_argument("--embed-threads", type=int, help="Intra-op threads for the embedding model")
+
+def embedder_options(args) -> dict:
+    """ChunkEmbedder keyword arguments from those flags; unset ones fall back to the environment."""
+    return {"backend": args.embed_backend, "onnx_path": args.onnx_path, "onnx_file": args.onnx_file,
+            "threads": args.embed_threads}
 
 class ChunkEmbedder:
-    """Wraps SentenceTransformer for deterministic, normalized embeddings."""
-    
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    """Wraps SentenceTransformer (or an ONNX export of it) for deterministic, normalized embeddings.
+
+    backend/onnx_path/onnx_file/batch_size/threads default to PPT_EMBED_BACKEND, PPT_ONNX_PATH,
+    PPT_ONNX_FILE, PPT_EMBED_BATCH and PPT_EMBED_THREADS (read only; entry points pass their
+    flags explicitly).
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", cache: EmbeddingCache = None,
+                 backend: str = None, onnx_path: str = None, onnx_file: str = None,
+                 batch_size: int = None, threads: int = None):
+        self.model_name = model_name
+        self.cache = cache
+        self.backend = backend or os.environ.get("PPT_EMBED_BACKEND", "torch")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend {self.backend!r}; expected one of {BACKENDS}")
+        self.onnx_path = onnx_path or os.environ.get("PPT_ONNX_PATH")
+        self.onnx_file = onnx_file or os.environ.get("PPT_ONNX_FILE")
+        self.batch_size = batch_size or _env_int("PPT_EMBED_BATCH") or (64 if self.backend == "onnx" else 32)
+        self.threads = threads or _env_int("PPT_EMBED_THREADS")
+        self._model = None
+        self._onnx_file = None
+
+    @property
+    def cache_namespace(self) -> str:
+        """Cache key prefix; ONNX (especially int8) vectors differ slightly, so they never mix with torch ones."""
+        if self.backend == "torch":
+            return self.model_name
+        if self._onnx_file is None:
+            from .onnx_backend import default_onnx_dir, resolve_onnx_files
+            try:
+                # the file OnnxEncoder will load, e.g. model_quantized.onnx when it is the only one present
+                model_path, _ = resolve_onnx_files(self.onnx_path or default_onnx_dir(self.model_name), self.onnx_file)
+            except FileNotFoundError:
+                model_path = self.onnx_file or self.onnx_path or "model.onnx"  # loading fails anyway
+            self._onnx_file = os.path.basename(model_path)
+        return f"{self.model_name}@onnx:{self._onnx_file}"
+
+    @property
+    def model(self):
+        """Loads the encoder on first use (fully cached batches never need it)."""
+        if self._model is None:
+            if self.backend == "onnx":
+                from .onnx_backend import OnnxEncoder, default_onnx_dir
+                self._model = OnnxEncoder(self.onnx_path or default_onnx_dir(self.model_name), self.onnx_file,
+                                          batch_size=self.batch_size, threads=self.threads)
+            else:
+                from sentence_transformers import SentenceTransformer  # deferred: pulls in torch
+                if self.threads:
+                    import torch
+                    torch.set_num_threads(self.threads)
+                self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def _encode(self, texts):
+        # normalize_embeddings=True ensures cosine similarity via dot product
+        return self.model.encode(texts, normalize_embeddings=True, batch_size=self.batch_size)
 
     def embed(self, texts: list[str]) -> np.ndarray:
         """Generates normalized embeddings. Returns empty array if input is empty."""
         if not texts:
             return np.array([])
-        # normalize_embeddings=True ensures cosine similarity via dot product
-        return self.model.encode(texts, normalize_embeddings=True)
+        with stage("embed", items=len(texts), batch_size=self.batch_size, backend=self.backend) as m:
+            if self.cache is None:
+                m["encoded"] = len(texts)
+                return self._encode(texts)
+
+            # Cache lookup; only unique misses go through the model, in one batch
+            keys = [EmbeddingCache.key(self.cache_namespace, t) for t in texts]
+            vectors = self.cache.get_many(list(dict.fromkeys(keys)))
+
+            misses = {}
+            for key, text in zip(keys, texts):
+                if key not in vectors:
+                    misses.setdefault(key, text)
+            m["encoded"] = len(misses)
+            if misses:
+                encoded = self._encode(list(misses.values()))
+                fresh = dict(zip(misses, encoded))
+                self.cache.put_many(fresh)
+                vectors.update(fresh)
+
+            return np.vstack([vectors[k] for k in keys]).astype(np.float32, copy=False)
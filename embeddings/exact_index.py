@@ -0,0 +1,377 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, repairs only happen on open
+    fcntl = None
+
+def default_index_path() -> str:
+    """<project_root>/exact_index"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, "exact_index")
+
+# Storage formats: bytes per dimension 4 / 2 / 1 (int8 adds one float32 scale per row)
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# Quantized indexes score this many candidates (at least), then rescore them in float32
+RESCORE_FACTOR = 4
+RESCORE_MIN = 50
+
+# Rows converted to float32 at a time when scoring a quantized matrix
+SCORE_BLOCK_ROWS = 16384
+
+class ExactIndex:
+    """Exact nearest-neighbor index for one section (default 'idea_problem').
+
+    Vectors live in a memory-mapped matrix (`vectors.f32`, or `vectors.f16` /
+    `vectors.i8` + per-row `scales.f32` for quantized indexes), metadata in an
+    append-only JSON-lines sidecar (`meta.jsonl`, later lines for the same row
+    win). Queries are a dot product plus argpartition, with the query deck's own
+    rows excluded by index instead of a metadata filter.
+
+    Quantized indexes over-fetch candidates and, when given the VectorStore,
+    rescore them against the float32 vectors kept in Chroma, so the returned
+    similarities are exact whenever the true neighbors are among the candidates.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    VECTOR_FILES = {"float32": "vectors.f32", "float16": "vectors.f16", "int8": "vectors.i8"}
+    SCALES_FILE = "scales.f32"
+    META_FILE = "meta.jsonl"
+    INFO_FILE = "index.json"
+    LOCK_FILE = ".lock"
+
+    def __init__(self, path: str = None, section: str = "idea_problem", dtype: str = None):
+        self.path = path or default_index_path()
+        self.section = section
+        self._lock = threading.RLock()
+        os.makedirs(self.path, exist_ok=True)
+        self._requested_dtype = dtype
+        with self._file_lock():
+            self._load(repair=True)
+
+    @classmethod
+    def exists(cls, path: str = None) -> bool:
+        return os.path.exists(os.path.join(path or default_index_path(), cls.INFO_FILE))
+
+    @classmethod
+    def open_if_exists(cls, path: str = None):
+        return cls(path) if cls.exists(path) else None
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive across processes, so a repair never cuts off another writer's in-flight append."""
+        if fcntl is None:
+            yield
+            return
+        with open(self._file(self.LOCK_FILE), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self, repair=None):
+        """Reads the sidecar and maps the vectors. With `repair` (default: when a file lock is
+        held), leftovers of an interrupted add() are cut off: a torn meta.jsonl tail and
+        vector/scale rows without metadata, which later appends would otherwise land behind."""
+        repair = fcntl is not None if repair is None else repair
+        info_path = self._file(self.INFO_FILE)
+        self.dim = None
+        self.dtype = self._requested_dtype or "float32"
+        if os.path.exists(info_path):
+            with open(info_path, encoding="utf-8") as f:
+                info = json.load(f)
+            self.dim = info["dim"]
+            self.dtype = info.get("dtype", "float32")
+            if self._requested_dtype and self._requested_dtype != self.dtype:
+                raise ValueError(f"Index at {self.path} stores {self.dtype}; rebuild it to use {self._requested_dtype}")
+        if self.dtype not in DTYPES:
+            raise ValueError(f"Unsupported index dtype {self.dtype!r} (use one of {', '.join(DTYPES)})")
+        self._np_dtype = DTYPES[self.dtype]
+        self._vectors_file = self._file(self.VECTOR_FILES[self.dtype])
+
+        self.ids, self.metadatas = [], []
+        self._row_of = {}
+        meta_path = self._file(self.META_FILE)
+        complete = 0  # bytes of meta.jsonl up to the last complete line
+        if os.path.exists(meta_path):
+            with open(meta_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # torn last line from an interrupted append
+                    complete += len(line)
+                    row = entry.pop("row")
+                    if row == len(self.ids):
+                        self.ids.append(entry["id"])
+                        self.metadatas.append(entry["metadata"])
+                    elif row < len(self.ids):
+                        self.metadatas[row] = entry["metadata"]
+                    self._row_of[entry["id"]] = row
+
+        self._meta_size = complete
+        if repair and os.path.exists(meta_path) and os.path.getsize(meta_path) > complete:
+            os.truncate(meta_path, complete)
+
+        # Rows without metadata (crash between the two appends) are ignored, and cut off on repair
+        n = len(self.ids)
+        if repair and self.dim is not None and self._complete(n):
+            self._truncate(self._vectors_file, n * self.dim * np.dtype(self._np_dtype).itemsize)
+            if self.dtype == "int8":
+                self._truncate(self._file(self.SCALES_FILE), n * 4)
+        if self.dim is not None and n and self._complete(n):
+            self._map(n)
+        else:
+            self.vectors = np.zeros((0, self.dim or 0), dtype=self._np_dtype)
+            self.scales = np.zeros(0, dtype=np.float32) if self.dtype == "int8" else None
+            self.ids, self.metadatas, self._row_of = [], [], {}
+        self._index_ppt_rows()
+
+    @staticmethod
+    def _truncate(path, size):
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+
+    def _complete(self, n):
+        itemsize = np.dtype(self._np_dtype).itemsize
+        if not os.path.exists(self._vectors_file) or os.path.getsize(self._vectors_file) < n * self.dim * itemsize:
+            return False
+        if self.dtype == "int8":
+            scales = self._file(self.SCALES_FILE)
+            return os.path.exists(scales) and os.path.getsize(scales) >= n * 4
+        return True
+
+    def _map(self, n):
+        self.vectors = np.memmap(self._vectors_file, dtype=self._np_dtype, mode="r+", shape=(n, self.dim))
+        self.scales = (np.memmap(self._file(self.SCALES_FILE), dtype=np.float32, mode="r+", shape=(n,))
+                       if self.dtype == "int8" else None)
+
+    def _quantize(self, embeddings):
+        """float32 rows -> (stored rows, per-row scales or None)."""
+        if self.dtype == "int8":
+            # symmetric per-row scaling: v ~= q * scale, q in [-127, 127]
+            scales = np.abs(embeddings).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            return np.rint(embeddings / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return embeddings.astype(self._np_dtype, copy=False), None
+
+    def nbytes(self) -> int:
+        """On-disk size of the vector data (vectors + scales)."""
+        return sum(os.path.getsize(f) for f in (self._vectors_file, self._file(self.SCALES_FILE)) if os.path.exists(f))
+
+    def _scores(self, queries):
+        """(m, d) float32 queries -> (m, n) approximate (or, for float32, exact) similarities."""
+        if self.dtype == "float32":
+            return queries @ self.vectors.T
+        n = len(self.ids)
+        out = np.empty((len(queries), n), dtype=np.float32)
+        for start in range(0, n, SCORE_BLOCK_ROWS):
+            stop = min(start + SCORE_BLOCK_ROWS, n)
+            out[:, start:stop] = queries @ np.asarray(self.vectors[start:stop], dtype=np.float32).T
+        if self.scales is not None:
+            out *= np.asarray(self.scales)[None, :]
+        return out
+
+    def _fetch_k(self, k, store):
+        if self.dtype == "float32" or store is None:
+            return k
+        return max(k * RESCORE_FACTOR, RESCORE_MIN)
+
+    def _rescore(self, store, queries, tops, top_scores, k):
+        """Recomputes candidate scores from Chroma's float32 vectors; keeps the best k per query."""
+        wanted = sorted({self.ids[r] for rows in tops for r in rows})
+        exact = {}
+        for i in range(0, len(wanted), 5000):
+            got = store.collection.get(ids=wanted[i:i + 5000], include=["embeddings"])
+            exact.update(zip(got["ids"], np.asarray(got["embeddings"], dtype=np.float32)))
+
+        out_rows, out_scores = [], []
+        for q, rows, approx in zip(queries, tops, top_scores):
+            sims = np.array([float(exact[self.ids[r]] @ q) if self.ids[r] in exact else s
+                             for r, s in zip(rows, approx)], dtype=np.float32)
+            order = np.argsort(-sims)[:k]
+            out_rows.append(np.asarray(rows)[order])
+            out_scores.append(sims[order])
+        return out_rows, out_scores
+
+    def _index_ppt_rows(self):
+        self._rows_by_ppt = {}
+        for row, meta in enumerate(self.metadatas):
+            self._rows_by_ppt.setdefault(meta.get("ppt_id"), []).append(row)
+        self._week_of = np.array([meta.get("week", 0) for meta in self.metadatas], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ids: list[str], embeddings, metadatas: list[dict]):
+        """Upserts vectors: known ids are overwritten in place, new ids appended."""
+        if not ids:
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        with self._lock, self._file_lock():
+            if self._stale():
+                self._load()  # another process appended (or left a torn tail) since we loaded
+            if self.dim is None:
+                self.dim = embeddings.shape[1]
+                with open(self._file(self.INFO_FILE), "w", encoding="utf-8") as f:
+                    json.dump({"dim": self.dim, "section": self.section, "dtype": self.dtype}, f)
+            if embeddings.shape[1] != self.dim:
+                raise ValueError(f"Embedding dim {embeddings.shape[1]} != index dim {self.dim}")
+
+            stored, scales = self._quantize(embeddings)
+            meta_lines, new_rows = [], []
+            for i, (cid, meta) in enumerate(zip(ids, metadatas)):
+                row = self._row_of.get(cid)
+                if row is None:
+                    row = len(self.ids)
+                    self._row_of[cid] = row
+                    self.ids.append(cid)
+                    self.metadatas.append(meta)
+                    new_rows.append(i)
+                else:
+                    self.vectors[row] = stored[i]
+                    if scales is not None:
+                        self.scales[row] = scales[i]
+                    self.metadatas[row] = meta
+                meta_lines.append(json.dumps({"row": row, "id": cid, "metadata": meta}))
+
+            for mapped in (self.vectors, self.scales):
+                if isinstance(mapped, np.memmap):
+                    mapped.flush()
+            # Vectors (and scales) first: rows without metadata are dropped on load
+            if new_rows:
+                with open(self._vectors_file, "ab") as f:
+                    f.write(stored[new_rows].tobytes())
+                if scales is not None:
+                    with open(self._file(self.SCALES_FILE), "ab") as f:
+                        f.write(scales[new_rows].tobytes())
+            with open(self._file(self.META_FILE), "a", encoding="utf-8") as f:
+                f.write("\n".join(meta_lines) + "\n")
+
+            self._meta_size = os.path.getsize(self._file(self.META_FILE))
+            self._map(len(self.ids))
+            self._index_ppt_rows()
+
+    def _stale(self) -> bool:
+        meta_path = self._file(self.META_FILE)
+        return (os.path.getsize(meta_path) if os.path.exists(meta_path) else 0) != self._meta_size
+
+    def refresh(self):
+        """Picks up rows appended by another process (e.g. a concurrent ingestion)."""
+        if self._stale():
+            with self._lock, self._file_lock():
+                self._load()
+
+    def add_chunks(self, chunks: list[dict], embeddings):
+        """Indexes the chunks of this index's section, using VectorStore ids/metadata."""
+        picked = [(c, e) for c, e in zip(chunks, embeddings) if c["section"] == self.section]
+        if not picked:
+            return
+        self.add(
+            [f"{c['ppt_id']}_{c['section']}_{c.get('week', 0)}" for c, _ in picked],
+            [e for _, e in picked],
+            [{"ppt_id": c["ppt_id"], "team_name": c.get("team_name", ""), "section": c["section"],
+              "week": c.get("week", 0), "page_range": str(c.get("page_range", ""))} for c, _ in picked],
+        )
+
+    def query(self, embedding, k: int = 10, exclude_ppt_id: str = None, store=None, weeks=None):
+        """Top-k rows by cosine similarity. Returns (rows, similarities), best first.
+
+        `store` (the VectorStore) enables float32 rescoring for quantized indexes;
+        `weeks` restricts the search to rows of those weeks.
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            n = len(self.ids)
+            if n == 0:
+                return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+            scores = self._scores(query[None, :])[0]
+            excluded = self._rows_by_ppt.get(exclude_ppt_id, []) if exclude_ppt_id is not None else []
+            if weeks is not None:
+                scores[~np.isin(self._week_of, list(weeks))] = -np.inf
+
+        if excluded:
+            scores[excluded] = -np.inf
+        fetch = min(self._fetch_k(k, store), int(np.isfinite(scores).sum()))
+        if fetch <= 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        top = np.argpartition(-scores, fetch - 1)[:fetch] if fetch < n else np.arange(n)
+        top = top[np.argsort(-scores[top])]
+        if fetch > k:
+            rows, sims = self._rescore(store, [query], [top], [scores[top]], k)
+            return rows[0], sims[0]
+        return top, scores[top]
+
+    def query_similar(self, embedding, n_results: int = 10, exclude_ppt_id: str = None, store=None,
+                      weeks=None) -> dict:
+        """Same result shape as VectorStore.query_similar (cosine distance = 1 - similarity)."""
+        rows, sims = self.query(embedding, k=n_results, exclude_ppt_id=exclude_ppt_id, store=store, weeks=weeks)
+        return {
+            "ids": [[self.ids[r] for r in rows]],
+            "distances": [[float(1.0 - s) for s in sims]],
+            "metadatas": [[self.metadatas[r] for r in rows]],
+        }
+
+    def query_similar_batch(self, embeddings, n_results: int = 10, exclude_ppt_ids: list[str] = None,
+                            store=None, weeks=None) -> dict:
+        """Vectorized query_similar for an (N, d) matrix; one result list per row."""
+        queries = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim or 0)
+        empty = {"ids": [[] for _ in queries], "distances": [[] for _ in queries], "metadatas": [[] for _ in queries]}
+        with self._lock:
+            n = len(self.ids)
+            if n == 0 or len(queries) == 0:
+                return empty
+            scores = self._scores(queries)
+            ids, metadatas = self.ids, self.metadatas
+            if weeks is not None:
+                scores[:, ~np.isin(self._week_of, list(weeks))] = -np.inf
+            for q, ppt_id in enumerate(exclude_ppt_ids or []):
+                if ppt_id is not None:
+                    scores[q, self._rows_by_ppt.get(ppt_id, [])] = -np.inf
+
+        k = min(self._fetch_k(n_results, store), n)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < n else np.tile(np.arange(n), (len(queries), 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+        if k > n_results:
+            keep = [np.isfinite(s) for s in top_scores]
+            top, top_scores = self._rescore(store, queries, [t[m] for t, m in zip(top, keep)],
+                                            [s[m] for s, m in zip(top_scores, keep)], n_results)
+
+        out = {"ids": [], "distances": [], "metadatas": []}
+        for rows, sims in zip(top, top_scores):
+            keep = np.isfinite(sims)
+            rows, sims = rows[keep], sims[keep]
+            out["ids"].append([ids[r] for r in rows])
+            out["distances"].append([float(1.0 - s) for s in sims])
+            out["metadatas"].append([metadatas[r] for r in rows])
+        return out
+
+    @classmethod
+    def rebuild(cls, store, path: str = None, section: str = "idea_problem", dtype: str = "float32"):
+        """Recreates the index (in `dtype`) from every `section` chunk stored in Chroma."""
+        from .dedup import load_section_embeddings
+
+        path = path or default_index_path()
+        for name in (*cls.VECTOR_FILES.values(), cls.SCALES_FILE, cls.META_FILE, cls.INFO_FILE):
+            if os.path.exists(os.path.join(path, name)):
+                os.remove(os.path.join(path, name))
+
+        index = cls(path, section=section, dtype=dtype)
+        metadatas, matrix = load_section_embeddings(store, section=section)
+        if metadatas:
+            ids = [f"{m['ppt_id']}_{m['section']}_{m.get('week', 0)}" for m in metadatas]
+            index.add(ids, matrix, metadatas)
+        return index
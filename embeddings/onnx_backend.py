@@ -0,0 +1,97 @@
+import os
+import numpy as np
+
+# Same limit as sentence-transformers' all-MiniLM-L6-v2 (max_seq_length)
+MAX_LENGTH = 256
+
+# File names tried (in order) inside a model directory; the sentence-transformers
+# Hub repos ship onnx/model.onnx plus int8 variants such as onnx/model_qint8_avx2.onnx
+ONNX_CANDIDATES = ("model.onnx", "onnx/model.onnx", "model_quantized.onnx", "onnx/model_quantized.onnx")
+
+def default_onnx_dir(model_name: str = "all-MiniLM-L6-v2") -> str:
+    """<project_root>/models/<model_name>"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, "models", model_name)
+
+def resolve_onnx_files(path: str, onnx_file: str = None) -> tuple[str, str]:
+    """(model .onnx path, tokenizer.json path) for a model directory or a direct .onnx path."""
+    if path.endswith(".onnx"):
+        model_path = path
+    elif onnx_file:
+        model_path = os.path.join(path, onnx_file)
+    else:
+        model_path = next((os.path.join(path, c) for c in ONNX_CANDIDATES if os.path.exists(os.path.join(path, c))),
+                          os.path.join(path, ONNX_CANDIDATES[0]))
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"ONNX model not found: {model_path}")
+
+    # tokenizer.json sits next to the model or one level up (Hub layout: onnx/ subfolder)
+    here = os.path.dirname(model_path)
+    for folder in (here, os.path.dirname(here)):
+        if os.path.exists(os.path.join(folder, "tokenizer.json")):
+            return model_path, os.path.join(folder, "tokenizer.json")
+    raise FileNotFoundError(f"tokenizer.json not found next to {model_path}")
+
+class OnnxEncoder:
+    """CPU sentence encoder on onnxruntime with the SentenceTransformer.encode() contract.
+
+    Mean pooling over the attention mask, optional L2 normalization. Texts are
+    sorted by token length and batched in that order (length bucketing), so each
+    batch is padded only to its own longest text; results come back in input order.
+    """
+
+    def __init__(self, path: str, onnx_file: str = None, batch_size: int = 64, threads: int = None,
+                 max_length: int = MAX_LENGTH):
+        import onnxruntime as ort  # deferred: only needed for this backend
+        from tokenizers import Tokenizer
+
+        self.model_path, tokenizer_path = resolve_onnx_files(path, onnx_file)
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.no_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(self.model_path, sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def _run(self, encodings):
+        length = max(len(e.ids) for e in encodings)
+        ids = np.zeros((len(encodings), length), dtype=np.int64)
+        mask = np.zeros((len(encodings), length), dtype=np.int64)
+        for row, e in enumerate(encodings):
+            ids[row, :len(e.ids)] = e.ids
+            mask[row, :len(e.ids)] = 1
+
+        feed = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feed["token_type_ids"] = np.zeros_like(ids)
+        hidden = self.session.run(None, feed)[0]  # (batch, tokens, dim) last_hidden_state
+
+        weights = mask[:, :, None].astype(np.float32)
+        return (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+
+    def encode(self, texts, normalize_embeddings=True, batch_size=None, **kwargs):
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        batch_size = batch_size or self.batch_size
+        encodings = self.tokenizer.encode_batch(list(texts))
+        order = np.argsort([len(e.ids) for e in encodings], kind="stable")
+
+        out = None
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            pooled = self._run([encodings[i] for i in rows])
+            if out is None:
+                out = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            out[rows] = pooled
+
+        if normalize_embeddings:
+            out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out
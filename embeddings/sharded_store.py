@@ -0,0 +1,266 @@
+import os
+import re
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from ._metrics import stage
+from .chroma_store import VectorStore
+
+COPY_PAGE = 5000
+COMPACT_SUFFIX = "-compact"
+
+def default_archive_path() -> str:
+    """<project_root>/chroma_archive"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, "chroma_archive")
+
+def _allowed(where, key):
+    """Values of `key` a Chroma where-filter can match (None = unconstrained). Only top-level
+    and $and clauses with a plain value, $eq or $in narrow the set; anything else is ignored."""
+    if not where:
+        return None
+    clauses = where["$and"] if "$and" in where else [where]
+    allowed = None
+    for clause in clauses:
+        if "$and" in clause:
+            values = _allowed(clause, key)
+        elif key in clause:
+            cond = clause[key]
+            if not isinstance(cond, dict):
+                values = {cond}
+            elif "$eq" in cond:
+                values = {cond["$eq"]}
+            elif "$in" in cond:
+                values = set(cond["$in"])
+            else:
+                values = None
+        else:
+            values = None
+        if values is not None:
+            allowed = values if allowed is None else allowed & values
+    return allowed
+
+class ShardedCollection:
+    """Fan-out facade with the parts of the Chroma Collection API this repo uses
+    (get / query / upsert / delete / count) over one collection per (week, section).
+
+    Filters on `week` and `section` pick the shards; the full filter is still
+    applied inside each shard. Chunk ids ({ppt_id}_{section}_{week}) route
+    get/delete by id straight to their shard.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def _route_ids(self, ids):
+        shards, by_shard = self.store.shards(refresh=True), {}
+        for cid in ids:
+            head, _, week = cid.rpartition("_")
+            shard = next((s for (w, section), s in shards.items()
+                          if str(w) == week and head.endswith(f"_{section}")), None)
+            if shard is not None:
+                by_shard.setdefault(shard.name, (shard, []))[1].append(cid)
+        return list(by_shard.values())
+
+    @staticmethod
+    def _merge(results, include):
+        out = {"ids": [], **{key: [] for key in include}}
+        for res in results:
+            out["ids"].extend(res["ids"])
+            for key in include:
+                out[key].extend(res[key])
+        return out
+
+    def get(self, ids=None, where=None, include=("metadatas", "documents"), limit=None, offset=None):
+        include = list(include)
+        if ids is not None:
+            return self._merge([shard.get(ids=shard_ids, where=where, include=include)
+                                for shard, shard_ids in self._route_ids(ids)], include)
+
+        # Shards are read in a fixed order, so limit/offset page through the union
+        results, skip = [], offset or 0
+        for shard in self.store.select(where):
+            if limit is not None and limit <= 0:
+                break
+            if skip:
+                matched = len(shard.get(where=where, include=[])["ids"]) if where else shard.count()
+                if skip >= matched:
+                    skip -= matched
+                    continue
+            res = shard.get(where=where, include=include, limit=limit, offset=skip or None)
+            skip = 0
+            if limit is not None:
+                limit -= len(res["ids"])
+            results.append(res)
+        return self._merge(results, include)
+
+    def query(self, query_embeddings, n_results=10, where=None,
+              include=("metadatas", "documents", "distances")):
+        """Queries the selected shards in parallel and merges each query's top n_results by distance."""
+        include = list(include)
+        if "distances" not in include:
+            include.append("distances")
+        shards = [s for s in self.store.select(where) if s.count()]
+        n_queries = len(query_embeddings)
+        out = {"ids": [[] for _ in range(n_queries)], **{key: [[] for _ in range(n_queries)] for key in include}}
+        if not shards:
+            return out
+
+        def one(shard):
+            return shard.query(query_embeddings=query_embeddings, n_results=n_results, where=where, include=include)
+
+        with stage("shard_fanout", items=n_queries) as m:
+            m["shards"] = len(shards)
+            results = list(self.store.pool.map(one, shards)) if len(shards) > 1 else [one(shards[0])]
+
+        for q in range(n_queries):
+            hits = [(res["distances"][q][i], s, i) for s, res in enumerate(results)
+                    for i in range(len(res["ids"][q]))]
+            for _, s, i in heapq.nsmallest(n_results, hits):
+                out["ids"][q].append(results[s]["ids"][q][i])
+                for key in include:
+                    out[key][q].append(results[s][key][q][i])
+        return out
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        groups = {}
+        for i, meta in enumerate(metadatas):
+            groups.setdefault((meta.get("week", 0), meta["section"]), []).append(i)
+        for (week, section), rows in groups.items():
+            self.store.shard(week, section, create=True).upsert(
+                ids=[ids[i] for i in rows],
+                embeddings=[embeddings[i] for i in rows],
+                documents=[documents[i] for i in rows],
+                metadatas=[metadatas[i] for i in rows],
+            )
+
+    def delete(self, ids=None, where=None):
+        if ids is not None:
+            for shard, shard_ids in self._route_ids(ids):
+                shard.delete(ids=shard_ids)
+            return
+        for shard in self.store.select(where):
+            shard.delete(where=where)
+
+    def count(self):
+        return sum(shard.count() for shard in self.store.shards(refresh=True).values())
+
+class ShardedVectorStore(VectorStore):
+    """VectorStore with one Chroma collection per (week, section), named
+    `<prefix>_w<week>_<section>`.
+
+    `collection` is a ShardedCollection, so code written against VectorStore
+    works unchanged; a week-filtered search only touches that week's shards.
+    Cold weeks can be compacted in place or moved to a separate archive store.
+    """
+
+    def __init__(self, persist_path: str = None, collection_name: str = "ppt_chunks", workers: int = 8):
+        self.prefix = collection_name
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard")
+        self._name = re.compile(rf"^{re.escape(collection_name)}_w(\d+)_(\w+)$")
+        self._shards = None
+        super().__init__(persist_path, collection_name)
+        self._recover_compaction()
+
+    def _open_collection(self, collection_name: str):
+        return ShardedCollection(self)
+
+    def _recover_compaction(self):
+        """Finishes or rolls back a compact_week that crashed. A `<shard>-compact` copy
+        whose shard is gone holds every row (the shard is only dropped after the copy
+        completes), so it is renamed back; next to a live shard it is dropped."""
+        names = {col.name for col in self.client.list_collections()}
+        for name in names:
+            shard_name = name.removesuffix(COMPACT_SUFFIX)
+            if shard_name == name or not self._name.match(shard_name):
+                continue
+            if shard_name in names:
+                self.client.delete_collection(name)
+            else:
+                self.client.get_collection(name).modify(name=shard_name)
+
+    def shard_name(self, week, section) -> str:
+        return f"{self.prefix}_w{int(week)}_{section}"
+
+    def shards(self, refresh=False) -> dict:
+        """{(week, section): collection} for every shard in this store. `refresh` picks up
+        shards created, compacted or dropped by other processes."""
+        if self._shards is None or refresh:
+            self._shards = {(int(match.group(1)), match.group(2)): col
+                            for col in self.client.list_collections() if (match := self._name.match(col.name))}
+        return self._shards
+
+    def shard(self, week, section, create=False):
+        key = (int(week), section)
+        shard = self.shards().get(key)
+        if shard is None and create:
+            shard = self.client.get_or_create_collection(name=self.shard_name(week, section),
+                                                         metadata={"hnsw:space": "cosine"})
+            self._shards[key] = shard
+        return shard
+
+    def select(self, where=None) -> list:
+        """Shards a where-filter can match, in (week, section) order."""
+        weeks, sections = _allowed(where, "week"), _allowed(where, "section")
+        return [shard for (week, section), shard in sorted(self.shards(refresh=True).items())
+                if (weeks is None or week in weeks) and (sections is None or section in sections)]
+
+    def weeks(self) -> list[int]:
+        return sorted({week for week, _ in self.shards()})
+
+    def _copy(self, source, target):
+        """Copies every row of one collection into another, in pages."""
+        offset = 0
+        while True:
+            page = source.get(include=["embeddings", "documents", "metadatas"], limit=COPY_PAGE, offset=offset)
+            if not page["ids"]:
+                break
+            target.upsert(ids=page["ids"], embeddings=page["embeddings"],
+                          documents=page["documents"], metadatas=page["metadatas"])
+            offset += len(page["ids"])
+        return offset
+
+    def compact_week(self, week: int) -> int:
+        """Rebuilds each shard of `week` from its live rows (drops deleted-row tombstones
+        and re-packs the HNSW graph). Returns the number of rows kept. Each shard is
+        copied to `<shard>-compact`, dropped, and the copy renamed into its place."""
+        kept = 0
+        for (w, section), shard in list(self.shards().items()):
+            if w != week:
+                continue
+            name = shard.name
+            fresh = self.client.get_or_create_collection(name=name + COMPACT_SUFFIX, metadata={"hnsw:space": "cosine"})
+            kept += self._copy(shard, fresh)
+            # a crash from here until the rename is repaired by _recover_compaction on the next open
+            self.client.delete_collection(name)
+            fresh.modify(name=name)
+        self.shards(refresh=True)
+        return kept
+
+    def archive_week(self, week: int, archive_path: str = None) -> int:
+        """Moves every shard of `week` into the archive store; screening stops seeing it."""
+        archive = ShardedVectorStore(archive_path or default_archive_path(), self.prefix)
+        return self._move(week, archive)
+
+    def restore_week(self, week: int, archive_path: str = None) -> int:
+        """Moves an archived week back into this store."""
+        archive = ShardedVectorStore(archive_path or default_archive_path(), self.prefix)
+        return archive._move(week, self)
+
+    def _move(self, week, target):
+        moved = 0
+        for (w, section), shard in list(self.shards().items()):
+            if w == week:
+                moved += self._copy(shard, target.shard(w, section, create=True))
+                self.client.delete_collection(shard.name)
+        self.shards(refresh=True)
+        return moved
+
+    def migrate_from(self, store: VectorStore) -> int:
+        """Copies the single-collection store into week/section shards."""
+        return self._copy(store.collection, self.collection)
+
+def open_store(persist_path: str = None, sharded: bool = None):
+    """VectorStore, or ShardedVectorStore when `sharded` (default: PPT_VECTOR_STORE=sharded)."""
+    if sharded is None:
+        sharded = os.environ.get("PPT_VECTOR_STORE", "").lower() == "sharded"
+    return ShardedVectorStore(persist_path) if sharded else VectorStore(persist_path)
@@ -1,19 +1,70 @@
 import numpy as np
+from ._metrics import stage
 from .chroma_store import VectorStore
+from .exact_index import ExactIndex
 
-def compute_internal_similarity(store: VectorStore, embedding: np.ndarray, ppt_id: str) -> dict:
-    """
-    Computes cosine similarity against historical 'idea_problem' chunks.
-    Returns numeric metrics only (max, avg_top5, penalty).
-    Safe against empty DBs and missing sections.
-    """
-    ZERO_RESULT = {
+# Uniqueness penalty thresholds on max cosine similarity
+HIGH_SIMILARITY = 0.85
+MODERATE_SIMILARITY = 0.70
+
+def similarity_penalty(max_sim: float) -> float:
+    """Penalty for the closest match: 0.25 (near-duplicate), 0.15 (similar) or 0."""
+    if max_sim >= HIGH_SIMILARITY:
+        return 0.25
+    if max_sim >= MODERATE_SIMILARITY:
+        return 0.15
+    return 0.0
+
+def _week_filter(weeks) -> list[dict]:
+    """Extra $and clause restricting a search to `weeks` (none when None)."""
+    return [] if weeks is None else [{"week": {"$in": [int(w) for w in weeks]}}]
+
+def _zero_result() -> dict:
+    return {
         "max_similarity": 0.0,
         "avg_top5_similarity": 0.0,
         "penalty": 0.0,
         "similar_ppt_ids": []
     }
 
+def _summarize(distances: list, metadatas: list) -> dict:
+    """Turns one query's cosine distances into max / avg_top5 / penalty metrics."""
+    # Chroma returns distance. Similarity = 1 - distance
+    # Clamp to [0, 1]
+    similarities = [max(0.0, min(1.0, 1.0 - d)) for d in distances]
+    
+    if not similarities:
+        return _zero_result()
+        
+    max_sim = max(similarities)
+    
+    # Top 5 Avg
+    top5 = sorted(similarities, reverse=True)[:5]
+    avg_top5 = sum(top5) / len(top5) if top5 else 0.0
+    
+    # Penalty Rules
+    penalty = similarity_penalty(max_sim)
+        
+    return {
+        "max_similarity": float(max_sim),
+        "avg_top5_similarity": float(avg_top5),
+        "penalty": float(penalty),
+        "similar_ppt_ids": [m.get('ppt_id') for m in metadatas]
+    }
+
+def compute_internal_similarity(store: VectorStore, embedding: np.ndarray, ppt_id: str,
+                                index: ExactIndex = None, weeks: list[int] = None) -> dict:
+    """
+    Computes cosine similarity against historical 'idea_problem' chunks.
+    Returns numeric metrics only (max, avg_top5, penalty).
+    Safe against empty DBs and missing sections.
+    If `index` (an ExactIndex) is given it replaces the filtered Chroma search;
+    a quantized index rescores its candidates with the float32 vectors in `store`.
+    `weeks` limits the comparison to those weeks (a ShardedVectorStore then only
+    searches their shards); by default every stored week is searched.
+    """
+    ZERO_RESULT = _zero_result()
+
     # Defensive: Empty input or malformed embedding
     if embedding is None or len(embedding) == 0:
         return ZERO_RESULT
@@ -22,52 +73,76 @@ def compute_internal_similarity(store: VectorStore, embedding: np.ndarray, ppt_i
     query_emb = embedding.tolist() if isinstance(embedding, np.ndarray) else embedding
 
     try:
-        results = store.query_similar(
-            embedding=query_emb,
-            n_results=10,
-            where={
-                "$and": [
-                    {"section": {"$eq": "idea_problem"}},
-                    {"ppt_id": {"$ne": ppt_id}}
-                ]
-            }
-        )
+        with stage("similarity_query", items=1, backend="exact" if index is not None else "chroma"):
+            if index is not None:
+                results = index.query_similar(query_emb, n_results=10, exclude_ppt_id=ppt_id, store=store,
+                                              weeks=weeks)
+            else:
+                results = store.query_similar(
+                    embedding=query_emb,
+                    n_results=10,
+                    where={
+                        "$and": [
+                            {"section": {"$eq": "idea_problem"}},
+                            {"ppt_id": {"$ne": ppt_id}}
+                        ] + _week_filter(weeks)
+                    }
+                )
         
         # Check for empty results
         if not results['ids'] or not results['ids'][0]:
             return ZERO_RESULT
 
-        # Chroma returns distance. Similarity = 1 - distance
-        distances = results['distances'][0]
-        metadatas = results['metadatas'][0]
-        
-        # Clamp to [0, 1]
-        similarities = [max(0.0, min(1.0, 1.0 - d)) for d in distances]
-        
-        if not similarities:
-            return ZERO_RESULT
-            
-        max_sim = max(similarities)
-        
-        # Top 5 Avg
-        top5 = sorted(similarities, reverse=True)[:5]
-        avg_top5 = sum(top5) / len(top5) if top5 else 0.0
-        
-        # Penalty Rules (Hardcoded)
-        if max_sim >= 0.85:
-            penalty = 0.25
-        elif max_sim >= 0.70:
-            penalty = 0.15
-        else:
-            penalty = 0.0
-            
-        return {
-            "max_similarity": float(max_sim),
-            "avg_top5_similarity": float(avg_top5),
-            "penalty": float(penalty),
-            "similar_ppt_ids": [m.get('ppt_id') for m in metadatas]
-        }
+        return _summarize(results['distances'][0], results['metadatas'][0])
 
     except Exception:
         # Fail gracefully on ANY DB error
         return ZERO_RESULT
+
+def compute_internal_similarity_batch(store: VectorStore, embeddings: np.ndarray, ppt_ids: list[str],
+                                      index: ExactIndex = None, n_results: int = 10,
+                                      self_margin: int = 5, weeks: list[int] = None) -> list[dict]:
+    """
+    Batch variant of compute_internal_similarity for an (N, d) matrix and N ppt_ids.
+    Issues one multi-query request (or one vectorized ExactIndex pass) instead of N.
+    Chroma cannot filter `$ne` per query, so each query over-fetches `self_margin`
+    extra hits and drops its own ppt_id; a deck whose own rows crowd out the
+    top `n_results` falls back to the single filtered query.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if len(ppt_ids) == 0 or embeddings.size == 0:
+        return [_zero_result() for _ in ppt_ids]
+    embeddings = embeddings.reshape(len(ppt_ids), -1)
+
+    try:
+        with stage("similarity_query", items=len(ppt_ids), batch_size=len(ppt_ids),
+                   backend="exact" if index is not None else "chroma"):
+            if index is not None:
+                results = index.query_similar_batch(embeddings, n_results=n_results, exclude_ppt_ids=ppt_ids,
+                                                    store=store, weeks=weeks)
+            else:
+                where = {"section": {"$eq": "idea_problem"}}
+                if weeks is not None:
+                    where = {"$and": [where] + _week_filter(weeks)}
+                results = store.query_similar_batch(
+                    embeddings=embeddings.tolist(),
+                    n_results=n_results + self_margin,
+                    where=where
+                )
+        if index is not None:
+            return [_summarize(d, m) for d, m in zip(results["distances"], results["metadatas"])]
+    except Exception:
+        # Fail gracefully on ANY DB error
+        return [_zero_result() for _ in ppt_ids]
+
+    fetch = n_results + self_margin
+    out = []
+    for i, ppt_id in enumerate(ppt_ids):
+        hits = [(d, m) for d, m in zip(results["distances"][i], results["metadatas"][i])
+                if m.get("ppt_id") != ppt_id]
+        if len(hits) < n_results and len(results["ids"][i]) == fetch:
+            out.append(compute_internal_similarity(store, embeddings[i], ppt_id, weeks=weeks))
+            continue
+        hits = hits[:n_results]
+        out.append(_summarize([d for d, _ in hits], [m for _, m in hits]))
+    return out
@@ -1,3 +1,5 @@
 from .evaluator import IdeaEvaluator
+from .llm_cache import LLMResponseCache
+from .resilience import CircuitBreaker, DeadLetterQueue, LLMUnavailableError
 
-__all__ = ["IdeaEvaluator"]
+__all__ = ["IdeaEvaluator", "LLMResponseCache", "CircuitBreaker", "DeadLetterQueue", "LLMUnavailableError"]
@@ -0,0 +1,114 @@
+import re
+import math
+from collections import Counter
+
+# Rough characters per token for Llama-family tokenizers on English slide text;
+# deliberately low so estimates err on the side of more tokens.
+CHARS_PER_TOKEN = 3.5
+
+# Sub-chunk size when a section has to be split
+CHUNK_TOKENS = 120
+
+OMITTED = "\n[...]\n"
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or our the this to we what with "
+    "assess score criterion".split()
+)
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _terms(text: str) -> list[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1]
+
+def split_text(text: str, max_tokens: int = CHUNK_TOKENS) -> list[str]:
+    """Splits text into sub-chunks of at most ~max_tokens, on line, then sentence, then word boundaries."""
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    pieces = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if len(line) <= max_chars:
+            pieces.append(line)
+            continue
+        for sentence in _SENTENCE.split(line):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:].lstrip()
+            if sentence:
+                pieces.append(sentence)
+
+    # Re-join neighbouring short pieces (slide bullets) up to the chunk size
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def rank_chunks(chunks: list[str], query: str) -> list[int]:
+    """Indices of `chunks`, most relevant to `query` first (BM25 over the chunks; ties keep document order)."""
+    query_terms = set(_terms(query))
+    docs = [Counter(_terms(c)) for c in chunks]
+    if not query_terms or not docs:
+        return list(range(len(chunks)))
+
+    n = len(docs)
+    avg_len = sum(sum(d.values()) for d in docs) / n or 1.0
+    df = Counter(t for d in docs for t in query_terms if t in d)
+    k1, b = 1.2, 0.75
+
+    def score(d):
+        length = sum(d.values())
+        total = 0.0
+        for t in query_terms:
+            if tf := d.get(t):
+                idf = math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5))
+                total += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_len))
+        return total
+
+    scores = [score(d) for d in docs]
+    return sorted(range(n), key=lambda i: (-scores[i], i))
+
+def pack_context(text: str, query: str, budget_tokens: int, chunk_tokens: int = CHUNK_TOKENS) -> str:
+    """Fits `text` into `budget_tokens`, keeping the sub-chunks most relevant to `query`.
+
+    Text that already fits is returned unchanged. Otherwise the selected
+    sub-chunks are emitted in their original order, with gaps marked "[...]".
+    """
+    if estimate_tokens(text) <= budget_tokens:
+        return text
+
+    chunks = split_text(text, chunk_tokens)
+    gap = estimate_tokens(OMITTED)
+    picked, used = set(), 0
+    for i in rank_chunks(chunks, query):
+        cost = estimate_tokens(chunks[i]) + gap
+        if used + cost <= budget_tokens:
+            picked.add(i)
+            used += cost
+
+    if not picked:
+        # Even the best sub-chunk is too large: hard-cut it to the budget
+        best = rank_chunks(chunks, query)[0] if chunks else None
+        return chunks[best][:int(budget_tokens * CHARS_PER_TOKEN)] if best is not None else ""
+
+    out, previous = [], -1
+    for i in sorted(picked):
+        if i != previous + 1:
+            out.append(OMITTED.strip())
+        out.append(chunks[i])
+        previous = i
+    if previous != len(chunks) - 1:
+        out.append(OMITTED.strip())
+    return "\n".join(out)
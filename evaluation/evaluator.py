@@ -1,7 +1,37 @@
 import json
+import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from embeddings import VectorStore, ChunkEmbedder, compute_internal_similarity
+from requests.adapters import HTTPAdapter
+from metrics import record, stage
+from embeddings import ChunkEmbedder, open_store, ExactIndex, compute_internal_similarity
+from .llm_cache import LLMResponseCache
+from .context import estimate_tokens, pack_context
+from .streaming import CRITERION_KEYS, UNIQUENESS_KEYS, JsonObjectScanner, has_keys
+from .resilience import AdaptiveTimeout, CircuitBreaker, LLMUnavailableError, backoff_delay
+
+# Token counts / durations (ns) reported by Ollama, recorded per LLM call
+OLLAMA_COUNTERS = ("prompt_eval_count", "eval_count")
+OLLAMA_DURATIONS = ("prompt_eval_duration", "eval_duration", "load_duration", "total_duration")
+
+# Bump whenever prompts or response handling change: invalidates cached LLM answers
+PROMPT_VERSION = "1"
+
+# Generation cap (num_predict) per call; a {"score", "reason"} answer needs well
+# under 100 tokens. Calls without an entry get response_tokens.
+NUM_PREDICT = {
+    "problem_clarity": 160,
+    "solution_quality": 160,
+    "technical_feasibility": 160,
+    "team_capability": 160,
+    "uniqueness": 192,
+    "combined": 448,
+}
+
+# Whole-call deadline (seconds), streamed or not; the ceiling of the adaptive timeout
+LLM_TIMEOUT = 90
 
 PROMPT_BASE = """You are a hackathon idea evaluator.
 
@@ -75,39 +105,268 @@ SIMILAR IDEAS:
 {similar_ideas}
 """
 
+PROMPT_COMBINED = """You are a hackathon idea evaluator.
+
+You will be given:
+1. Extracted content from a single team’s submission, one block per criterion
+2. Four scoring criteria
+
+Rules:
+- Do NOT assume missing information
+- Penalize vague, generic, or marketing-style language
+- Be conservative in scoring
+- Judge each criterion ONLY on its own block
+- Output STRICT JSON only
+- Score from 0 to 10 (integers only)
+
+{blocks}
+
+Criteria:
+{criteria}
+
+Return JSON:
+{{
+{answer}
+}}"""
+
+# One-line criterion descriptions for the combined prompt (PROMPT_CLARITY carries its own JSON format)
+COMBINED_DESCRIPTIONS = {
+    "problem_clarity": "Clarity and effort of explanation. Penalize generic phrases, reward concrete "
+                       "constraints, scope, users, or data. Do NOT judge grammar or writing style.",
+}
+
+def _valid_answer(res) -> bool:
+    return isinstance(res, dict) and isinstance(res.get("score"), (int, float)) and not isinstance(res["score"], bool)
+
 class IdeaEvaluator:
     """Evaluates a single PPT using RAG and internal similarity."""
     
-    def __init__(self, model="tinyllama:latest", ollama_url="http://localhost:11434"):
+    def __init__(self, model="tinyllama:latest", ollama_url="http://localhost:11434", concurrency=5,
+                 response_cache: LLMResponseCache = None, similarity_index: ExactIndex = None,
+                 num_ctx=2048, response_tokens=256, stream=True, num_predict: dict = None, combined=False,
+                 store=None, strict=False, breaker: CircuitBreaker = None, embedder: ChunkEmbedder = None):
         self.model = model
+        # Prompts are packed to fit num_ctx minus the tokens reserved for the answer
+        self.num_ctx = num_ctx
+        self.response_tokens = response_tokens
+        # Streaming lets a call end as soon as the JSON answer is complete
+        self.stream = stream
+        self.num_predict = {**NUM_PREDICT, **(num_predict or {})}
+        # Score the four rubric criteria in one call; missing criteria fall back to their own call
+        self.combined = combined
+        self.ollama_url = ollama_url
         self.api_url = f"{ollama_url}/api/generate"
-        self.store = VectorStore()
-        self.embedder = ChunkEmbedder()
-
-    def _call_ollama(self, prompt, retries=3):
-        """Generic Ollama caller with JSON enforcement."""
-        payload = {
-            "model": self.model, "prompt": prompt, "stream": False, "format": "json",
-            "options": {"num_ctx": 2048, "temperature": 0.1}
+        self.store = store if store is not None else open_store()
+        self.response_cache = response_cache
+        self.similarity_index = similarity_index
+        # Callers that already hold a ChunkEmbedder pass it in instead of loading a second model
+        self._embedder = embedder
+
+        # Shared keep-alive connection pool; the semaphore caps in-flight Ollama
+        # requests across every evaluate() call made on this evaluator.
+        self.concurrency = max(1, int(concurrency))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+
+        # Outages: after a few consecutive failures every call fails fast until a probe
+        # succeeds. strict raises LLMUnavailableError instead of scoring the deck 0.
+        self.breaker = breaker or CircuitBreaker()
+        self.timeouts = AdaptiveTimeout(LLM_TIMEOUT)
+        self.strict = strict
+
+    @property
+    def embedder(self):
+        """Only needed when a stored chunk has no embedding; loaded on demand."""
+        if self._embedder is None:
+            self._embedder = ChunkEmbedder()
+        return self._embedder
+
+    def _call_ollama(self, prompt, retries=3, label=None, expect=None):
+        """Generic Ollama caller with JSON enforcement. `label` names the criterion in metrics;
+        `expect` lists the keys of a complete answer (default: by label)."""
+        if expect is None:
+            # The combined answer is validated per criterion, so its stream stops at the first object
+            expect = {"uniqueness": UNIQUENESS_KEYS, "combined": ()}.get(label, CRITERION_KEYS)
+        options = {"num_ctx": self.num_ctx, "temperature": 0.1,
+                   "num_predict": self.num_predict.get(label, self.response_tokens)}
+        with stage("llm", items=1, criterion=label, model=self.model) as m:
+            if self.response_cache is not None:
+                cached = self.response_cache.get(self.model, prompt, options, PROMPT_VERSION)
+                if cached is not None:
+                    m["cache_hits"] = 1
+                    return cached
+
+            payload = {
+                "model": self.model, "prompt": prompt, "stream": self.stream, "format": "json",
+                "options": options
+            }
+            outage = None
+            for attempt in range(retries):
+                if attempt:
+                    time.sleep(backoff_delay(attempt - 1))
+                try:
+                    self.breaker.before_call()
+                except LLMUnavailableError as e:
+                    m["short_circuits"] = 1
+                    outage = e
+                    break
+                # a retry after a timeout gets twice as long, up to LLM_TIMEOUT
+                timeout = min(LLM_TIMEOUT, self.timeouts.current(label) * 2 ** attempt)
+                try:
+                    queued = time.perf_counter()
+                    with self._slots:
+                        started = time.perf_counter()
+                        m["queue_seconds"] = m.get("queue_seconds", 0) + started - queued
+                        if self.stream:
+                            result, body = self._stream(payload, expect, m, timeout)
+                        else:
+                            resp = self.session.post(self.api_url, json=payload, timeout=timeout)
+                            resp.raise_for_status()
+                            body = resp.json()
+                            result = json.loads(body.get("response", "{}"))
+                        elapsed = time.perf_counter() - started
+                except requests.HTTPError as e:
+                    if e.response is None or e.response.status_code >= 500:
+                        self.breaker.failure()
+                        outage = e
+                        continue
+                    # Ollama is up but rejects the request (e.g. 404 model not found): retrying
+                    # or waiting for recovery won't help, so it fails this deck, not the service
+                    self.breaker.success()
+                    m["retries"] = attempt
+                    m["failures"] = 1
+                    if self.strict:
+                        raise
+                    return None
+                except ValueError:
+                    # Ollama answered, the model did not produce usable JSON: not an outage
+                    self.breaker.success()
+                    outage = None
+                    continue
+                except Exception as e:
+                    # refused / reset connections, timeouts
+                    self.breaker.failure()
+                    m["timeouts"] = m.get("timeouts", 0) + isinstance(e, (requests.Timeout, TimeoutError))
+                    outage = e
+                    continue
+                self.breaker.success()
+                self.timeouts.observe(label, elapsed)
+                m["retries"] = attempt
+                m.update({k: body[k] for k in OLLAMA_COUNTERS if k in body})
+                m.update({f"{k}_seconds": body[k] / 1e9 for k in OLLAMA_DURATIONS if k in body})
+                if self.response_cache is not None:
+                    self.response_cache.put(self.model, prompt, options, PROMPT_VERSION, result)
+                return result
+            m["retries"] = attempt
+            m["failures"] = 1
+            if outage is not None and self.strict:
+                raise LLMUnavailableError(f"{type(outage).__name__}: {outage}") from outage
+            return None
+
+    def ping(self, timeout=5.0) -> bool:
+        """Cheap health check used to probe a recovering Ollama: it must answer and list the
+        configured model (a bare name matches its ":latest" tag)."""
+        try:
+            resp = self.session.get(f"{self.ollama_url}/api/tags", timeout=timeout)
+            resp.raise_for_status()
+            names = {m.get(k) for m in resp.json().get("models", []) for k in ("name", "model")}
+        except (requests.RequestException, ValueError, AttributeError):
+            return False
+        return self.model in names or f"{self.model}:latest" in names
+
+    def wait_for_recovery(self, max_wait: float) -> bool:
+        """Blocks until Ollama answers again (True) or `max_wait` seconds pass (False)."""
+        return self.breaker.wait_for_recovery(self.ping, max_wait)
+
+    def _stream(self, payload, expect, m, timeout=LLM_TIMEOUT):
+        """Reads Ollama's NDJSON stream until a JSON object with all `expect` keys is complete,
+        then closes the connection, which makes Ollama stop generating.
+
+        Returns (answer, final stream line); the final line (with Ollama's token counts
+        and durations) only exists when the model finished on its own.
+        """
+        scanner, answer, fallback = JsonObjectScanner(), None, None
+        started = time.perf_counter()
+        with self.session.post(self.api_url, json=payload, timeout=timeout, stream=True) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "first_token_seconds" not in m:
+                    m["first_token_seconds"] = time.perf_counter() - started
+                m["stream_chunks"] = m.get("stream_chunks", 0) + 1
+                for obj in scanner.feed(chunk.get("response", "")):
+                    if has_keys(obj, expect):
+                        answer = obj
+                        break
+                    fallback = fallback or obj
+                if chunk.get("done"):
+                    return answer or fallback or json.loads(scanner.text or "{}"), chunk
+                if answer is not None:
+                    m["early_stops"] = 1
+                    return answer, {}
+                if time.perf_counter() - started > timeout:
+                    raise TimeoutError(f"No complete answer after {timeout:.0f}s")
+        if fallback is None:
+            raise ValueError("Stream ended without a JSON answer")
+        return fallback, {}
+
+    def _budget(self, template: str, label: str = None) -> int:
+        """Context tokens left for section text once `template` and the answer are accounted for."""
+        reserved = max(self.response_tokens, self.num_predict.get(label, 0))
+        return max(0, self.num_ctx - estimate_tokens(template) - reserved)
+
+    def _criterion_prompt(self, key, text, desc):
+        # Long sections are split and only the sub-chunks most relevant to the
+        # criterion are kept, so every prompt fits num_ctx
+        budget = self._budget(PROMPT_BASE.format(retrieved_chunks="", criterion_description=desc), key)
+        packed = pack_context(text, f"{key.replace('_', ' ')} {desc}", budget)
+        return PROMPT_BASE.format(retrieved_chunks=packed, criterion_description=desc)
+
+    def _combined_prompt(self, criteria):
+        """One prompt for every criterion; the context budget is split evenly between their blocks."""
+        descriptions = {key: COMBINED_DESCRIPTIONS.get(key, desc) for key, _, desc, _ in criteria}
+        fields = {
+            "criteria": "\n".join(f"- {key}: {d}" for key, d in descriptions.items()),
+            "answer": ",\n".join(f'  "{key}": {{"score": <int>, "reason": "<short, factual justification>"}}'
+                                 for key in descriptions),
         }
-        for _ in range(retries):
-            try:
-                resp = requests.post(self.api_url, json=payload, timeout=90)
-                resp.raise_for_status()
-                return json.loads(resp.json().get("response", "{}"))
-            except Exception:
-                continue
-        return None
+        headers = [f"[{key}]" for key, _, _, _ in criteria]
+        budget = self._budget(PROMPT_COMBINED.format(blocks="\n\n".join(headers), **fields), "combined")
+        share = budget // len(criteria)
+        blocks = []
+        for header, (key, text, _, _) in zip(headers, criteria):
+            query = f"{key.replace('_', ' ')} {descriptions[key]}"
+            blocks.append(f"{header}\n{pack_context(text, query, share)}")
+        return PROMPT_COMBINED.format(blocks="\n\n".join(blocks), **fields)
+
+    def _call_many(self, prompts: dict) -> dict:
+        """Runs independent prompts concurrently. Returns {key: parsed JSON or None}."""
+        if self.concurrency == 1 or len(prompts) == 1:
+            return {key: self._call_ollama(prompt, label=key) for key, prompt in prompts.items()}
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(prompts))) as pool:
+            futures = {key: pool.submit(self._call_ollama, prompt, label=key) for key, prompt in prompts.items()}
+            return {key: f.result() for key, f in futures.items()}
 
+    @stage("evaluate")
     def evaluate(self, ppt_id: str):
         """Main evaluation flow."""
         # 1. Retrieve & Validate
-        results = self.store.collection.get(where={"ppt_id": ppt_id}, include=["documents", "metadatas"])
+        results = self.store.collection.get(where={"ppt_id": ppt_id}, include=["documents", "metadatas", "embeddings"])
         chunks = {}
         if results and results["metadatas"]:
+            embeddings = results.get("embeddings")
             for i, meta in enumerate(results["metadatas"]):
                 if isinstance(meta, dict):
-                    chunks[meta["section"]] = {**meta, "text": results["documents"][i]}
+                    chunks[meta["section"]] = {
+                        **meta,
+                        "text": results["documents"][i],
+                        "embedding": embeddings[i] if embeddings is not None and len(embeddings) > i else None
+                    }
         
         required = ["idea_problem", "solution_approach", "uniqueness_claim", "tech_stack", "team_capability"]
         if missing := [s for s in required if s not in chunks]:
@@ -116,39 +375,64 @@ class IdeaEvaluator:
         final_scores, explanations = {}, {}
         fail_msg = "Evaluator unavailable (LLM error)"
 
-        # 2. Evaluate Criteria (Batched Config)
-        criteria = [
-            ("problem_clarity", chunks["idea_problem"]["text"], PROMPT_CLARITY, 8.0),
-            ("solution_quality", chunks["solution_approach"]["text"], "Assess solution logic, depth, and feasibility.", 8.0),
-            ("technical_feasibility", chunks["tech_stack"]["text"], "Assess technical feasibility and stack realism.", 8.0),
-            ("team_capability", chunks["team_capability"]["text"], "Assess team skills to execute the idea.", 7.0),
-        ]
-
-        for key, text, desc, max_score in criteria:
-            res = self._call_ollama(PROMPT_BASE.format(retrieved_chunks=text, criterion_description=desc)) or \
-                  {"score": 0, "reason": fail_msg}
-            final_scores[key] = min(res.get("score", 0), max_score)
-            explanations[key] = res.get("reason", "N/A")
-
-        # 3. Evaluate Uniqueness
-        emb = self.embedder.embed([chunks["idea_problem"]["text"]])[0]
-        sim_stats = compute_internal_similarity(self.store, emb, ppt_id)
+        # 2. Internal Similarity (local, needed for the uniqueness prompt)
+        # Reuse the vector stored at ingestion; re-embed only if it is missing
+        emb = chunks["idea_problem"]["embedding"]
+        if emb is None or len(emb) == 0:
+            emb = self.embedder.embed([chunks["idea_problem"]["text"]])[0]
+        if self.similarity_index is not None:
+            self.similarity_index.refresh()  # rows appended by another process since the last query
+        sim_stats = compute_internal_similarity(self.store, emb, ppt_id, index=self.similarity_index)
         
         # Base: (1 - max_sim) * 8.0
         base_uniq = max(0.0, (1.0 - sim_stats["max_similarity"]) * 8.0)
         
         # Adjustment Context
         sim_text = "No similar ideas found."
+        docs_for_prompt = []
         if ids := sim_stats.get("similar_ppt_ids", [])[:3]:
             # Optimistic fetch of similar ideas
             # Note: Ideally batch fetch, but here strictly ensuring efficiency
             if docs := self.store.collection.get(where={"$and": [{"ppt_id": {"$in": ids}}, {"section": "idea_problem"}]})["documents"]:
-                sim_text = "\n---\n".join(docs)
+                docs_for_prompt = docs
+
+        # 3. Evaluate Criteria + Uniqueness (independent calls, run concurrently)
+        criteria = [
+            ("problem_clarity", chunks["idea_problem"]["text"], PROMPT_CLARITY, 8.0),
+            ("solution_quality", chunks["solution_approach"]["text"], "Assess solution logic, depth, and feasibility.", 8.0),
+            ("technical_feasibility", chunks["tech_stack"]["text"], "Assess technical feasibility and stack realism.", 8.0),
+            ("team_capability", chunks["team_capability"]["text"], "Assess team skills to execute the idea.", 7.0),
+        ]
+
+        if self.combined:
+            prompts = {"combined": self._combined_prompt(criteria)}
+        else:
+            prompts = {key: self._criterion_prompt(key, text, desc) for key, text, desc, _ in criteria}
+
+        # Uniqueness: half the budget for the current idea, half shared by the similar ideas
+        budget = self._budget(PROMPT_UNIQUENESS.format(current_idea="", similar_ideas=""))
+        current_idea = pack_context(f"{chunks['idea_problem']['text']}\n{chunks['uniqueness_claim']['text']}",
+                                    "unique novel different idea problem solution", budget // 2)
+        if docs_for_prompt:
+            share = max(0, (budget - budget // 2) // len(docs_for_prompt) - estimate_tokens("\n---\n"))
+            sim_text = "\n---\n".join(pack_context(d, current_idea, share) for d in docs_for_prompt)
+        prompts["uniqueness"] = PROMPT_UNIQUENESS.format(current_idea=current_idea, similar_ideas=sim_text)
+        responses = self._call_many(prompts)
+
+        if self.combined:
+            combined = responses.pop("combined") or {}
+            responses.update({key: combined[key] for key, _, _, _ in criteria if _valid_answer(combined.get(key))})
+            if missing := [(key, text, desc) for key, text, desc, _ in criteria if key not in responses]:
+                record("combined_fallback", 0.0, items=len(missing))
+                responses.update(self._call_many({key: self._criterion_prompt(key, text, desc)
+                                                  for key, text, desc in missing}))
+
+        for key, _, _, max_score in criteria:
+            res = responses[key] or {"score": 0, "reason": fail_msg}
+            final_scores[key] = min(res.get("score", 0), max_score)
+            explanations[key] = res.get("reason", "N/A")
 
-        uniq_res = self._call_ollama(PROMPT_UNIQUENESS.format(
-            current_idea=f"{chunks['idea_problem']['text']}\n{chunks['uniqueness_claim']['text']}",
-            similar_ideas=sim_text
-        )) or {"score_adjustment": 0, "reason": fail_msg}
+        uniq_res = responses["uniqueness"] or {"score_adjustment": 0, "reason": fail_msg}
 
         # Adjustment: Clamp -2 to +2
         adj = max(-2, min(2, uniq_res.get("score_adjustment", 0)))
@@ -0,0 +1,89 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+def default_cache_path() -> str:
+    """<project_root>/llm_cache.sqlite"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, "llm_cache.sqlite")
+
+class LLMResponseCache:
+    """Persistent store of parsed LLM responses (SQLite).
+
+    Keyed by model, prompt hash, options and a prompt-version tag: bumping the
+    tag invalidates every earlier answer. Entries expire after `ttl_seconds`
+    (None = never) and are evicted least-recently-used past `max_entries`.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 100_000, ttl_seconds: float = None):
+        self.path = path or default_cache_path()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, prompt_version TEXT NOT NULL, model TEXT NOT NULL,"
+            " response TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(model: str, prompt: str, options: dict, prompt_version: str) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        raw = json.dumps([prompt_version, model, prompt_hash, options], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, model: str, prompt: str, options: dict, prompt_version: str):
+        """Returns the cached parsed response, or None on a miss or expired entry."""
+        key = self.key(model, prompt, options, prompt_version)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, model: str, prompt: str, options: dict, prompt_version: str, response: dict):
+        key = self.key(model, prompt, options, prompt_version)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, prompt_version, model, json.dumps(response), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def purge_versions(self, keep: str) -> int:
+        """Drops every entry not tagged `keep`. Returns the number removed."""
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM responses WHERE prompt_version != ?", (keep,)).rowcount
+            self._conn.commit()
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
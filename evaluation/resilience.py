@@ -0,0 +1,175 @@
+import os
+import time
+import random
+import sqlite3
+import threading
+from collections import deque
+
+def default_dead_letter_path() -> str:
+    """<project_root>/dead_letters.sqlite"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, "dead_letters.sqlite")
+
+class LLMUnavailableError(RuntimeError):
+    """Ollama could not be reached (or the circuit is open): the deck was not scored."""
+
+class CircuitBreaker:
+    """Shared by every LLM call of an evaluator.
+
+    After `failure_threshold` consecutive failed calls the circuit opens and calls
+    fail immediately. Once `reset_seconds` have passed a single probe call is let
+    through (half-open): success closes the circuit, failure reopens it for twice
+    as long, up to `max_reset_seconds`.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, reset_seconds=15.0, max_reset_seconds=240.0):
+        self.failure_threshold = failure_threshold
+        self.base_reset_seconds = reset_seconds
+        self.max_reset_seconds = max_reset_seconds
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        """Seconds until a call would be let through (0 when closed or ready to probe)."""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def before_call(self):
+        """Raises LLMUnavailableError unless a call may go ahead. Every call let through
+        must be followed by success() or failure()."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() >= self.opened_at + self.reset_seconds:
+                self.state, self._probing = self.HALF_OPEN, False
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            wait = max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+            raise LLMUnavailableError(f"Circuit {self.state}: Ollama unavailable, next probe in {wait:.0f}s")
+
+    def success(self):
+        with self._lock:
+            self.state, self.failures, self._probing = self.CLOSED, 0, False
+            self.reset_seconds = self.base_reset_seconds
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self.reset_seconds = min(self.max_reset_seconds, self.reset_seconds * 2)
+            elif self.failures < self.failure_threshold:
+                return
+            self.state, self.opened_at, self._probing = self.OPEN, time.monotonic(), False
+
+    def wait_for_recovery(self, probe, max_wait: float) -> bool:
+        """Sleeps until the circuit may probe, then calls `probe()` (a cheap health check
+        returning bool) until it succeeds or `max_wait` seconds have passed. With
+        max_wait=0 it probes once if a probe is due, without sleeping."""
+        deadline = time.monotonic() + max_wait
+        while True:
+            delay = self.retry_after()
+            if delay > max(0.0, deadline - time.monotonic()):
+                return False
+            time.sleep(delay)
+            try:
+                self.before_call()
+            except LLMUnavailableError:
+                pass  # another thread holds the half-open probe
+            else:
+                if probe():
+                    self.success()
+                    return True
+                self.failure()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self.state != self.OPEN:
+                # below the threshold (or waiting on another prober) nothing else paces the probes
+                time.sleep(min(1.0 if self.state == self.HALF_OPEN else self.base_reset_seconds, remaining))
+
+class AdaptiveTimeout:
+    """Per-call deadline derived from observed latency, per call label.
+
+    `multiplier` x the p95 of the last `window` successful calls, clamped to
+    [floor, ceiling]; the ceiling applies until `min_samples` calls have succeeded.
+    """
+
+    def __init__(self, ceiling: float, floor: float = 10.0, multiplier: float = 3.0, window: int = 50,
+                 min_samples: int = 5):
+        self.ceiling = ceiling
+        self.floor = min(floor, ceiling)
+        self.multiplier = multiplier
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label, seconds: float):
+        with self._lock:
+            self._samples.setdefault(label, deque(maxlen=self.window)).append(seconds)
+
+    def current(self, label) -> float:
+        with self._lock:
+            samples = sorted(self._samples.get(label, ()))
+        if len(samples) < self.min_samples:
+            return self.ceiling
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return max(self.floor, min(self.ceiling, p95 * self.multiplier))
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 10.0) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class DeadLetterQueue:
+    """Decks whose evaluation failed because Ollama was unavailable (SQLite).
+
+    A deck stays here until it is evaluated successfully; batch runs retry it
+    once the service is back, and the next run picks up whatever is left.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or default_dead_letter_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letters ("
+            " ppt_id TEXT NOT NULL, week INTEGER NOT NULL, error TEXT, attempts INTEGER NOT NULL,"
+            " first_failed REAL NOT NULL, last_failed REAL NOT NULL, PRIMARY KEY (ppt_id, week))"
+        )
+        self._conn.commit()
+
+    def add(self, ppt_id: str, week: int, error: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO dead_letters VALUES (?, ?, ?, 1, ?, ?) ON CONFLICT(ppt_id, week) DO UPDATE SET"
+                " error = excluded.error, attempts = attempts + 1, last_failed = excluded.last_failed",
+                (ppt_id, week, error, now, now)
+            )
+            self._conn.commit()
+
+    def remove(self, ppt_id: str, week: int):
+        with self._lock:
+            self._conn.execute("DELETE FROM dead_letters WHERE ppt_id = ? AND week = ?", (ppt_id, week))
+            self._conn.commit()
+
+    def pending(self, week: int = None) -> list[dict]:
+        query = "SELECT ppt_id, week, error, attempts, first_failed, last_failed FROM dead_letters"
+        args = ()
+        if week is not None:
+            query, args = query + " WHERE week = ?", (week,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY first_failed", args).fetchall()
+        return [dict(zip(("ppt_id", "week", "error", "attempts", "first_failed", "last_failed"), r)) for r in rows]
+
+    def close(self):
+        self._conn.close()
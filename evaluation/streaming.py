@@ -0,0 +1,55 @@
+import json
+
+# Keys that make a streamed answer complete, per prompt kind
+CRITERION_KEYS = ("score", "reason")
+UNIQUENESS_KEYS = ("novelty_category", "score_adjustment")
+
+class JsonObjectScanner:
+    """Finds complete top-level JSON objects in text that arrives in fragments.
+
+    Tracks brace depth outside of string literals (honouring escapes), so an
+    object is recognised the moment its closing brace arrives, whatever the
+    model generates after it.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._start = None
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, fragment: str) -> list[dict]:
+        """Appends `fragment`; returns the objects completed by it (unparseable ones are skipped)."""
+        self.text += fragment
+        found = []
+        for i in range(self._pos, len(self.text)):
+            ch = self.text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"' and self._depth:
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        obj = json.loads(self.text[self._start:i + 1])
+                    except json.JSONDecodeError:
+                        obj = None
+                    if isinstance(obj, dict):
+                        found.append(obj)
+        self._pos = len(self.text)
+        return found
+
+def has_keys(obj: dict, keys) -> bool:
+    return all(k in obj for k in keys)
@@ -0,0 +1,129 @@
+# metrics.py
+import os
+import json
+import time
+import atexit
+import threading
+import multiprocessing
+from contextlib import contextmanager
+
+# Output targets; unset means in-memory aggregates only
+JSONL_ENV = "PPT_METRICS_JSONL"
+PROM_ENV = "PPT_METRICS_PROM"
+
+# Minimum seconds between Prometheus textfile rewrites (always written at exit)
+PROM_INTERVAL = 5.0
+
+class StageMetrics:
+    """Thread-safe per-stage timing, item counts and batch sizes.
+
+    Every finished stage becomes one JSON line (if a JSONL path is set) and is
+    folded into per-(stage, labels) aggregates, which are periodically written
+    as a Prometheus textfile (node_exporter textfile collector format).
+    Numeric extras such as Ollama's `eval_count` are summed per stage.
+    """
+
+    def __init__(self, jsonl_path=None, prom_path=None):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._last_prom = 0.0
+
+    @contextmanager
+    def stage(self, name, items=None, batch_size=None, **labels):
+        """Times the enclosed block. Yields a dict; numeric values put in it
+        (token counts, cache hits, ...) are recorded with the stage."""
+        extra = {}
+        start = time.perf_counter()
+        error = None
+        try:
+            yield extra
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, items=extra.pop("items", items),
+                        batch_size=batch_size, error=error, labels=labels, **extra)
+
+    def record(self, name, seconds, items=None, batch_size=None, error=None, labels=None, **extra):
+        labels = {k: str(v) for k, v in (labels or {}).items() if v is not None}
+        event = {"ts": round(time.time(), 3), "stage": name, "seconds": round(seconds, 6),
+                 "items": items, "batch_size": batch_size, "pid": os.getpid(), **labels, **extra}
+        if error:
+            event["error"] = error
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            s = self._stats.setdefault(key, {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0,
+                                             "items": 0, "batch_size": 0, "extra": {}})
+            s["calls"] += 1
+            s["errors"] += bool(error)
+            s["seconds"] += seconds
+            s["max_seconds"] = max(s["max_seconds"], seconds)
+            s["items"] += items or 0
+            if batch_size:
+                s["batch_size"] = batch_size
+            for k, v in extra.items():
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
+                    s["extra"][k] = s["extra"].get(k, 0) + v
+
+            if self.jsonl_path:
+                # one write per line; O_APPEND keeps lines from several processes intact
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(event, default=str) + "\n")
+
+        if self.prom_path and time.monotonic() - self._last_prom >= PROM_INTERVAL:
+            self.write_prometheus()
+
+    def summary(self):
+        """{stage: {calls, seconds, items, items_per_second, ...}} with labels folded into the key."""
+        with self._lock:
+            out = {}
+            for (name, labels), s in self._stats.items():
+                key = name + "".join(f"[{k}={v}]" for k, v in labels)
+                out[key] = {**{k: v for k, v in s.items() if k != "extra"}, **s["extra"],
+                            "items_per_second": s["items"] / s["seconds"] if s["seconds"] else None}
+            return out
+
+    def write_prometheus(self, path=None):
+        path = path or self.prom_path
+        # forked workers (process pools) only contribute JSON lines
+        if not path or multiprocessing.parent_process() is not None:
+            return
+        series = {}
+        with self._lock:
+            self._last_prom = time.monotonic()
+            for (name, labels), s in self._stats.items():
+                label_str = ",".join(f'{k}="{v}"' for k, v in (("stage", name),) + labels)
+                values = [("calls_total", s["calls"]), ("errors_total", s["errors"]),
+                          ("seconds_total", s["seconds"]), ("max_seconds", s["max_seconds"]),
+                          ("items_total", s["items"]), ("batch_size", s["batch_size"])]
+                values += [(f"{k}_total", v) for k, v in s["extra"].items()]
+                for metric, value in values:
+                    series.setdefault(metric, []).append(f"ppt_stage_{metric}{{{label_str}}} {value}")
+
+        lines = []
+        for metric, rows in series.items():
+            kind = "gauge" if metric in ("max_seconds", "batch_size") else "counter"
+            lines.append(f"# TYPE ppt_stage_{metric} {kind}")
+            lines.extend(rows)
+
+        # write-then-rename so the collector never reads a half-written file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+
+_default = StageMetrics(os.environ.get(JSONL_ENV), os.environ.get(PROM_ENV))
+atexit.register(_default.write_prometheus)
+
+def configure(jsonl_path=None, prom_path=None):
+    """Sets output targets at runtime (overrides the environment variables)."""
+    _default.jsonl_path = jsonl_path or _default.jsonl_path
+    _default.prom_path = prom_path or _default.prom_path
+
+stage = _default.stage
+record = _default.record
+summary = _default.summary
+write_prometheus = _default.write_prometheus
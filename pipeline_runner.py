@@ -0,0 +1,522 @@
+import os
+import sys
+import csv
+import json
+import time
+import queue
+import sqlite3
+import logging
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Base directory (folder where this script exists)
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.append(str(BASE_DIR / "ragpptxx"))
+sys.path.append(str(BASE_DIR / "scripts"))
+
+from embeddings import ChunkEmbedder, EmbeddingCache, ExactIndex
+from embeddings.cache import default_cache_path as default_embed_cache_path
+from embeddings.exact_index import default_index_path
+from embeddings.embedder import add_embedder_arguments, embedder_options
+from evaluation import IdeaEvaluator, LLMResponseCache, DeadLetterQueue, LLMUnavailableError
+from evaluation.llm_cache import default_cache_path as default_llm_cache_path
+from evaluation.resilience import default_dead_letter_path
+from manifest import IngestManifest, default_manifest_path
+from ingestion import collect_jobs, store_decks, _process_job, _ppt_id
+from metrics import stage
+
+SCORES_FILE = BASE_DIR / "scores.csv"   # what ranking.py reads
+STATE_FILE = BASE_DIR / "pipeline_state.sqlite"
+
+logging.basicConfig(
+    filename=BASE_DIR / "pipeline.log",
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(message)s"
+)
+
+_END = object()
+
+class RunState:
+    """Per-deck stage completion: one row per (ppt_id, week, stage).
+
+    Stages are "ingested", "evaluated" (with the full result JSON) and
+    "scored". A re-run skips every stage already recorded for a deck.
+    """
+
+    def __init__(self, path=STATE_FILE):
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stages ("
+            " ppt_id TEXT NOT NULL, week INTEGER NOT NULL, stage TEXT NOT NULL, result TEXT,"
+            " completed_at REAL NOT NULL, PRIMARY KEY (ppt_id, week, stage))"
+        )
+        self._conn.commit()
+
+    def completed(self) -> dict:
+        """{(ppt_id, week): {stage: result}}"""
+        out = {}
+        with self._lock:
+            for ppt_id, week, name, result in self._conn.execute("SELECT ppt_id, week, stage, result FROM stages"):
+                out.setdefault((ppt_id, week), {})[name] = json.loads(result) if result else None
+        return out
+
+    def mark(self, keys, name, results=None):
+        """Records stage `name` for every (ppt_id, week) in `keys`, in one transaction."""
+        results = results or [None] * len(keys)
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?, ?)",
+                [(ppt_id, week, name, json.dumps(r) if r is not None else None, now)
+                 for (ppt_id, week), r in zip(keys, results)]
+            )
+            self._conn.commit()
+
+    def reset(self, ppt_id, week):
+        with self._lock:
+            self._conn.execute("DELETE FROM stages WHERE ppt_id = ? AND week = ?", (ppt_id, week))
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+class _Channel:
+    """Bounded queue between two stages. put() blocks when full (backpressure);
+    once every producer is done, each consumer receives one end marker."""
+
+    def __init__(self, maxsize, producers, consumers):
+        self._queue = queue.Queue(maxsize)
+        self._producers = producers
+        self._consumers = consumers
+        self._lock = threading.Lock()
+
+    def put(self, item):
+        self._queue.put(item)
+
+    def get_nowait(self):
+        return self._queue.get_nowait()
+
+    def producer_done(self):
+        with self._lock:
+            self._producers -= 1
+            last = self._producers == 0
+        if last:
+            for _ in range(self._consumers):
+                self._queue.put(_END)
+
+    def __iter__(self):
+        while (item := self._queue.get()) is not _END:
+            yield item
+
+class _WeekGate:
+    """Holds decks back from evaluation until every deck of their week has been
+    ingested (or has failed), so uniqueness compares each deck against the whole
+    week, exactly as an ingest-then-evaluate run does. Weeks not in `expected`
+    (nothing left to ingest) pass straight through."""
+
+    def __init__(self, channel, expected: dict):
+        self._channel = channel
+        self._left = dict(expected)  # week -> decks still to ingest
+        self._held = {}
+        self._lock = threading.Lock()
+
+    def put(self, key):
+        with self._lock:
+            if self._left.get(key[1], 0) > 0:
+                self._held.setdefault(key[1], []).append(key)
+                return
+        self._channel.put(key)
+
+    def ingested(self, week):
+        """One deck of `week` left the ingest path (stored or failed)."""
+        with self._lock:
+            if week not in self._left:
+                return
+            self._left[week] -= 1
+            release = self._held.pop(week, []) if self._left[week] <= 0 else []
+        for key in release:
+            self._channel.put(key)
+
+    def release_all(self):
+        with self._lock:
+            held = [key for keys in self._held.values() for key in keys]
+            self._held.clear()
+            self._left.clear()
+        for key in held:
+            self._channel.put(key)
+
+class PipelineRun:
+    """What the stages of one run share: resources, the bounded channels between
+    the stages, the week gate, counters and failures.
+
+    Stage functions below take a PipelineRun, so each one can be driven on its own.
+    """
+
+    def __init__(self, state, evaluator=None, embedder=None, index=None, manifest=None, dlq=None,
+                 queue_size=32, parse_workers=1, eval_workers=1, expected=None):
+        self.state = state
+        self.evaluator = evaluator
+        self.store = evaluator.store if evaluator is not None else None
+        self.embedder = embedder
+        self.index = index
+        self.manifest = manifest
+        self.dlq = dlq
+        self.eval_workers = eval_workers
+        self.parse_ch = _Channel(queue_size, producers=1, consumers=parse_workers)
+        self.ingest_ch = _Channel(queue_size, producers=parse_workers, consumers=1)
+        self.eval_ch = _Channel(queue_size, producers=2, consumers=eval_workers)          # feeder + ingest
+        self.score_ch = _Channel(queue_size, producers=1 + eval_workers, consumers=1)     # feeder + evaluators
+        self.gate = _WeekGate(self.eval_ch, expected or {})
+        self.fingerprints, self.changed = {}, {}  # pdf_path -> manifest fingerprint / previous ppt_id
+        self.failures = {}
+        self.counts = {"ingested": 0, "evaluated": 0, "scored": 0}
+        self.parked = []  # keys dead-lettered by an LLM outage
+        self.total = 0
+        self.lock = threading.Lock()
+        self._evaluators_left = eval_workers
+
+    def fail(self, key, stage_name, error):
+        self.failures[key[0]] = f"{stage_name}: {error}"
+        print(f"[ERROR] {key[0]} ({stage_name}): {error}")
+        logging.error(f"{key[0]} failed at {stage_name}: {error}")
+
+    def count(self, name, n=1) -> int:
+        with self.lock:
+            self.counts[name] += n
+            return self.counts[name]
+
+    def evaluator_done(self) -> bool:
+        """True for the last evaluator worker to finish."""
+        with self.lock:
+            self._evaluators_left -= 1
+            return self._evaluators_left == 0
+
+def plan_run(run, jobs):
+    """Decides per deck which stage to start from. Returns (to_parse, to_evaluate, to_score, skipped);
+    fingerprints and previous ppt_ids of changed files are kept on `run` for the ingest stage."""
+    done = run.state.completed()
+    to_parse, to_evaluate, to_score = [], [], []
+    skipped = 0
+    for job in jobs:
+        pdf_path, _, week = job
+        key = (_ppt_id(pdf_path), week)
+        status = "new"
+        if run.manifest and os.path.exists(pdf_path):
+            status, run.fingerprints[pdf_path], previous_ppt_id = run.manifest.check(pdf_path, week)
+            if status == "changed":
+                run.changed[pdf_path] = previous_ppt_id
+                run.state.reset(*key)
+        stages = {} if status == "changed" else done.get(key, {})
+
+        if "scored" in stages:
+            skipped += 1
+        elif "evaluated" in stages:
+            to_score.append((key, stages["evaluated"]))
+        elif "ingested" in stages or status == "unchanged":
+            to_evaluate.append(key)
+        else:
+            to_parse.append(job)
+    return to_parse, to_evaluate, to_score, skipped
+
+def feed(channel, items):
+    """Resumed decks enter at their first unfinished stage, one feeder per entry point."""
+    try:
+        for item in items:
+            channel.put(item)
+    finally:
+        channel.producer_done()
+
+def feed_evaluate(run, keys):
+    """Already-ingested decks wait for their week like freshly stored ones."""
+    try:
+        for key in keys:
+            run.gate.put(key)
+    finally:
+        run.eval_ch.producer_done()
+
+def parse_stage(run, pool):
+    """Parser thread: keeps one deck in flight on the process pool."""
+    try:
+        for job in run.parse_ch:
+            pdf_path, doc_chunks, error = pool.submit(_process_job, job).result()
+            key = (_ppt_id(pdf_path), job[2])
+            if error or not doc_chunks:
+                run.fail(key, "parse", error or "No chunks extracted")
+                run.gate.ingested(key[1])
+                continue
+            run.ingest_ch.put((pdf_path, doc_chunks))
+    finally:
+        run.ingest_ch.producer_done()
+
+def ingest_batch(run, batch):
+    """Stores a micro-batch of parsed decks and passes the stored ones on towards evaluation."""
+    decks = [(path, doc_chunks, run.fingerprints.get(path), run.changed.get(path)) for path, doc_chunks in batch]
+    try:
+        _, errors = store_decks(decks, run.store, run.embedder, run.index, run.manifest)
+    except Exception as e:
+        errors = {path: f"{type(e).__name__}: {e}" for path, _ in batch}
+    stored = []
+    for path, doc_chunks in batch:
+        key = (doc_chunks[0]["ppt_id"], doc_chunks[0]["week"])
+        if path in errors:
+            run.fail(key, "ingest", errors[path])
+            run.gate.ingested(key[1])
+        else:
+            stored.append(key)
+    if not stored:
+        return
+    run.state.mark(stored, "ingested")
+    run.count("ingested", len(stored))
+    for key in stored:
+        run.gate.put(key)
+        run.gate.ingested(key[1])
+
+def ingest_stage(run, embed_batch):
+    """Ingest thread: whatever is already queued (up to embed_batch decks) is embedded together."""
+    try:
+        for first in run.ingest_ch:
+            batch, finished = [first], False
+            while len(batch) < embed_batch:
+                try:
+                    item = run.ingest_ch.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _END:
+                    finished = True
+                    break
+                batch.append(item)
+            ingest_batch(run, batch)
+            if finished:
+                break
+    finally:
+        run.gate.release_all()  # nothing left to ingest: never hold a deck back past this point
+        run.eval_ch.producer_done()
+
+def evaluate_one(run, key):
+    try:
+        result = run.evaluator.evaluate(key[0])
+    except LLMUnavailableError as e:
+        with run.lock:
+            run.parked.append(key)
+        if run.dlq:
+            run.dlq.add(key[0], key[1], str(e))
+        return
+    except Exception as e:
+        run.fail(key, "evaluate", f"{type(e).__name__}: {e}")
+        return
+    run.state.mark([key], "evaluated", [result])
+    if run.dlq:
+        run.dlq.remove(*key)
+    run.count("evaluated")
+    run.score_ch.put((key, result))
+
+def retry_dead_letters(run, recovery_wait):
+    """Re-evaluates parked decks whenever Ollama answers again, until none are left
+    or `recovery_wait` seconds have passed (decks still failing then stay parked)."""
+    deadline = time.monotonic() + recovery_wait
+    while run.parked:
+        print(f"Ollama unavailable: {len(run.parked)} decks dead-lettered; "
+              f"waiting up to {max(0, deadline - time.monotonic()):.0f}s for it to recover.")
+        if not run.evaluator.wait_for_recovery(deadline - time.monotonic()):
+            logging.warning(f"Ollama did not recover; {len(run.parked)} decks left in the dead-letter queue")
+            return
+        with run.lock:
+            retry = run.parked[:]
+            run.parked.clear()
+        logging.info(f"Ollama recovered; re-evaluating {len(retry)} dead-lettered decks")
+        with ThreadPoolExecutor(max_workers=run.eval_workers) as retry_pool:
+            list(retry_pool.map(lambda key: evaluate_one(run, key), retry))
+        # a deck can keep failing while Ollama answers health checks: stop at the deadline
+        if run.parked and time.monotonic() >= deadline:
+            logging.warning(f"{len(run.parked)} decks still failing; left in the dead-letter queue")
+            return
+
+def evaluate_stage(run, recovery_wait):
+    """Evaluator thread; the last one out retries the dead letters while the scorer is still open."""
+    try:
+        for key in run.eval_ch:
+            evaluate_one(run, key)
+        if run.evaluator_done():
+            retry_dead_letters(run, recovery_wait)
+    finally:
+        run.score_ch.producer_done()
+
+def score_stage(run, scores_path):
+    """Scorer thread: appends (id, score) rows to `scores_path` and marks decks scored."""
+    scores_file = Path(scores_path)
+    current = None
+    try:
+        new_file = not scores_file.exists() or scores_file.stat().st_size == 0
+        with open(scores_file, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(["id", "score"])
+            for current, result in run.score_ch:
+                # scores.csv first: a crash in between re-scores the deck (ranking dedups ids)
+                writer.writerow([current[0], result["total_score"]])
+                f.flush()
+                run.state.mark([current], "scored")
+                scored = run.count("scored")
+                print(f"[{scored}/{run.total}] {current[0]}: {result['total_score']}")
+                current = None
+    except Exception as e:
+        # Keep consuming so evaluators never block on a full queue; the decks stay
+        # "evaluated" and are scored by the next run
+        error = f"{type(e).__name__}: {e}"
+        logging.error(f"Scorer failed, no more decks are scored this run: {error}")
+        if current is not None:
+            run.fail(current, "score", error)
+        for key, _ in run.score_ch:
+            run.fail(key, "score", error)
+
+def run_pipeline(jobs, *, parse_workers=4, eval_workers=4, llm_concurrency=8, queue_size=32, embed_batch=64,
+                 model="tinyllama:latest", ollama_url="http://localhost:11434", state_path=STATE_FILE,
+                 embed_cache=default_embed_cache_path(), llm_cache=default_llm_cache_path(),
+                 manifest_path=default_manifest_path(), exact_index=default_index_path(), rank=True,
+                 dead_letters=default_dead_letter_path(), recovery_wait=600.0, eager_evaluate=False,
+                 scores_path=SCORES_FILE, embed_options=None) -> dict:
+    """Streams decks through parse -> embed/upsert -> evaluate -> scores.csv.
+
+    Stages run concurrently, connected by bounded queues. A week's decks are
+    evaluated once all of that week has been stored, so uniqueness scores do not
+    depend on ingest order; later weeks keep ingesting meanwhile. `eager_evaluate`
+    evaluates each deck as soon as it is stored instead (faster, but a deck is only
+    compared against the decks stored before it). Each stage has its own worker
+    count; completion is recorded per deck so an interrupted run resumes where it
+    stopped. Ranking and the results store are updated once the queues drain
+    (only when writing the default scores.csv, the file ranking.py reads).
+
+    Decks that fail because Ollama is unavailable go to the dead-letter queue
+    instead of being scored 0; once every deck has passed the evaluate stage they
+    are re-evaluated as soon as Ollama answers again (up to `recovery_wait` s).
+    """
+    state = RunState(state_path)
+    # One index object: rows added by ingest_batch are seen by the evaluator's similarity queries
+    index = ExactIndex.open_if_exists(exact_index)
+    embedder = ChunkEmbedder(cache=EmbeddingCache(embed_cache) if embed_cache else None, **(embed_options or {}))
+    evaluator = IdeaEvaluator(model=model, ollama_url=ollama_url, concurrency=llm_concurrency,
+                              response_cache=LLMResponseCache(llm_cache) if llm_cache else None,
+                              similarity_index=index, strict=True, embedder=embedder)
+    run = PipelineRun(state, evaluator, embedder, index=index,
+                      manifest=IngestManifest(manifest_path) if manifest_path else None,
+                      dlq=DeadLetterQueue(dead_letters) if dead_letters else None,
+                      queue_size=queue_size, parse_workers=parse_workers, eval_workers=eval_workers)
+
+    # 1. Plan: decide per deck which stage to start from
+    to_parse, to_evaluate, to_score, skipped = plan_run(run, jobs)
+    run.total = len(to_score) + len(to_evaluate) + len(to_parse)
+    print(f"{len(jobs)} decks: {skipped} done, {len(to_score)} to score, "
+          f"{len(to_evaluate)} to evaluate, {len(to_parse)} to parse.")
+    logging.info(f"Pipeline run started: {len(to_parse)} to parse, {len(to_evaluate)} to evaluate, "
+                 f"{len(to_score)} to score, {skipped} skipped")
+    if not eager_evaluate:
+        expected = {}
+        for job in to_parse:
+            expected[job[2]] = expected.get(job[2], 0) + 1
+        run.gate = _WeekGate(run.eval_ch, expected)
+
+    # 2. One thread per stage worker, connected by the run's bounded channels
+    pool = ProcessPoolExecutor(max_workers=parse_workers)
+    threads = [threading.Thread(target=feed, args=(run.parse_ch, to_parse), name="feed-parse", daemon=True),
+               threading.Thread(target=feed_evaluate, args=(run, to_evaluate), name="feed-evaluate", daemon=True),
+               threading.Thread(target=feed, args=(run.score_ch, to_score), name="feed-score", daemon=True),
+               threading.Thread(target=ingest_stage, args=(run, embed_batch), name="ingest", daemon=True),
+               threading.Thread(target=score_stage, args=(run, scores_path), name="score", daemon=True)]
+    threads += [threading.Thread(target=parse_stage, args=(run, pool), name=f"parse-{i}", daemon=True)
+                for i in range(parse_workers)]
+    threads += [threading.Thread(target=evaluate_stage, args=(run, recovery_wait), name=f"evaluate-{i}", daemon=True)
+                for i in range(eval_workers)]
+
+    try:
+        with stage("pipeline_run", items=len(jobs)):
+            for t in threads:
+                t.start()
+            for t in threads:
+                while t.is_alive():
+                    t.join(timeout=0.5)  # short joins keep Ctrl-C responsive
+    except KeyboardInterrupt:
+        print(f"Interrupted. {run.counts['scored']} decks scored this run; re-run to resume.")
+        logging.info("Pipeline run interrupted")
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    state.close()
+    if run.dlq:
+        run.dlq.close()
+
+    # 3. Whole-set stages once every deck has been scored
+    if rank and Path(scores_path).resolve() == SCORES_FILE.resolve() and SCORES_FILE.exists():
+        import ranking
+        import results_writer
+        ranking.rank_results_streaming()
+        results_writer.write_results()
+
+    logging.info(f"Pipeline run completed: {run.counts}, {len(run.failures)} failures, "
+                 f"{len(run.parked)} dead-lettered")
+    return {"decks": len(jobs), "skipped": skipped, **run.counts, "failures": run.failures,
+            "dead_lettered": [key[0] for key in run.parked]}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipelined ingest -> evaluate -> rank -> results run")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", help="Folder of PDFs")
+    source.add_argument("--manifest", help="CSV with file,team,week columns")
+    parser.add_argument("--team")
+    parser.add_argument("--week", type=int)
+    parser.add_argument("--parse-workers", type=int, default=4, help="Parser processes")
+    parser.add_argument("--eval-workers", type=int, default=4, help="Decks evaluated in parallel")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="Max in-flight LLM calls overall")
+    parser.add_argument("--queue-size", type=int, default=32, help="Capacity of each inter-stage queue")
+    parser.add_argument("--embed-batch", type=int, default=64, help="Max decks embedded/upserted together")
+    parser.add_argument("--model", default="tinyllama:latest", help="Ollama model to use")
+    parser.add_argument("--ollama-url", default="http://localhost:11434", help="Ollama base URL")
+    parser.add_argument("--state", default=str(STATE_FILE), help="Stage completion database")
+    parser.add_argument("--scores", default=str(SCORES_FILE),
+                        help="Output CSV (id,score), appended to; ranking only runs on the default scores.csv")
+    parser.add_argument("--no-embed-cache", action="store_true", help="Always run the embedding model")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call the model")
+    parser.add_argument("--no-manifest-db", action="store_true", help="Ignore file fingerprints")
+    parser.add_argument("--no-rank", action="store_true", help="Skip ranking.py / results_writer.py at the end")
+    add_embedder_arguments(parser)
+    parser.add_argument("--dead-letters", default=default_dead_letter_path(),
+                        help="Dead-letter queue of decks not evaluated because Ollama was down")
+    parser.add_argument("--recovery-wait", type=float, default=600.0,
+                        help="Seconds to wait for Ollama to recover before leaving decks in the dead-letter queue")
+    parser.add_argument("--eager-evaluate", action="store_true",
+                        help="Evaluate each deck as soon as it is stored (uniqueness then depends on ingest order)")
+    args = parser.parse_args()
+
+    duplicates = {}
+    try:
+        summary = run_pipeline(
+            collect_jobs(args.dir, args.manifest, args.team, args.week, failures=duplicates),
+            parse_workers=args.parse_workers,
+            eval_workers=args.eval_workers,
+            llm_concurrency=args.llm_concurrency,
+            queue_size=args.queue_size,
+            embed_batch=args.embed_batch,
+            model=args.model,
+            ollama_url=args.ollama_url,
+            state_path=args.state,
+            embed_cache=None if args.no_embed_cache else default_embed_cache_path(),
+            llm_cache=None if args.no_llm_cache else default_llm_cache_path(),
+            manifest_path=None if args.no_manifest_db else default_manifest_path(),
+            rank=not args.no_rank,
+            dead_letters=args.dead_letters,
+            recovery_wait=args.recovery_wait,
+            eager_evaluate=args.eager_evaluate,
+            scores_path=args.scores,
+            embed_options=embedder_options(args),
+        )
+    except KeyboardInterrupt:
+        sys.exit(130)
+    print(f"Scored {summary['scored']} decks ({summary['skipped']} already done); "
+          f"{len(summary['failures'])} failed.")
+    for ppt_id, error in {**duplicates, **summary["failures"]}.items():
+        print(f"[ERROR] {ppt_id}: {error}")
+    if summary["dead_lettered"]:
+        print(f"{len(summary['dead_lettered'])} decks left in the dead-letter queue ({args.dead_letters}); "
+              f"re-run once Ollama is up.")
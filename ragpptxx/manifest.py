@@ -0,0 +1,83 @@
+# manifest.py
+import os
+import time
+import sqlite3
+import threading
+import hashlib
+
+def default_manifest_path():
+    """<project_root>/ingest_manifest.sqlite"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, "ingest_manifest.sqlite")
+
+def file_sha256(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            h.update(block)
+    return h.hexdigest()
+
+class IngestManifest:
+    """Remembers which files were ingested for which week.
+
+    One row per (path, week) with size, mtime and content hash. A file whose
+    size and mtime are unchanged costs a single stat; otherwise it is hashed and
+    only treated as changed if the content differs.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_manifest_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT NOT NULL, week INTEGER NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " sha256 TEXT NOT NULL, ppt_id TEXT NOT NULL, team_name TEXT, ingested_at REAL NOT NULL,"
+            " PRIMARY KEY (path, week))"
+        )
+        self._conn.commit()
+
+    def check(self, pdf_path, week):
+        """Returns (status, fingerprint, previous_ppt_id); status is "new", "changed" or "unchanged".
+
+        `fingerprint` is passed back to record() after a successful ingestion.
+        """
+        key = os.path.abspath(pdf_path)
+        st = os.stat(pdf_path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, sha256, ppt_id FROM files WHERE path = ? AND week = ?", (key, week)
+            ).fetchone()
+
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return "unchanged", (st.st_size, st.st_mtime_ns, row[2]), row[3]
+
+        digest = file_sha256(pdf_path)
+        fingerprint = (st.st_size, st.st_mtime_ns, digest)
+        if row is None:
+            return "new", fingerprint, None
+        if row[2] == digest:
+            # touched but identical: refresh stat so the next run is a single stat again
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE files SET size = ?, mtime_ns = ? WHERE path = ? AND week = ?",
+                    (st.st_size, st.st_mtime_ns, key, week)
+                )
+                self._conn.commit()
+            return "unchanged", fingerprint, row[3]
+        return "changed", fingerprint, row[3]
+
+    def record(self, pdf_path, week, fingerprint, ppt_id, team_name=""):
+        self.record_many([(pdf_path, week, fingerprint, ppt_id, team_name)])
+
+    def record_many(self, entries):
+        """entries: iterable of (pdf_path, week, fingerprint, ppt_id, team_name); one transaction."""
+        now = time.time()
+        rows = [(os.path.abspath(path), week, size, mtime_ns, digest, ppt_id, team_name, now)
+                for path, week, (size, mtime_ns, digest), ppt_id, team_name in entries]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
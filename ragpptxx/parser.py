@@ -1,12 +1,19 @@
 # parser.py
 import fitz  # PyMuPDF
+from concurrent.futures import ProcessPoolExecutor
 
-def extract_text(pdf_path):
+# Plain text only (no image blocks); pinned so PyMuPDF default changes can't alter section text
+TEXT_FLAGS = fitz.TEXTFLAGS_TEXT
+
+# Decks longer than this are split into shards when page workers are requested
+PAGES_PER_SHARD = 25
+
+def _extract_range(pdf_path, start, stop):
     pages = []
     doc = fitz.open(pdf_path)
 
-    for i, page in enumerate(doc):
-        text = page.get_text()
+    for i in range(start, stop):
+        text = doc[i].get_text("text", flags=TEXT_FLAGS)
         if text:
             pages.append({
                 "page": i + 1,
@@ -15,3 +22,41 @@ def extract_text(pdf_path):
 
     doc.close()
     return pages
+
+def iter_pages(pdf_path, workers=None):
+    """Yields {"page", "text"} one page at a time, in page order.
+
+    With `workers` > 1, decks longer than PAGES_PER_SHARD are split into page
+    ranges extracted by worker processes. Closing the generator early (e.g.
+    once the needed sections are found) stops reading the remaining pages.
+    """
+    doc = fitz.open(pdf_path)
+    page_count = doc.page_count
+
+    if not workers or workers <= 1 or page_count <= PAGES_PER_SHARD:
+        try:
+            for i, page in enumerate(doc):
+                text = page.get_text("text", flags=TEXT_FLAGS)
+                if text:
+                    yield {
+                        "page": i + 1,
+                        "text": text
+                    }
+        finally:
+            doc.close()
+        return
+
+    doc.close()
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [
+            pool.submit(_extract_range, pdf_path, start, min(start + PAGES_PER_SHARD, page_count))
+            for start in range(0, page_count, PAGES_PER_SHARD)
+        ]
+        for future in futures:
+            yield from future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def extract_text(pdf_path, workers=None):
+    return list(iter_pages(pdf_path, workers=workers))
@@ -1,9 +1,16 @@
 # pipeline.py
 import os
-from parser import extract_text
+import time
+from parser import iter_pages
 from template_extractor import extract_sections
 from validator import validate_chunk
 
+try:
+    from metrics import record
+except ImportError:  # metrics.py lives at the project root, which may not be on sys.path
+    def record(*args, **kwargs):
+        pass
+
 SECTIONS = [
     "idea_problem",
     "solution_approach",
@@ -12,21 +19,55 @@ SECTIONS = [
     "team_capability"
 ]
 
-def process_document(pdf_path, team_name, week):
-    # TEXT EXTRACTION
-    pages = extract_text(pdf_path)
-
-    #  EXTRACTED TEXT
+def _echo(pages):
     print("\n=== EXTRACTED TEXT ===")
     for p in pages:
         print(f"\n--- Page {p['page']} ---")
         print(p["text"]) 
+        yield p
+
+def _timed(pages, timing):
+    # parsing and extraction interleave; time spent producing pages is parse time
+    while True:
+        start = time.perf_counter()
+        try:
+            page = next(pages)
+        except StopIteration:
+            timing["seconds"] += time.perf_counter() - start
+            return
+        timing["seconds"] += time.perf_counter() - start
+        timing["pages"] += 1
+        yield page
+
+def process_document(pdf_path, team_name, week, verbose=True, required_sections=None, page_workers=None):
+    """Builds the five section chunks of a deck.
+
+    verbose:           echo every extracted page to stdout
+    required_sections: stop reading pages once these sections are found
+                       (e.g. ["idea_problem"]); every section, the required
+                       ones included, may then be truncated
+    page_workers:      shard very large decks across worker processes
+    """
+    # TEXT EXTRACTION (streamed page by page)
+    raw_pages = iter_pages(pdf_path, workers=page_workers)
+    timing = {"seconds": 0.0, "pages": 0}
+    pages = _timed(raw_pages, timing)
+
+    #  EXTRACTED TEXT
+    if verbose:
+        pages = _echo(pages)
 
     # 2️⃣ METADATA
     ppt_id = os.path.splitext(os.path.basename(pdf_path))[0]
 
     # 3️⃣ TEMPLATE-BASED SECTION EXTRACTION
-    section_texts, page_map = extract_sections(pages)
+    start = time.perf_counter()
+    try:
+        section_texts, page_map = extract_sections(pages, required=required_sections)
+    finally:
+        raw_pages.close()
+    record("parse", timing["seconds"], items=timing["pages"])
+    record("extract", time.perf_counter() - start - timing["seconds"], items=timing["pages"])
 
     # 4️⃣ CHUNK CREATION
     chunks = []
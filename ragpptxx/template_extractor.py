@@ -1,26 +1,74 @@
 # template_extractor.py
 import re
+from functools import lru_cache
 from templates import SECTION_TEMPLATES
 
-def extract_sections(pages):
-    section_texts = {}
-    page_map = {}
+SECTIONS = tuple(SECTION_TEMPLATES)
 
-    # initialize
-    for section in SECTION_TEMPLATES:
-        section_texts[section] = ""
-        page_map[section] = []
+@lru_cache(maxsize=None)
+def _matcher(sections):
+    # one alternation, one named group per section: (?P<idea_problem>p1|p2)|(?P<...>...)
+    return re.compile("|".join(
+        f"(?P<{section}>{'|'.join(f'(?:{p})' for p in SECTION_TEMPLATES[section])})"
+        for section in sections
+    ))
+
+# compiled once at import; subsets are compiled lazily and cached
+_matcher(SECTIONS)
+
+def classify_page(text):
+    """Returns the set of sections whose patterns match `text` (already lowercased).
+
+    Scans the page with a single compiled alternation. Matches consume text, so a
+    section whose only hit overlaps an earlier match is re-checked by a scan
+    restricted to the sections still missing; a scan with no hits is conclusive.
+    """
+    found = set()
+    remaining = SECTIONS
+
+    while remaining:
+        hits = set()
+        for m in _matcher(remaining).finditer(text):
+            hits.add(m.lastgroup)
+            if len(hits) == len(remaining):
+                break
+
+        if not hits:
+            break
+        found |= hits
+        remaining = tuple(s for s in remaining if s not in hits)
+
+    return found
+
+def extract_sections(pages, required=None):
+    """Groups page text by section. `pages` may be any iterable (e.g. a page
+    generator); with `required`, iteration stops as soon as every required
+    section has matched at least one page, so later pages are never read.
+
+    Ingestion concatenates every matching page, so with `required` any section,
+    the required ones included, may be truncated: a later page matching a
+    required section is dropped. Leave it unset wherever the text must match
+    what is stored (e.g. similarity checks against ingested decks)."""
+    section_parts = {section: [] for section in SECTION_TEMPLATES}
+    page_map = {section: [] for section in SECTION_TEMPLATES}
+    missing = set(required) if required else None
 
     for page in pages:
         page_num = page["page"]
-        text = page["text"].lower()
-
-        for section, patterns in SECTION_TEMPLATES.items():
-            for pattern in patterns:
-                if re.search(pattern, text):
-                    section_texts[section] += page["text"] + "\n"
-                    page_map[section].append(page_num)
-                    break
+
+        for section in classify_page(page["text"].lower()):
+            section_parts[section].append(page["text"])
+            page_map[section].append(page_num)
+            if missing is not None:
+                missing.discard(section)
+
+        if missing is not None and not missing:
+            break
+
+    section_texts = {
+        section: "".join(t + "\n" for t in parts)
+        for section, parts in section_parts.items()
+    }
 
     # convert page list → range string
     page_range_map = {}
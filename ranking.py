@@ -1,6 +1,13 @@
 import pandas as pd
+import io
+import os
+import json
+import hashlib
+import heapq
 import logging
+import argparse
 from pathlib import Path
+from metrics import stage
 
 # Base directory (folder where this script exists)
 BASE_DIR = Path(__file__).parent
@@ -8,7 +15,9 @@ BASE_DIR = Path(__file__).parent
 # Paths
 INPUT_FILE = BASE_DIR / "scores.csv"
 OUTPUT_FILE = BASE_DIR / "ranked_results.csv"
+STATE_FILE = BASE_DIR / "ranking_state.json"
 TOP_N = 300
+CHUNK_SIZE = 100_000
 
 # Logger
 logging.basicConfig(
@@ -17,6 +26,7 @@ logging.basicConfig(
     format="%(asctime)s | %(levelname)s | %(message)s"
 )
 
+@stage("rank")
 def rank_results():
     logging.info("Starting ranking process")
 
@@ -45,8 +55,8 @@ def rank_results():
     after = len(df)
     logging.info(f"Removed {before - after} duplicate rows")
 
-    # Sort and select top N
-    df = df.sort_values(by="score", ascending=False)
+    # Sort and select top N; equal scores keep file order (the first row seen ranks first)
+    df = df.sort_values(by="score", ascending=False, kind="stable")
     top_df = df.head(TOP_N)
 
     # Save output
@@ -55,5 +65,171 @@ def rank_results():
 
     return OUTPUT_FILE
 
+class TopN:
+    """Bounded top-N by score, keeping the best score seen per id.
+
+    Ties go to the row pushed first: among equal scores it ranks higher and is
+    the last to be evicted, and a later row for the same id with the same score
+    is ignored. The result therefore matches a stable sort of the whole input,
+    however it was split into chunks.
+
+    Stale heap entries (superseded by a better score for the same id) are
+    skipped lazily and compacted once the heap grows past 2N.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.best = {}   # id -> (score, -seq, row)
+        self.heap = []   # (score, -seq, id); min-heap: lowest score, then latest row
+        self.seq = 0     # rows pushed so far
+
+    def _peek_min(self):
+        while self.heap:
+            score, neg_seq, key = self.heap[0]
+            if key in self.best and self.best[key][:2] == (score, neg_seq):
+                return score, key
+            heapq.heappop(self.heap)
+        return None
+
+    def push(self, key, score, row):
+        self.seq += 1
+        if key in self.best:
+            if score <= self.best[key][0]:
+                return
+        elif len(self.best) >= self.n:
+            min_score, min_key = self._peek_min()
+            if score <= min_score:  # a tie loses: the row already kept came first
+                return
+            heapq.heappop(self.heap)
+            del self.best[min_key]
+
+        self.best[key] = (score, -self.seq, row)
+        heapq.heappush(self.heap, (score, -self.seq, key))
+        if len(self.heap) > 2 * self.n:
+            self.heap = [(s, neg_seq, k) for k, (s, neg_seq, _) in self.best.items()]
+            heapq.heapify(self.heap)
+
+    def rows(self):
+        """Rows by score, highest first; equal scores in the order they were pushed."""
+        return [row for _, _, row in sorted(self.best.values(), key=lambda v: v[:2], reverse=True)]
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of the next `length` bytes of an open binary file."""
+
+    def __init__(self, f, length):
+        self.f = f
+        self.remaining = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self.remaining)
+        if n <= 0:
+            return 0
+        data = self.f.read(n)
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+def _last_line_end(f, start, size, block=64 * 1024):
+    """Offset just past the last newline in [start, size): a row still being
+    written is left for the next incremental run."""
+    pos = size
+    while pos > start:
+        read_from = max(start, pos - block)
+        f.seek(read_from)
+        idx = f.read(pos - read_from).rfind(b"\n")
+        if idx != -1:
+            return read_from + idx + 1
+        pos = read_from
+    return start
+
+def _prefix_fingerprint(f, offset, block=64 * 1024):
+    """Inode plus a hash of the first and last `block` bytes before `offset`
+    (the whole prefix when it is small): catches a scores.csv that was
+    rewritten or replaced and has since grown past the saved offset."""
+    h = hashlib.sha256()
+    for start in sorted({0, max(0, offset - block)}):
+        f.seek(start)
+        h.update(f.read(min(block, offset - start)))
+    return f"{os.fstat(f.fileno()).st_ino}:{h.hexdigest()}"
+
+def _push_frame(top, df):
+    for row in df.to_dict("records"):
+        top.push(str(row["id"]), float(row["score"]), row)
+
+@stage("rank", mode="streaming")
+def rank_results_streaming(chunksize=CHUNK_SIZE, incremental=True):
+    """Ranks scores.csv in O(TOP_N) memory.
+
+    Reads the CSV in chunks, keeps the best score per id in a bounded heap and
+    merges with the previous ranked_results.csv. With `incremental`, only rows
+    appended since the last run are read (offset kept in ranking_state.json,
+    with a fingerprint of the bytes before it; a mismatch means a full re-read).
+    Equal scores rank in scores.csv order: the previous results are pushed first,
+    in their ranked order, so they keep ties against rows appended after them.
+    """
+    logging.info("Starting streaming ranking process")
+
+    if not INPUT_FILE.exists():
+        logging.error(f"Input file not found: {INPUT_FILE}")
+        raise FileNotFoundError(f"{INPUT_FILE} not found")
+
+    size = INPUT_FILE.stat().st_size
+    if size == 0:
+        logging.error("Input file is empty")
+        raise ValueError("scores.csv is empty")
+
+    with open(INPUT_FILE, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+    columns = pd.read_csv(INPUT_FILE, nrows=0).columns.tolist()
+    if not {"id", "score"}.issubset(columns):
+        logging.error("Missing required columns in input file")
+        raise ValueError("scores.csv must contain 'id' and 'score' columns")
+
+    # Resume from the last offset unless the file was rewritten since
+    state = json.loads(STATE_FILE.read_text()) if incremental and STATE_FILE.exists() else {}
+    offset = data_start
+    top = TopN(TOP_N)
+    rows_read = 0
+    with open(INPUT_FILE, "rb") as f:
+        if state.get("header") == header.decode("utf-8", "replace") and data_start <= state.get("offset", 0) <= size \
+                and OUTPUT_FILE.exists() and OUTPUT_FILE.stat().st_size > 0:
+            if state.get("fingerprint") == _prefix_fingerprint(f, state["offset"]):
+                offset = state["offset"]
+                for prev in pd.read_csv(OUTPUT_FILE, chunksize=chunksize):
+                    _push_frame(top, prev)
+            else:
+                logging.info("scores.csv changed before the saved offset; re-reading it from the start")
+
+        end = _last_line_end(f, offset, size) if incremental else size
+        if end > offset:
+            f.seek(offset)
+            reader = io.TextIOWrapper(io.BufferedReader(_ByteRange(f, end - offset)), encoding="utf-8")
+            for chunk in pd.read_csv(reader, names=columns, header=None, chunksize=chunksize):
+                rows_read += len(chunk)
+                _push_frame(top, chunk)
+        else:
+            end = offset
+        fingerprint = _prefix_fingerprint(f, end)
+
+    top_df = pd.DataFrame(top.rows(), columns=columns)
+    top_df.to_csv(OUTPUT_FILE, index=False)
+    STATE_FILE.write_text(json.dumps({"header": header.decode("utf-8", "replace"), "offset": end,
+                                      "fingerprint": fingerprint}))
+    logging.info(f"Streaming ranking completed. Read {rows_read} new rows, saved top {len(top_df)} records")
+
+    return OUTPUT_FILE
+
 if __name__ == "__main__":
-    rank_results()
+    parser = argparse.ArgumentParser(description="Rank scores.csv into ranked_results.csv")
+    parser.add_argument("--stream", action="store_true", help="Chunked O(TOP_N)-memory ranking, best score per id")
+    parser.add_argument("--full", action="store_true", help="With --stream: re-read scores.csv from the start")
+    args = parser.parse_args()
+
+    if args.stream:
+        rank_results_streaming(incremental=not args.full)
+    else:
+        rank_results()
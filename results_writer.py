@@ -1,12 +1,19 @@
 import pandas as pd
+import os
+import json
+import time
+import sqlite3
 import logging
+import argparse
 from pathlib import Path
+from metrics import stage
 
 
 BASE_DIR = Path(__file__).parent
 
 
 INPUT_FILE = BASE_DIR / "ranked_results.csv"
+STORE_FILE = BASE_DIR / "final_results.sqlite"
 OUTPUT_FILE = BASE_DIR / "final_results.xlsx"
 
 logging.basicConfig(
@@ -15,8 +22,44 @@ logging.basicConfig(
     format="%(asctime)s | %(levelname)s | %(message)s"
 )
 
+def _connect(path=None):
+    """Append-only results store: one row per id, insertion order = rowid."""
+    conn = sqlite3.connect(path or STORE_FILE, timeout=30)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS results ("
+        " id TEXT PRIMARY KEY, score REAL, data TEXT NOT NULL, inserted_at REAL NOT NULL)"
+    )
+    return conn
+
+def _append_rows(conn, rows):
+    """Inserts rows whose id is not stored yet (existing rows win, as before). Returns count added;
+    every other row hit an id already in the store (or earlier in `rows`) and was skipped."""
+    before = conn.total_changes
+    now = time.time()
+    conn.executemany(
+        "INSERT OR IGNORE INTO results (id, score, data, inserted_at) VALUES (?, ?, ?, ?)",
+        [(str(r["id"]), r["score"], json.dumps(r, default=str), now) for r in rows]
+    )
+    conn.commit()
+    return conn.total_changes - before
+
+def _import_legacy_excel(conn):
+    """One-time migration of an existing final_results.xlsx into the store."""
+    if not OUTPUT_FILE.exists() or conn.execute("SELECT 1 FROM results LIMIT 1").fetchone():
+        return
+    from openpyxl import load_workbook
+
+    wb = load_workbook(OUTPUT_FILE, read_only=True)
+    rows = wb.active.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header:
+        added = _append_rows(conn, (dict(zip(header, values)) for values in rows))
+        logging.info(f"Imported {added} rows from existing {OUTPUT_FILE.name}")
+    wb.close()
+
+@stage("write")
 def write_results():
-    logging.info("Starting Excel writing process")
+    logging.info("Starting results writing process")
     if not INPUT_FILE.exists():
         logging.error(f"Input file not found: {INPUT_FILE}")
         raise FileNotFoundError(f"{INPUT_FILE} not found")
@@ -30,24 +73,62 @@ def write_results():
     if not required_columns.issubset(new_df.columns):
         logging.error("Missing required columns in ranked_results.csv")
         raise ValueError("ranked_results.csv must contain 'id' and 'score'")
-    if OUTPUT_FILE.exists():
-        existing_df = pd.read_excel(OUTPUT_FILE)
 
-        combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-        before = len(combined_df)
-        combined_df = combined_df.drop_duplicates(subset="id")
-        after = len(combined_df)
+    conn = _connect()
+    try:
+        _import_legacy_excel(conn)
+        added = _append_rows(conn, new_df.to_dict("records"))
+        total = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    finally:
+        conn.close()
+
+    logging.info(f"Skipped {len(new_df) - added} rows whose id is already in the results store")
+    logging.info(f"Results writing completed. Appended {added} records, total records: {total}")
 
-        logging.info(f"Removed {before - after} duplicate rows while appending")
+    return STORE_FILE
 
-    else:
-        combined_df = new_df
-        logging.info("Excel file does not exist. Creating new file")
-    combined_df.to_excel(OUTPUT_FILE, index=False)
-    logging.info(f"Excel writing completed. Total records: {len(combined_df)}")
+@stage("export_excel")
+def export_excel(output_file=None):
+    """Streams the results store into a write-only workbook (on demand)."""
+    from openpyxl import Workbook
 
-    return OUTPUT_FILE
+    output_file = output_file or OUTPUT_FILE
+    logging.info("Starting Excel export")
+    conn = _connect()
+    try:
+        # Pass 1: column order (id, score first, then any extra columns in first-seen order)
+        columns = ["id", "score"]
+        for (data,) in conn.execute("SELECT data FROM results ORDER BY rowid"):
+            for key in json.loads(data):
+                if key not in columns:
+                    columns.append(key)
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(columns)
+        total = 0
+        for (data,) in conn.execute("SELECT data FROM results ORDER BY rowid"):
+            row = json.loads(data)
+            ws.append([row.get(c) for c in columns])
+            total += 1
+    finally:
+        conn.close()
+
+    tmp_file = Path(f"{output_file}.tmp")
+    wb.save(tmp_file)
+    os.replace(tmp_file, output_file)
+    logging.info(f"Excel export completed. Total records: {total}")
+
+    return output_file
 
 
 if __name__ == "__main__":
-    write_results()
+    parser = argparse.ArgumentParser(description="Append ranked results to the results store")
+    parser.add_argument("--export-excel", action="store_true", help=f"Also export the store to {OUTPUT_FILE.name}")
+    parser.add_argument("--export-only", action="store_true", help="Only export; do not read ranked_results.csv")
+    args = parser.parse_args()
+
+    if not args.export_only:
+        write_results()
+    if args.export_excel or args.export_only:
+        export_excel()
@@ -0,0 +1,28 @@
+import os
+import sys
+import time
+import argparse
+
+# Setup import path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from embeddings import ExactIndex, open_store
+from embeddings.exact_index import default_index_path
+
+def build_index(path: str = None, dtype: str = "float32"):
+    """Rebuilds the exact idea_problem index from ChromaDB."""
+    start = time.perf_counter()
+    index = ExactIndex.rebuild(open_store(), path or default_index_path(), dtype=dtype)
+    print(f"Indexed {len(index)} idea_problem vectors ({dtype}, {index.nbytes() / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - start:.2f}s -> {index.path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="(Re)build the memory-mapped exact similarity index")
+    parser.add_argument("--path", default=default_index_path(), help="Index directory")
+    parser.add_argument("--dtype", choices=["float32", "float16", "int8"], default="float32",
+                        help="Vector storage; float16/int8 rescore their candidates with Chroma's float32 vectors")
+    args = parser.parse_args()
+
+    build_index(args.path, args.dtype)
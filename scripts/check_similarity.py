@@ -10,16 +10,20 @@ sys.path.append(project_root)
 sys.path.append(os.path.join(project_root, "ragpptxx"))
 
 from pipeline import process_document
-from embeddings import ChunkEmbedder, VectorStore, compute_internal_similarity
+from embeddings import (ChunkEmbedder, EmbeddingCache, ExactIndex, open_store,
+                        compute_internal_similarity, compute_internal_similarity_batch)
+from embeddings.cache import default_cache_path
+from embeddings.embedder import add_embedder_arguments, embedder_options
 
-def check_ppt_similarity(pdf_path: str, team_name: str, week: int):
+def check_ppt_similarity(pdf_path: str, team_name: str, week: int, embed_cache: str = default_cache_path(),
+                         exact_index: str = None, compare_weeks: list[int] = None, embed_options: dict = None):
     """Safe, read-only internal similarity check."""
     if not os.path.exists(pdf_path):
         print(json.dumps({"error": "File not found"}))
         return
 
     try:
-        chunks = process_document(pdf_path, team_name, week)
+        chunks = process_document(pdf_path, team_name, week, verbose=False)
     except Exception:
         print(json.dumps({"error": "Processing failed"}))
         return
@@ -39,11 +43,13 @@ def check_ppt_similarity(pdf_path: str, team_name: str, week: int):
 
     # Embed & Compute
     try:
-        embedder = ChunkEmbedder()
+        embedder = ChunkEmbedder(cache=EmbeddingCache(embed_cache) if embed_cache else None, **(embed_options or {}))
         embedding = embedder.embed([idea_chunk["text"]])[0]
         
-        store = VectorStore()
-        result = compute_internal_similarity(store, embedding, idea_chunk["ppt_id"])
+        store = open_store()
+        index = ExactIndex(exact_index) if exact_index else None
+        result = compute_internal_similarity(store, embedding, idea_chunk["ppt_id"], index=index,
+                                             weeks=compare_weeks)
         
         print("\n=== SIMILARITY RESULTS ===")
         print(json.dumps(result, indent=2))
@@ -56,11 +62,70 @@ def check_ppt_similarity(pdf_path: str, team_name: str, week: int):
             "error": "Computation failed"
         }, indent=2))
 
+def check_batch_similarity(pdf_paths: list[str], team_name: str, week: int,
+                           embed_cache: str = default_cache_path(), exact_index: str = None,
+                           compare_weeks: list[int] = None, embed_options: dict = None):
+    """Read-only similarity check for many decks: one embed call and one batched query."""
+    results, idea_chunks = {}, []
+    for pdf_path in pdf_paths:
+        if not os.path.exists(pdf_path):
+            results[pdf_path] = {"error": "File not found"}
+            continue
+        try:
+            chunks = process_document(pdf_path, team_name, week, verbose=False)
+        except Exception:
+            results[pdf_path] = {"error": "Processing failed"}
+            continue
+
+        idea_chunk = next((c for c in chunks if c["section"] == "idea_problem"), None)
+        if not idea_chunk or not idea_chunk["text"].strip() or idea_chunk["text"] == "[SECTION NOT PROVIDED]":
+            results[pdf_path] = {
+                "max_similarity": 0.0,
+                "avg_top5_similarity": 0.0,
+                "penalty": 0.0,
+                "similar_ppt_ids": []
+            }
+            continue
+        idea_chunks.append((pdf_path, idea_chunk))
+
+    if idea_chunks:
+        try:
+            embedder = ChunkEmbedder(cache=EmbeddingCache(embed_cache) if embed_cache else None,
+                                     **(embed_options or {}))
+            embeddings = embedder.embed([c["text"] for _, c in idea_chunks])
+
+            store = open_store()
+            index = ExactIndex(exact_index) if exact_index else None
+            batch = compute_internal_similarity_batch(
+                store, embeddings, [c["ppt_id"] for _, c in idea_chunks], index=index, weeks=compare_weeks
+            )
+            for (pdf_path, _), result in zip(idea_chunks, batch):
+                results[pdf_path] = result
+        except Exception:
+            for pdf_path, _ in idea_chunks:
+                results[pdf_path] = {"max_similarity": 0.0, "penalty": 0.0, "error": "Computation failed"}
+
+    print("\n=== SIMILARITY RESULTS ===")
+    print(json.dumps({p: results[p] for p in pdf_paths}, indent=2))
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--file", required=True)
+    parser.add_argument("--file", required=True, nargs="+", help="One or more PDFs (several = one batched query)")
     parser.add_argument("--team", required=True)
     parser.add_argument("--week", type=int, required=True)
+    parser.add_argument("--embed-cache", default=default_cache_path(), help="Embedding cache file")
+    parser.add_argument("--no-embed-cache", action="store_true", help="Always run the embedding model")
+    parser.add_argument("--exact-index", help="Query this exact index instead of Chroma")
+    parser.add_argument("--compare-weeks", type=int, nargs="+", help="Only compare against these weeks")
+    add_embedder_arguments(parser)
     args = parser.parse_args()
     
-    check_ppt_similarity(args.file, args.team, args.week)
+    embed_cache = None if args.no_embed_cache else args.embed_cache
+    if len(args.file) == 1:
+        check_ppt_similarity(args.file[0], args.team, args.week,
+                             embed_cache=embed_cache, exact_index=args.exact_index, compare_weeks=args.compare_weeks,
+                             embed_options=embedder_options(args))
+    else:
+        check_batch_similarity(args.file, args.team, args.week, embed_cache=embed_cache,
+                               exact_index=args.exact_index, compare_weeks=args.compare_weeks,
+                               embed_options=embedder_options(args))
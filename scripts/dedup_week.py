@@ -0,0 +1,40 @@
+import os
+import sys
+import json
+import argparse
+
+# Setup import path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from embeddings import open_store
+from embeddings.dedup import week_duplicate_report
+
+def run_dedup(week: int = None, k: int = 5, memory_mb: float = 256, output: str = None):
+    """Week-wide (or all-weeks) near-duplicate sweep over stored idea_problem vectors."""
+    report = week_duplicate_report(open_store(), week=week, k=k, memory_limit_mb=memory_mb)
+
+    scope = "all weeks" if week is None else f"week {week}"
+    print(f"{scope}: {len(report['decks'])} decks, "
+          f"{len(report['duplicate_clusters'])} duplicate clusters, "
+          f"{len(report['similar_clusters'])} similar clusters")
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {output}")
+    else:
+        print(json.dumps({key: report[key] for key in ("duplicate_clusters", "similar_clusters")}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="All-pairs near-duplicate clustering of idea_problem sections")
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--week", type=int)
+    scope.add_argument("--all-weeks", action="store_true")
+    parser.add_argument("--k", type=int, default=5, help="Neighbors reported per deck")
+    parser.add_argument("--memory-mb", type=float, default=256, help="Memory ceiling for similarity blocks")
+    parser.add_argument("--output", help="Write the full JSON report (per-deck neighbors) here")
+    args = parser.parse_args()
+
+    run_dedup(None if args.all_weeks else args.week, args.k, args.memory_mb, args.output)
@@ -0,0 +1,199 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Setup import path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, "ragpptxx"))
+
+from evaluation import IdeaEvaluator, LLMResponseCache, DeadLetterQueue, LLMUnavailableError
+from embeddings import ChunkEmbedder, ExactIndex
+from embeddings.embedder import add_embedder_arguments, embedder_options
+from evaluation.llm_cache import default_cache_path
+from evaluation.resilience import default_dead_letter_path
+
+SCORES_FILE = os.path.join(project_root, "scores.csv")
+
+def default_checkpoint_path(week: int) -> str:
+    return os.path.join(project_root, f"eval_week{week}.checkpoint.jsonl")
+
+def select_week_ppt_ids(store, week: int) -> list[str]:
+    """All ppt_ids ingested for `week` (one idea_problem chunk per deck)."""
+    results = store.collection.get(
+        where={"$and": [{"week": week}, {"section": "idea_problem"}]},
+        include=["metadatas"]
+    )
+    return sorted({m["ppt_id"] for m in results["metadatas"] if isinstance(m, dict)})
+
+def load_checkpoint(path: str) -> set:
+    """ppt_ids already evaluated. Tolerates a torn last line from a crash."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["ppt_id"])
+            except (json.JSONDecodeError, KeyError):
+                continue
+    return done
+
+def _open_scores(path: str):
+    """Opens scores.csv for appending, writing the id,score header if new."""
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    f = open(path, "a", newline="", encoding="utf-8")
+    writer = csv.writer(f)
+    if new_file:
+        writer.writerow(["id", "score"])
+        f.flush()
+    return f, writer
+
+def evaluate_week(week: int, *, model: str = "tinyllama:latest", ollama_url: str = "http://localhost:11434",
+                  workers: int = 4, llm_concurrency: int = 8,
+                  scores_path: str = SCORES_FILE, checkpoint_path: str = None,
+                  llm_cache: str = default_cache_path(), exact_index: str = None, num_ctx: int = 2048,
+                  stream: bool = True, combined: bool = False, dead_letters: str = default_dead_letter_path(),
+                  recovery_wait: float = 600.0, embed_options: dict = None) -> dict:
+    """Evaluates every deck of a week, resuming from the checkpoint.
+
+    Each finished deck is appended to the checkpoint (full result) and to
+    scores.csv (id,score) immediately, so an interrupted run loses at most the
+    decks that were in flight.
+
+    Decks that fail because Ollama is unavailable are never scored: they go to
+    the dead-letter queue (the circuit breaker makes the rest of the pass fail
+    fast) and are re-evaluated once Ollama answers again, waiting up to
+    `recovery_wait` seconds. Whatever is left is retried by the next run.
+    """
+    checkpoint_path = checkpoint_path or default_checkpoint_path(week)
+    evaluator = IdeaEvaluator(model=model, ollama_url=ollama_url, concurrency=llm_concurrency,
+                              response_cache=LLMResponseCache(llm_cache) if llm_cache else None,
+                              similarity_index=ExactIndex(exact_index) if exact_index else None,
+                              num_ctx=num_ctx, stream=stream, combined=combined, strict=True,
+                              embedder=ChunkEmbedder(**(embed_options or {})))
+    dlq = DeadLetterQueue(dead_letters) if dead_letters else None
+
+    ppt_ids = select_week_ppt_ids(evaluator.store, week)
+    done = load_checkpoint(checkpoint_path)
+    pending = [p for p in ppt_ids if p not in done]
+    retrying = 0
+    for entry in dlq.pending(week) if dlq else []:
+        if entry["ppt_id"] in done:
+            dlq.remove(entry["ppt_id"], week)  # evaluated by another run since
+        else:
+            retrying += 1
+    print(f"Week {week}: {len(ppt_ids)} decks, {len(done & set(ppt_ids))} already done, {len(pending)} to evaluate"
+          + (f" ({retrying} from the dead-letter queue)." if retrying else "."))
+
+    failures = {}
+    evaluated = 0
+    scores_file, scores_writer = _open_scores(scores_path)
+    pool = ThreadPoolExecutor(max_workers=workers)
+
+    def run_pass(ids, checkpoint) -> list[str]:
+        """Evaluates `ids`; returns the ones dead-lettered by an LLM outage."""
+        nonlocal evaluated
+        parked = []
+        futures = {pool.submit(evaluator.evaluate, ppt_id): ppt_id for ppt_id in ids}
+        for future in as_completed(futures):
+            ppt_id = futures[future]
+            try:
+                result = future.result()
+            except LLMUnavailableError as e:
+                parked.append(ppt_id)
+                if dlq:
+                    dlq.add(ppt_id, week, str(e))
+                continue
+            except Exception as e:
+                failures[ppt_id] = f"{type(e).__name__}: {e}"
+                print(f"[ERROR] {ppt_id}: {failures[ppt_id]}")
+                continue
+
+            # scores.csv first: a crash in between re-scores the deck (ranking
+            # dedups ids) instead of dropping it from scores.csv
+            scores_writer.writerow([ppt_id, result["total_score"]])
+            scores_file.flush()
+            checkpoint.write(json.dumps(result) + "\n")
+            checkpoint.flush()
+            if dlq:
+                dlq.remove(ppt_id, week)
+            evaluated += 1
+            print(f"[{evaluated}/{len(pending)}] {ppt_id}: {result['total_score']}")
+        return parked
+
+    try:
+        with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+            parked = run_pass(pending, checkpoint)
+            deadline = time.monotonic() + recovery_wait
+            while parked:
+                print(f"Ollama unavailable: {len(parked)} decks dead-lettered; "
+                      f"waiting up to {max(0, deadline - time.monotonic()):.0f}s for it to recover.")
+                if not evaluator.wait_for_recovery(deadline - time.monotonic()):
+                    break
+                print(f"Ollama is back; re-evaluating {len(parked)} dead-lettered decks.")
+                parked = run_pass(parked, checkpoint)
+    except KeyboardInterrupt:
+        print(f"Interrupted. {evaluated} decks saved; re-run to resume.")
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        scores_file.close()
+        if dlq:
+            dlq.close()
+    pool.shutdown()
+
+    return {"week": week, "total": len(ppt_ids), "evaluated": evaluated, "failures": failures,
+            "dead_lettered": parked}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate every PPT of a week into scores.csv")
+    parser.add_argument("--week", type=int, required=True)
+    parser.add_argument("--model", default="tinyllama:latest", help="Ollama model to use")
+    parser.add_argument("--ollama-url", default="http://localhost:11434", help="Ollama base URL")
+    parser.add_argument("--workers", type=int, default=4, help="Decks evaluated in parallel")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="Max in-flight LLM calls overall")
+    parser.add_argument("--scores", default=SCORES_FILE, help="Output CSV (id,score), appended to")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint JSONL (default: eval_week<N>.checkpoint.jsonl)")
+    parser.add_argument("--llm-cache", default=default_cache_path(), help="LLM response cache file")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call the model")
+    parser.add_argument("--exact-index", help="Use this exact index for similarity instead of Chroma")
+    parser.add_argument("--num-ctx", type=int, default=2048, help="LLM context window; section text is packed to fit")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for whole generations (no early stop)")
+    parser.add_argument("--combined", action="store_true", help="Score the four rubric criteria in one LLM call")
+    parser.add_argument("--dead-letters", default=default_dead_letter_path(),
+                        help="Dead-letter queue of decks not evaluated because Ollama was down")
+    parser.add_argument("--recovery-wait", type=float, default=600.0,
+                        help="Seconds to wait for Ollama to recover before leaving decks in the dead-letter queue")
+    add_embedder_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        summary = evaluate_week(
+            args.week,
+            model=args.model,
+            ollama_url=args.ollama_url,
+            workers=args.workers,
+            llm_concurrency=args.llm_concurrency,
+            scores_path=args.scores,
+            checkpoint_path=args.checkpoint,
+            llm_cache=None if args.no_llm_cache else args.llm_cache,
+            exact_index=args.exact_index,
+            num_ctx=args.num_ctx,
+            stream=not args.no_stream,
+            combined=args.combined,
+            dead_letters=args.dead_letters,
+            recovery_wait=args.recovery_wait,
+            embed_options=embedder_options(args),
+        )
+    except KeyboardInterrupt:
+        sys.exit(130)
+    print(f"Evaluated {summary['evaluated']} decks; {len(summary['failures'])} failed.")
+    if summary["dead_lettered"]:
+        print(f"{len(summary['dead_lettered'])} decks left in the dead-letter queue ({args.dead_letters}); "
+              f"re-run once Ollama is up.")
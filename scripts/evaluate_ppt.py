@@ -10,11 +10,18 @@ project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 sys.path.append(os.path.join(project_root, "ragpptxx"))
 
-from evaluation import IdeaEvaluator
+from evaluation import IdeaEvaluator, LLMResponseCache
+from embeddings import ExactIndex
+from evaluation.llm_cache import default_cache_path
 
-def run_evaluation(ppt_id: str, model: str):
+def run_evaluation(ppt_id: str, model: str, ollama_url: str = "http://localhost:11434", concurrency: int = 5,
+                   llm_cache: str = default_cache_path(), exact_index: str = None, num_ctx: int = 2048,
+                   stream: bool = True, combined: bool = False):
     """Run evaluation for a given PPT ID."""
-    evaluator = IdeaEvaluator(model=model)
+    evaluator = IdeaEvaluator(model=model, ollama_url=ollama_url, concurrency=concurrency,
+                              response_cache=LLMResponseCache(llm_cache) if llm_cache else None,
+                              similarity_index=ExactIndex(exact_index) if exact_index else None,
+                              num_ctx=num_ctx, stream=stream, combined=combined)
     
     print(f"Evaluating PPT ID: {ppt_id} using model: {model}...")
     result = evaluator.evaluate(ppt_id)
@@ -26,7 +33,17 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Evaluate PPT Idea using Ollama")
     parser.add_argument("--ppt_id", required=True, help="ID of the PPT to evaluate (must exist in ChromaDB)")
     parser.add_argument("--model", default="tinyllama:latest", help="Ollama model to use")
+    parser.add_argument("--ollama-url", default="http://localhost:11434", help="Ollama base URL")
+    parser.add_argument("--concurrency", type=int, default=5, help="Max concurrent LLM calls (1 = sequential)")
+    parser.add_argument("--llm-cache", default=default_cache_path(), help="LLM response cache file")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call the model")
+    parser.add_argument("--exact-index", help="Use this exact index for similarity instead of Chroma")
+    parser.add_argument("--num-ctx", type=int, default=2048, help="LLM context window; section text is packed to fit")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for whole generations (no early stop)")
+    parser.add_argument("--combined", action="store_true", help="Score the four rubric criteria in one LLM call")
     
     args = parser.parse_args()
     
-    run_evaluation(args.ppt_id, args.model)
+    run_evaluation(args.ppt_id, args.model, args.ollama_url, args.concurrency,
+                   None if args.no_llm_cache else args.llm_cache, args.exact_index, args.num_ctx, not args.no_stream,
+                   args.combined)
@@ -1,6 +1,8 @@
 import os
 import sys
+import csv
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 
 # Allow local imports logic
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,18 +11,36 @@ sys.path.append(project_root)
 sys.path.append(os.path.join(project_root, "ragpptxx"))
 
 from pipeline import process_document
-from embeddings import ChunkEmbedder, VectorStore
+from embeddings import ChunkEmbedder, EmbeddingCache, ExactIndex, open_store
+from embeddings.cache import default_cache_path
+from embeddings.exact_index import default_index_path
+from embeddings.embedder import add_embedder_arguments, embedder_options
+from manifest import IngestManifest, default_manifest_path
+from metrics import stage
+
+EMBED_BATCH_SIZE = 1024
+UPSERT_BATCH_SIZE = 5000
 
 """Ingests a PPT into ChromaDB. Skips duplicates idempotent-ly."""
-def ingest_ppt(pdf_path: str, team_name: str, week: int):
+def ingest_ppt(pdf_path: str, team_name: str, week: int, embed_cache: str = default_cache_path(),
+               exact_index: str = default_index_path(), manifest_path: str = default_manifest_path(),
+               embed_options: dict = None):
     
     if not os.path.exists(pdf_path):
         print(f"[ERROR] File not found: {pdf_path}")
         return
 
+    # Unchanged files (same size/mtime, or same content hash) are never parsed again
+    manifest = IngestManifest(manifest_path) if manifest_path else None
+    if manifest:
+        status, fingerprint, previous_ppt_id = manifest.check(pdf_path, week)
+        if status == "unchanged":
+            print(f"Unchanged since last ingestion. Skipping: {pdf_path}")
+            return
+
     print(f"Processing: {pdf_path}")
     try:
-        chunks = process_document(pdf_path, team_name, week)
+        chunks = process_document(pdf_path, team_name, week, verbose=False)
     except Exception as e:
         print(f"[ERROR] Document processing failed: {e}")
         return
@@ -29,38 +49,252 @@ def ingest_ppt(pdf_path: str, team_name: str, week: int):
         print("[WARN] No chunks extracted.")
         return
 
-    store = VectorStore()
-    
-    # Pre-calculate IDs: {ppt_id}_{section}_{week}
-    chunk_ids = [f"{c['ppt_id']}_{c['section']}_{c['week']}" for c in chunks]
-    
-    # Check existence in batch
-    existing = store.collection.get(ids=chunk_ids)
-    existing_ids = set(existing["ids"]) if existing and "ids" in existing else set()
-    
-    # Filter
+    embedder = ChunkEmbedder(cache=EmbeddingCache(embed_cache) if embed_cache else None, **(embed_options or {}))
+    deck = (pdf_path, chunks, fingerprint if manifest else None,
+            previous_ppt_id if manifest and status == "changed" else None)
+    stored, failures = store_decks([deck], open_store(), embedder, ExactIndex.open_if_exists(exact_index), manifest,
+                                   verbose=True)
+    if failures:
+        print(f"[ERROR] Storing failed: {failures[pdf_path]}")
+    elif stored:
+        print(f"Stored {stored} chunks successfully.")
+    else:
+        print("All chunks exist. Skipping.")
+
+def _ppt_id(pdf_path: str) -> str:
+    # same id process_document derives
+    return os.path.splitext(os.path.basename(pdf_path))[0]
+
+def collect_jobs(directory: str = None, manifest: str = None, team_name: str = None, week: int = None,
+                 failures: dict = None) -> list[tuple]:
+    """Builds (pdf_path, team_name, week) jobs from a folder or a manifest CSV.
+
+    Manifest columns: file, team, week. Missing team/week fall back to the CLI values.
+    Files sharing a ppt_id (basename) and week would get the same chunk ids; only the
+    first is kept and the others are recorded in `failures` (path -> reason), or a
+    ValueError is raised when no `failures` dict is given.
+    """
+    jobs = []
+    if directory:
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith(".pdf"):
+                jobs.append((os.path.join(directory, name), team_name, week))
+
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                path = row["file"]
+                if not os.path.isabs(path):
+                    path = os.path.join(base, path)
+                row_week = row.get("week") or week
+                jobs.append((path, row.get("team") or team_name, int(row_week) if row_week is not None else None))
+
+    for path, team, wk in jobs:
+        if team is None or wk is None:
+            raise ValueError(f"Missing team/week for {path}")
+
+    unique, first = [], {}
+    for job in jobs:
+        key = (_ppt_id(job[0]), job[2])
+        if key not in first:
+            first[key] = job[0]
+            unique.append(job)
+            continue
+        reason = f"Same ppt_id/week as {first[key]} (chunk ids would collide)"
+        if failures is None:
+            raise ValueError(f"{job[0]}: {reason}")
+        failures[job[0]] = reason
+    return unique
+
+def _process_job(job: tuple):
+    """Process-pool worker: parse + section extraction for one deck."""
+    pdf_path, team_name, week = job
+    try:
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError("File not found")
+        return pdf_path, process_document(pdf_path, team_name, week, verbose=False), None
+    except Exception as e:
+        return pdf_path, [], f"{type(e).__name__}: {e}"
+
+def _batches(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _error(e: Exception) -> str:
+    return f"{type(e).__name__}: {e}"
+
+def store_decks(decks: list[tuple], store, embedder, index=None, manifest=None,
+                embed_batch_size: int = EMBED_BATCH_SIZE, upsert_batch_size: int = UPSERT_BATCH_SIZE,
+                verbose: bool = False) -> tuple[int, dict]:
+    """Stores parsed decks; the shared tail of every ingestion path (CLI, bulk, pipeline, service).
+
+    `decks` holds (pdf_path, chunks, fingerprint, previous_ppt_id) tuples. A deck with a
+    previous_ppt_id changed on disk: its old chunks are deleted first so the new content
+    is re-embedded. Chunks already stored are skipped, the rest are embedded and upserted
+    in batches into Chroma and the exact index (if any), and each fully stored deck with
+    a fingerprint is recorded in the manifest. A failing delete or batch is charged to
+    its decks, which stay out of the manifest so a re-run retries them.
+
+    Returns (stored chunk count, {pdf_path: error}).
+    """
+    failures = {}
+    for pdf_path, chunks, _, previous_ppt_id in decks:
+        if previous_ppt_id is not None:
+            try:
+                store.delete_ppt(previous_ppt_id, chunks[0]["week"])
+            except Exception as e:
+                failures[pdf_path] = _error(e)
+    path_of = {(chunks[0]["ppt_id"], chunks[0]["week"]): pdf_path for pdf_path, chunks, _, _ in decks}
+    chunks = [c for pdf_path, doc_chunks, _, _ in decks if pdf_path not in failures for c in doc_chunks]
+
+    def charge(batch, e):
+        for c in batch:
+            failures[path_of[(c["ppt_id"], c["week"])]] = _error(e)
+        if verbose:
+            print(f"[ERROR] Batch of {len(batch)} chunks failed: {_error(e)}")
+
+    upsert_batch_size = min(upsert_batch_size, store.client.get_max_batch_size())
+
+    # Drop chunks that already exist (batched existence check)
     to_embed = []
-    for i, chunk in enumerate(chunks):
-        if chunk_ids[i] not in existing_ids:
-            to_embed.append(chunk)
+    for batch in _batches(chunks, upsert_batch_size):
+        ids = [f"{c['ppt_id']}_{c['section']}_{c['week']}" for c in batch]
+        try:
+            existing = set(store.collection.get(ids=ids, include=[])["ids"])
+        except Exception as e:
+            charge(batch, e)
+            continue
+        to_embed.extend(c for c, cid in zip(batch, ids) if cid not in existing)
 
-    if not to_embed:
-        print("All chunks exist. Skipping.")
-        return
+    # Embed in large batches, upsert in a few big batches
+    if verbose and to_embed:
+        print(f"Embedding {len(to_embed)} new chunks...")
+    stored = 0
+    for batch in _batches(to_embed, upsert_batch_size):
+        try:
+            embeddings = []
+            for sub in _batches(batch, embed_batch_size):
+                embeddings.extend(embedder.embed([c["text"] for c in sub]))
+            store.add_chunks(batch, embeddings)
+            if index is not None:
+                index.add_chunks(batch, embeddings)
+        except Exception as e:
+            charge(batch, e)
+            continue
+        stored += len(batch)
+        if verbose:
+            print(f"Stored {stored}/{len(to_embed)} chunks.")
 
-    # Embed & Store
-    print(f"Embedding {len(to_embed)} new chunks...")
-    embedder = ChunkEmbedder()
-    embeddings = embedder.embed([c["text"] for c in to_embed])
-    
-    store.add_chunks(to_embed, embeddings)
-    print(f"Stored {len(to_embed)} chunks successfully.")
+    if manifest:
+        manifest.record_many(
+            (pdf_path, chunks[0]["week"], fingerprint, chunks[0]["ppt_id"], chunks[0].get("team_name", ""))
+            for pdf_path, chunks, fingerprint, _ in decks if fingerprint is not None and pdf_path not in failures
+        )
+    return stored, failures
+
+def ingest_bulk(jobs: list[tuple], workers: int = None,
+                embed_batch_size: int = EMBED_BATCH_SIZE, upsert_batch_size: int = UPSERT_BATCH_SIZE,
+                embed_cache: str = default_cache_path(), exact_index: str = default_index_path(),
+                manifest_path: str = default_manifest_path(), embed_options: dict = None) -> dict:
+    """Ingests many decks in one run.
+
+    Parsing runs across a process pool; embedding and Chroma upserts are batched
+    across decks. A failing deck is recorded and never stops the run. Files the
+    ingestion manifest reports as unchanged are skipped before parsing.
+    """
+    failures = {}
+    chunks = 0
+    ingested_files = 0
+    store = open_store()
+
+    # 0. Fingerprint check: only new or changed files go to the parser pool
+    manifest = IngestManifest(manifest_path) if manifest_path else None
+    fingerprints, changed, skipped = {}, {}, 0
+    if manifest:
+        pending = []
+        for job in jobs:
+            pdf_path, _, week = job
+            if not os.path.exists(pdf_path):
+                pending.append(job)  # reported as a failure by the worker
+                continue
+            status, fingerprint, previous_ppt_id = manifest.check(pdf_path, week)
+            if status == "unchanged":
+                skipped += 1
+                continue
+            fingerprints[pdf_path] = fingerprint
+            if status == "changed":
+                changed[pdf_path] = previous_ppt_id
+            pending.append(job)
+        print(f"{skipped}/{len(jobs)} files unchanged since last ingestion.")
+    else:
+        pending = jobs
+
+    # 1. Parse + extract sections in parallel
+    # (per-deck parse/extract timings come from the workers, as JSON lines only)
+    parsed = []
+    with stage("parse_pool", items=len(pending)), ProcessPoolExecutor(max_workers=workers) as pool:
+        for pdf_path, doc_chunks, error in pool.map(_process_job, pending, chunksize=8):
+            if error:
+                failures[pdf_path] = error
+            elif not doc_chunks:
+                failures[pdf_path] = "No chunks extracted"
+            else:
+                chunks += len(doc_chunks)
+                parsed.append((pdf_path, doc_chunks))
+                ingested_files += 1
+    print(f"Parsed {ingested_files}/{len(pending)} files ({chunks} chunks).")
+
+    # 2. Delete changed decks' old chunks, skip existing chunks, embed + upsert in batches
+    decks = [(pdf_path, doc_chunks, fingerprints.get(pdf_path), changed.get(pdf_path))
+             for pdf_path, doc_chunks in parsed]
+    embedder = ChunkEmbedder(cache=EmbeddingCache(embed_cache) if embed_cache else None, **(embed_options or {}))
+    stored, batch_failures = store_decks(decks, store, embedder, ExactIndex.open_if_exists(exact_index), manifest,
+                                         embed_batch_size, upsert_batch_size, verbose=True)
+    failures.update(batch_failures)
+    if not stored and not batch_failures:
+        print("All chunks exist. Skipping.")
+    return {"files": len(jobs), "stored_chunks": stored, "skipped_files": skipped, "failures": failures}
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--file", required=True)
-    parser.add_argument("--team", required=True)
-    parser.add_argument("--week", type=int, required=True)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file")
+    source.add_argument("--dir", help="Bulk mode: ingest every PDF in this folder")
+    source.add_argument("--manifest", help="Bulk mode: CSV with file,team,week columns")
+    parser.add_argument("--team")
+    parser.add_argument("--week", type=int)
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (bulk mode)")
+    parser.add_argument("--embed-batch", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--upsert-batch", type=int, default=UPSERT_BATCH_SIZE)
+    parser.add_argument("--embed-cache", default=default_cache_path(), help="Embedding cache file")
+    parser.add_argument("--no-embed-cache", action="store_true", help="Always run the embedding model")
+    parser.add_argument("--exact-index", default=default_index_path(), help="Exact index to update, if built")
+    parser.add_argument("--manifest-db", default=default_manifest_path(), help="Ingestion manifest (file fingerprints)")
+    parser.add_argument("--no-manifest-db", action="store_true", help="Re-parse every file")
+    add_embedder_arguments(parser)
     args = parser.parse_args()
-    
-    ingest_ppt(args.file, args.team, args.week)
+    embed_cache = None if args.no_embed_cache else args.embed_cache
+    manifest_path = None if args.no_manifest_db else args.manifest_db
+
+    if args.file:
+        if args.team is None or args.week is None:
+            parser.error("--team and --week are required with --file")
+        ingest_ppt(args.file, args.team, args.week, embed_cache=embed_cache, exact_index=args.exact_index,
+                   manifest_path=manifest_path, embed_options=embedder_options(args))
+    else:
+        duplicates = {}
+        summary = ingest_bulk(
+            collect_jobs(args.dir, args.manifest, args.team, args.week, failures=duplicates),
+            workers=args.workers,
+            embed_batch_size=args.embed_batch,
+            upsert_batch_size=args.upsert_batch,
+            embed_cache=embed_cache,
+            exact_index=args.exact_index,
+            manifest_path=manifest_path,
+            embed_options=embedder_options(args),
+        )
+        print(f"Stored {summary['stored_chunks']} chunks from {summary['files']} files "
+              f"({summary['skipped_files']} unchanged).")
+        for path, error in {**duplicates, **summary["failures"]}.items():
+            print(f"[ERROR] {path}: {error}")
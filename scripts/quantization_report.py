@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+# Setup import path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from embeddings import ExactIndex, VectorStore, open_store
+from embeddings.dedup import load_section_embeddings
+from embeddings.similarity import similarity_penalty
+
+# Largest acceptable |max_similarity - exact| for a variant to pass
+DEFAULT_TOLERANCE = 0.005
+
+def _synthetic_store(path, n, dim=384, seed=0):
+    """Fills a throwaway store with n clustered idea_problem vectors, ~10% near-duplicates."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 20), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.9 * rng.standard_normal((n, dim)).astype(np.float32)
+    dupes = rng.choice(n, n // 10, replace=False)
+    vectors[dupes] = vectors[rng.integers(0, n, len(dupes))] + 0.2 * rng.standard_normal((len(dupes), dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    store = VectorStore(persist_path=path)
+    chunks = [{"ppt_id": f"syn_{i:06d}", "team_name": "", "section": "idea_problem", "week": 1 + i % 4,
+               "page_range": "1", "text": f"synthetic deck {i}"} for i in range(n)]
+    batch = min(5000, store.client.get_max_batch_size())
+    for i in range(0, n, batch):
+        store.add_chunks(chunks[i:i + batch], vectors[i:i + batch])
+    return store
+
+def _run_queries(fn, queries, ppt_ids):
+    results, latencies = [], []
+    for q, ppt_id in zip(queries, ppt_ids):
+        start = time.perf_counter()
+        results.append(fn(q, ppt_id))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+def run_report(store, sample=200, k=10, tolerance=DEFAULT_TOLERANCE, seed=0):
+    """Compares float16 / int8 indexes (with and without float32 rescoring) and
+    Chroma's filtered HNSW search against exact float32 search."""
+    metadatas, matrix = load_section_embeddings(store)
+    if not metadatas:
+        raise ValueError("No idea_problem vectors stored; ingest decks or use --synthetic N")
+    ppt_ids = [m["ppt_id"] for m in metadatas]
+    rows = np.random.default_rng(seed).choice(len(ppt_ids), min(sample, len(ppt_ids)), replace=False)
+    queries, query_ids = matrix[rows], [ppt_ids[r] for r in rows]
+
+    workdir = tempfile.mkdtemp(prefix="quant_report_")
+    try:
+        indexes = {dtype: ExactIndex.rebuild(store, os.path.join(workdir, dtype), dtype=dtype)
+                   for dtype in ("float32", "float16", "int8")}
+
+        def via_index(index, rescore):
+            def fn(q, ppt_id):
+                res = index.query_similar(q, n_results=k, exclude_ppt_id=ppt_id, store=store if rescore else None)
+                return res["ids"][0], [1.0 - d for d in res["distances"][0]]
+            return fn
+
+        def via_chroma(q, ppt_id):
+            res = store.query_similar(q.tolist(), n_results=k, where={
+                "$and": [{"section": {"$eq": "idea_problem"}}, {"ppt_id": {"$ne": ppt_id}}]
+            })
+            return res["ids"][0], [1.0 - d for d in res["distances"][0]]
+
+        variants = {
+            "exact_float32": (via_index(indexes["float32"], False), indexes["float32"].nbytes()),
+            "chroma_hnsw": (via_chroma, None),
+            "float16": (via_index(indexes["float16"], False), indexes["float16"].nbytes()),
+            "float16+rescore": (via_index(indexes["float16"], True), indexes["float16"].nbytes()),
+            "int8": (via_index(indexes["int8"], False), indexes["int8"].nbytes()),
+            "int8+rescore": (via_index(indexes["int8"], True), indexes["int8"].nbytes()),
+        }
+
+        truth, _ = _run_queries(variants["exact_float32"][0], queries, query_ids)
+        true_max = np.array([sims[0] if sims else 0.0 for _, sims in truth])
+        report = {"vectors": len(ppt_ids), "queries": len(rows), "k": k, "tolerance": tolerance, "variants": {}}
+        for name, (fn, nbytes) in variants.items():
+            results, latencies = _run_queries(fn, queries, query_ids)
+            got_max = np.array([sims[0] if sims else 0.0 for _, sims in results])
+            delta = np.abs(got_max - true_max)
+            recall = np.mean([len(set(ids) & set(t_ids)) / max(1, len(t_ids))
+                              for (ids, _), (t_ids, _) in zip(results, truth)])
+            flips = int(sum(similarity_penalty(a) != similarity_penalty(b) for a, b in zip(got_max, true_max)))
+            report["variants"][name] = {
+                "max_abs_error": round(float(delta.max()), 6),
+                "mean_abs_error": round(float(delta.mean()), 6),
+                f"recall_at_{k}": round(float(recall), 4),
+                "penalty_changes": flips,
+                "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+                "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+                "vector_bytes": nbytes,
+                "within_tolerance": bool(delta.max() <= tolerance and flips == 0),
+            }
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy / latency / size of quantized similarity indexes")
+    parser.add_argument("--sample", type=int, default=200, help="Stored decks used as queries")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Max |max_similarity error|")
+    parser.add_argument("--synthetic", type=int, help="Use N synthetic vectors in a temporary store")
+    parser.add_argument("--output", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    tmp_store = tempfile.mkdtemp(prefix="quant_store_") if args.synthetic else None
+    try:
+        store = _synthetic_store(tmp_store, args.synthetic) if args.synthetic else open_store()
+        report = run_report(store, args.sample, args.k, args.tolerance)
+    finally:
+        if tmp_store:
+            shutil.rmtree(tmp_store, ignore_errors=True)
+
+    print(f"{report['vectors']} vectors, {report['queries']} queries, tolerance {report['tolerance']}")
+    print(f"{'variant':<16} {'max err':>9} {'mean err':>9} {'recall':>7} {'flips':>5} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'bytes':>12}  ok")
+    for name, v in report["variants"].items():
+        print(f"{name:<16} {v['max_abs_error']:>9.5f} {v['mean_abs_error']:>9.5f} {v[f'recall_at_{args.k}']:>7.3f} "
+              f"{v['penalty_changes']:>5} {v['p50_ms']:>8.3f} {v['p95_ms']:>8.3f} {v['vector_bytes'] or '-':>12}  "
+              f"{'yes' if v['within_tolerance'] else 'NO'}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,283 @@
+"""Resident screening service: keeps the embedding model, Chroma client and
+evaluator warm and serves ingest / similarity / evaluate over local HTTP or a
+Unix socket, with an optional watch folder for newly arriving PDFs.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from socketserver import ThreadingMixIn, UnixStreamServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Setup import path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, "ragpptxx"))
+
+from pipeline import process_document
+from manifest import IngestManifest, default_manifest_path
+from embeddings import ChunkEmbedder, EmbeddingCache, ExactIndex, compute_internal_similarity
+from embeddings.cache import default_cache_path
+from embeddings.exact_index import default_index_path
+from embeddings.embedder import add_embedder_arguments, embedder_options
+from evaluation import IdeaEvaluator, LLMResponseCache, DeadLetterQueue, LLMUnavailableError
+from evaluation.llm_cache import default_cache_path as default_llm_cache_path
+from evaluation.resilience import default_dead_letter_path
+from evaluate_batch import SCORES_FILE, _open_scores
+from ingestion import store_decks
+
+MISSING = "[SECTION NOT PROVIDED]"
+
+class ScreeningService:
+    """Long-lived embedder, store, evaluator and exact index shared by all requests."""
+
+    def __init__(self, model="tinyllama:latest", ollama_url="http://localhost:11434", llm_concurrency=8,
+                 embed_cache=default_cache_path(), llm_cache=default_llm_cache_path(),
+                 manifest_path=default_manifest_path(), exact_index=default_index_path(), embed_options=None):
+        self.embedder = ChunkEmbedder(cache=EmbeddingCache(embed_cache) if embed_cache else None,
+                                      **(embed_options or {}))
+        self.evaluator = IdeaEvaluator(model=model, ollama_url=ollama_url, concurrency=llm_concurrency,
+                                       response_cache=LLMResponseCache(llm_cache) if llm_cache else None,
+                                       strict=True, embedder=self.embedder)
+        self.store = self.evaluator.store
+        self.manifest = IngestManifest(manifest_path) if manifest_path else None
+        self.index = ExactIndex.open_if_exists(exact_index)
+        self.evaluator.similarity_index = self.index
+        self._ingest_lock = threading.Lock()  # one writer at a time (Chroma upserts, manifest, index)
+        self.started = time.time()
+
+    def warm_up(self):
+        """Pays the one-time costs up front: model load, first encode, Chroma open."""
+        self.embedder.model.encode(["warm up"], normalize_embeddings=True)
+        self.store.collection.count()
+
+    def ingest(self, pdf_path, team_name, week):
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(pdf_path)
+        with self._ingest_lock:
+            status, fingerprint, previous_ppt_id = (self.manifest.check(pdf_path, week) if self.manifest
+                                                    else ("new", None, None))
+            if status == "unchanged":
+                return {"ppt_id": previous_ppt_id, "status": "unchanged", "stored_chunks": 0}
+
+            chunks = process_document(pdf_path, team_name, week, verbose=False)
+            deck = (pdf_path, chunks, fingerprint, previous_ppt_id if status == "changed" else None)
+            stored, failures = store_decks([deck], self.store, self.embedder, self.index, self.manifest)
+        if failures:
+            raise RuntimeError(f"Storing {pdf_path} failed: {failures[pdf_path]}")
+        return {"ppt_id": chunks[0]["ppt_id"], "status": status, "stored_chunks": stored}
+
+    def similarity(self, pdf_path=None, text=None, ppt_id=None):
+        """Similarity of a deck or of raw idea text. Every page is read, so a multi-page idea
+        is embedded exactly as ingestion stores it."""
+        if text is None:
+            if not pdf_path or not os.path.exists(pdf_path):
+                raise FileNotFoundError(pdf_path or "path")
+            chunks = process_document(pdf_path, "", 0, verbose=False)
+            idea = next(c for c in chunks if c["section"] == "idea_problem")
+            text, ppt_id = idea["text"], ppt_id or idea["ppt_id"]
+        if not text.strip() or text == MISSING:
+            return {"max_similarity": 0.0, "avg_top5_similarity": 0.0, "penalty": 0.0, "similar_ppt_ids": []}
+
+        if self.index is not None:
+            self.index.refresh()  # rows added by other processes
+        embedding = self.embedder.embed([text])[0]
+        return compute_internal_similarity(self.store, embedding, ppt_id or "", index=self.index)
+
+    def evaluate(self, ppt_id):
+        if self.index is not None:
+            self.index.refresh()
+        return self.evaluator.evaluate(ppt_id)
+
+    def health(self):
+        return {
+            "status": "ok",
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "stored_chunks": self.store.collection.count(),
+            "exact_index_rows": len(self.index) if self.index is not None else None,
+            "llm_circuit": self.evaluator.breaker.state,
+        }
+
+def make_handler(service):
+    class ScreeningHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, service.health())
+            else:
+                self._reply(404, {"error": f"Unknown endpoint {self.path}"})
+
+        def do_POST(self):
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            except json.JSONDecodeError:
+                self._reply(400, {"error": "Body must be JSON"})
+                return
+
+            started = time.perf_counter()
+            try:
+                if self.path == "/ingest":
+                    result = service.ingest(request["path"], request.get("team", ""), int(request["week"]))
+                elif self.path == "/similarity":
+                    result = service.similarity(request.get("path"), request.get("text"), request.get("ppt_id"))
+                elif self.path == "/evaluate":
+                    result = service.evaluate(request["ppt_id"])
+                else:
+                    self._reply(404, {"error": f"Unknown endpoint {self.path}"})
+                    return
+            except KeyError as e:
+                self._reply(400, {"error": f"Missing field {e}"})
+                return
+            except FileNotFoundError as e:
+                self._reply(404, {"error": f"File not found: {e}"})
+                return
+            except LLMUnavailableError as e:
+                # nothing is scored while Ollama is down; the client retries later
+                self._reply(503, {"error": f"LLM unavailable: {e}",
+                                  "retry_after": round(service.evaluator.breaker.retry_after(), 1)})
+                return
+            except Exception as e:
+                self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+                return
+            self._reply(200, {**result, "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)})
+
+        def log_message(self, *args):
+            pass
+
+    return ScreeningHandler
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+def _write_score(scores_path, score):
+    scores_file, writer = _open_scores(scores_path)
+    with scores_file:
+        writer.writerow([score["ppt_id"], score["total_score"]])
+    print(f"[watch] {score['ppt_id']}: {score['total_score']}")
+
+def _retry_dead_letters(service, dlq, week, scores_path):
+    """Re-evaluates the week's dead-lettered decks once Ollama answers the breaker's probe."""
+    pending = dlq.pending(week)
+    if not pending or not service.evaluator.wait_for_recovery(0):
+        return
+    print(f"[watch] Ollama is back; re-evaluating {len(pending)} dead-lettered decks")
+    for entry in pending:
+        try:
+            score = service.evaluate(entry["ppt_id"])
+        except LLMUnavailableError as e:
+            dlq.add(entry["ppt_id"], week, str(e))
+            return  # down again: wait for the next probe
+        except Exception as e:
+            dlq.remove(entry["ppt_id"], week)  # not an outage: retrying will not help
+            print(f"[watch][ERROR] {entry['ppt_id']}: {type(e).__name__}: {e}")
+            continue
+        _write_score(scores_path, score)
+        dlq.remove(entry["ppt_id"], week)
+
+def watch_folder(service, directory, team_name=None, week=1, poll=5.0, evaluate=False, scores_path=SCORES_FILE,
+                 dead_letters=default_dead_letter_path()):
+    """Polls `directory` for PDFs and ingests each once its size has stopped changing.
+
+    The ingestion manifest makes already-ingested files a single stat per poll.
+    With `evaluate`, newly stored decks are evaluated and appended to scores.csv;
+    a deck that cannot be evaluated because Ollama is down goes to the dead-letter
+    queue and is re-evaluated on a later poll, once Ollama answers again.
+    """
+    dlq = DeadLetterQueue(dead_letters) if evaluate else None
+    sizes = {}
+    while True:
+        if dlq:
+            _retry_dead_letters(service, dlq, week, scores_path)
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if not name.lower().endswith(".pdf") or not os.path.isfile(path):
+                continue
+            size = os.path.getsize(path)
+            if sizes.get(path) != size:
+                sizes[path] = size  # new or still being written: check again next poll
+                continue
+            try:
+                result = service.ingest(path, team_name or os.path.splitext(name)[0], week)
+                if result["status"] == "unchanged":
+                    continue
+                print(f"[watch] ingested {name}: {result['stored_chunks']} chunks")
+                if evaluate:
+                    try:
+                        _write_score(scores_path, service.evaluate(result["ppt_id"]))
+                    except LLMUnavailableError as e:
+                        # already in the manifest, so the next poll would skip it: park it instead
+                        dlq.add(result["ppt_id"], week, str(e))
+                        print(f"[watch] {result['ppt_id']}: Ollama unavailable, dead-lettered")
+            except Exception as e:
+                print(f"[watch][ERROR] {name}: {type(e).__name__}: {e}")
+        time.sleep(poll)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resident screening service (ingest / similarity / evaluate)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument("--model", default="tinyllama:latest", help="Ollama model to use")
+    parser.add_argument("--ollama-url", default="http://localhost:11434", help="Ollama base URL")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="Max in-flight LLM calls overall")
+    parser.add_argument("--no-embed-cache", action="store_true", help="Always run the embedding model")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call the model")
+    parser.add_argument("--exact-index", default=default_index_path(), help="Exact index to use, if built")
+    parser.add_argument("--watch", help="Folder to poll for new PDFs")
+    parser.add_argument("--team", help="Team name for watched files (default: file name)")
+    parser.add_argument("--week", type=int, default=1, help="Week for watched files")
+    parser.add_argument("--poll", type=float, default=5.0, help="Watch folder poll interval (seconds)")
+    parser.add_argument("--watch-evaluate", action="store_true", help="Evaluate watched decks into scores.csv")
+    parser.add_argument("--dead-letters", default=default_dead_letter_path(),
+                        help="Dead-letter queue of watched decks not evaluated because Ollama was down")
+    add_embedder_arguments(parser)
+    args = parser.parse_args()
+
+    service = ScreeningService(
+        model=args.model,
+        ollama_url=args.ollama_url,
+        llm_concurrency=args.llm_concurrency,
+        embed_cache=None if args.no_embed_cache else default_cache_path(),
+        llm_cache=None if args.no_llm_cache else default_llm_cache_path(),
+        exact_index=args.exact_index,
+        embed_options=embedder_options(args),
+    )
+    print("Loading model and store...")
+    service.warm_up()
+
+    if args.unix_socket:
+        if os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+        server = ThreadingUnixHTTPServer(args.unix_socket, make_handler(service))
+        where = f"unix:{args.unix_socket}"
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+        where = f"http://{args.host}:{args.port}"
+
+    if args.watch:
+        threading.Thread(target=watch_folder, daemon=True,
+                         args=(service, args.watch, args.team, args.week, args.poll, args.watch_evaluate,
+                               SCORES_FILE, args.dead_letters)).start()
+        print(f"Watching {args.watch} every {args.poll}s")
+
+    print(f"Screening service listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+import argparse
+
+# Setup import path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from embeddings import ShardedVectorStore, VectorStore
+from embeddings.sharded_store import default_archive_path
+
+def list_shards(store):
+    for (week, section), shard in sorted(store.shards(refresh=True).items()):
+        print(f"week {week:>3}  {section:<18} {shard.count():>8} chunks")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the week/section-sharded vector store")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--list", action="store_true", help="Show every shard and its size")
+    action.add_argument("--migrate", action="store_true", help="Copy the single ppt_chunks collection into shards")
+    action.add_argument("--compact-week", type=int, help="Rebuild a week's shards from their live rows")
+    action.add_argument("--archive-week", type=int, help="Move a week's shards to the archive store")
+    action.add_argument("--restore-week", type=int, help="Move an archived week back")
+    parser.add_argument("--archive-path", default=default_archive_path(), help="Archive store directory")
+    args = parser.parse_args()
+
+    store = ShardedVectorStore()
+    start = time.perf_counter()
+    if args.list:
+        list_shards(store)
+    elif args.migrate:
+        rows = store.migrate_from(VectorStore())
+        print(f"Copied {rows} chunks into {len(store.shards(refresh=True))} shards. "
+              f"Set PPT_VECTOR_STORE=sharded to use them.")
+    elif args.compact_week is not None:
+        print(f"Compacted week {args.compact_week}: {store.compact_week(args.compact_week)} chunks kept")
+    elif args.archive_week is not None:
+        print(f"Archived week {args.archive_week}: "
+              f"{store.archive_week(args.archive_week, args.archive_path)} chunks -> {args.archive_path}")
+    else:
+        print(f"Restored week {args.restore_week}: {store.restore_week(args.restore_week, args.archive_path)} chunks")
+    print(f"({time.perf_counter() - start:.2f}s)")
@@ -0,0 +1,150 @@
+"""Local stand-in for Ollama's /api/generate, for exercising the evaluator offline.
+
+Every request sleeps for --delay seconds (plus optional jitter) and returns a
+canned JSON answer shaped like the prompt asks for. Streaming requests (Ollama's
+default) get NDJSON chunks of a few characters each, spread over the delay, and
+--trailing extra whitespace tokens after the JSON (as small models tend to emit)
+up to the request's num_predict. A client that hangs up early stops the stream.
+GET /api/tags lists `server.models` (--model); set `server.down = True` to
+simulate an outage (every request gets a 503), or `server.fail_with` to a
+callable(payload) returning an HTTP status (e.g. 500, 400) to send instead of
+an answer, or None to answer normally.
+"""
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def _answer(prompt: str) -> dict:
+    if criteria := re.findall(r'"(\w+)": \{"score"', prompt):
+        # single-call multi-criterion prompt
+        return {key: {"score": 6, "reason": f"Stub {key} verdict."} for key in criteria}
+    if "novelty_category" in prompt:
+        return {"novelty_category": "c", "score_adjustment": 1, "reason": "Stub uniqueness verdict."}
+    return {"score": 6, "reason": "Stub criterion verdict."}
+
+STREAM_CHUNK_CHARS = 4
+
+def make_handler(delay: float = 0.0, jitter: float = 0.0, trailing: int = 0):
+    class StubOllamaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.server.down:
+                self.send_error(503)
+            elif self.path == "/api/tags":
+                body = json.dumps({"models": [{"name": m, "model": m} for m in self.server.models]}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            if self.server.down:
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.send_error(503)
+                return
+            if self.path != "/api/generate":
+                self.send_error(404)
+                return
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.server.fail_with and (status := self.server.fail_with(payload)):
+                self.send_error(status)
+                return
+            started = time.perf_counter()
+            if payload.get("stream", True):
+                self._stream(payload, started)
+                return
+            time.sleep(delay + random.uniform(0, jitter))
+
+            prompt = payload.get("prompt", "")
+            body = json.dumps({
+                "model": payload.get("model", "stub"),
+                "response": json.dumps(_answer(prompt)),
+                "done": True,
+                "prompt_eval_count": len(prompt) // 4,
+                "eval_count": 24,
+                "total_duration": int((time.perf_counter() - started) * 1e9),
+            }).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, payload, started):
+            prompt = payload.get("prompt", "")
+            answer = json.dumps(_answer(prompt))
+            tokens = [answer[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(answer), STREAM_CHUNK_CHARS)]
+            tokens += ["\n"] * trailing
+            num_predict = payload.get("options", {}).get("num_predict")
+            if num_predict and num_predict > 0:
+                tokens = tokens[:num_predict]
+            per_token = (delay + random.uniform(0, jitter)) / max(1, len(tokens))
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for token in tokens:
+                    time.sleep(per_token)
+                    self._chunk({"model": payload.get("model", "stub"), "response": token, "done": False})
+                self._chunk({
+                    "model": payload.get("model", "stub"), "response": "", "done": True,
+                    "prompt_eval_count": len(prompt) // 4,
+                    "eval_count": len(tokens),
+                    "total_duration": int((time.perf_counter() - started) * 1e9),
+                })
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True  # client stopped reading: stop "generating"
+
+        def _chunk(self, obj):
+            data = (json.dumps(obj) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def log_message(self, *args):
+            pass
+
+    return StubOllamaHandler
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    down = False
+    models = ("tinyllama:latest",)
+    fail_with = None
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):  # early-stopping clients reset the socket
+            super().handle_error(request, client_address)
+
+def serve_stub(port: int = 0, delay: float = 0.0, jitter: float = 0.0, trailing: int = 0) -> ThreadingHTTPServer:
+    """Starts the stub in a daemon thread. Use f"http://127.0.0.1:{server.server_port}" as ollama_url."""
+    server = StubServer(("127.0.0.1", port), make_handler(delay, jitter, trailing))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Ollama /api/generate server")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--delay", type=float, default=1.0, help="Seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay (seconds)")
+    parser.add_argument("--trailing", type=int, default=0, help="Whitespace tokens streamed after the JSON")
+    parser.add_argument("--model", action="append", help="Model listed by /api/tags (default: tinyllama:latest)")
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", args.port), make_handler(args.delay, args.jitter, args.trailing))
+    if args.model:
+        server.models = tuple(args.model)
+    print(f"Stub Ollama listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,122 @@
+"""Checks that the ONNX embedding backend (fp32 or int8 export) reproduces the
+torch SentenceTransformer vectors closely enough to keep similarity penalties
+unchanged, and reports the encode throughput of each."""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+# Setup import path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, "ragpptxx"))
+sys.path.append(os.path.join(project_root, "benchmarks"))
+
+from embeddings import ChunkEmbedder, open_store
+from embeddings.onnx_backend import default_onnx_dir
+from embeddings.similarity import similarity_penalty
+
+# Largest acceptable |cosine(a, b) under ONNX - cosine(a, b) under torch| for any pair
+DEFAULT_TOLERANCE = 0.01
+
+def stored_texts(sample, seed=0):
+    """Up to `sample` chunk texts from the Chroma store."""
+    store = open_store()
+    ids = store.collection.get(include=[])["ids"]
+    if not ids:
+        return []
+    rng = np.random.default_rng(seed)
+    picked = [ids[i] for i in sorted(rng.choice(len(ids), min(sample, len(ids)), replace=False))]
+    return [d for d in store.collection.get(ids=picked, include=["documents"])["documents"] if d]
+
+def synthetic_texts(n, seed=0):
+    """Chunk texts of n synthetic decks, run through the real parsing pipeline."""
+    from pipeline import process_document
+    from synthetic import generate_decks
+
+    workdir = tempfile.mkdtemp(prefix="onnx_verify_")
+    try:
+        texts = []
+        for path in generate_decks(workdir, n, seed):
+            texts.extend(c["text"] for c in process_document(path, "synthetic", 1, verbose=False))
+        return texts
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _encode(embedder, texts, repeats):
+    embedder.model.encode(texts[:8], normalize_embeddings=True)  # load + warm up outside the timing
+    best, vectors = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        vectors = embedder.embed(texts)
+        best = min(best, time.perf_counter() - start)
+    return np.asarray(vectors, dtype=np.float32), best
+
+def _max_similarities(vectors):
+    sims = vectors @ vectors.T
+    np.fill_diagonal(sims, -1.0)
+    return sims, sims.max(axis=1)
+
+def compare(texts, onnx_files, onnx_path=None, batch_size=None, threads=None, repeats=3,
+            tolerance=DEFAULT_TOLERANCE):
+    """Encodes `texts` with torch and each ONNX file and compares the results."""
+    reference = ChunkEmbedder(backend="torch", batch_size=batch_size, threads=threads)
+    ref_vectors, ref_seconds = _encode(reference, texts, repeats)
+    ref_sims, ref_max = _max_similarities(ref_vectors)
+
+    report = {"texts": len(texts), "tolerance": tolerance, "backends": {
+        "torch": {"seconds": round(ref_seconds, 4), "texts_per_second": round(len(texts) / ref_seconds, 1)}
+    }}
+    for onnx_file in onnx_files:
+        embedder = ChunkEmbedder(backend="onnx", onnx_path=onnx_path, onnx_file=onnx_file,
+                                 batch_size=batch_size, threads=threads)
+        vectors, seconds = _encode(embedder, texts, repeats)
+        self_cosine = np.sum(vectors * ref_vectors, axis=1)
+        sims, max_sims = _max_similarities(vectors)
+        pair_delta = np.abs(sims - ref_sims)[~np.eye(len(texts), dtype=bool)] if len(texts) > 1 else np.zeros(1)
+        flips = int(sum(similarity_penalty(a) != similarity_penalty(b) for a, b in zip(max_sims, ref_max)))
+        report["backends"][f"onnx:{onnx_file or os.path.basename(embedder.model.model_path)}"] = {
+            "seconds": round(seconds, 4),
+            "texts_per_second": round(len(texts) / seconds, 1),
+            "speedup": round(ref_seconds / seconds, 2),
+            "min_cosine_to_torch": round(float(self_cosine.min()), 6),
+            "mean_cosine_to_torch": round(float(self_cosine.mean()), 6),
+            "max_pair_delta": round(float(pair_delta.max()), 6),
+            "max_similarity_delta": round(float(np.abs(max_sims - ref_max).max()), 6),
+            "penalty_changes": flips,
+            "within_tolerance": bool(pair_delta.max() <= tolerance and flips == 0),
+        }
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ONNX embedding backends against torch")
+    parser.add_argument("--onnx-path", default=default_onnx_dir(), help="ONNX model folder (Hub layout)")
+    parser.add_argument("--onnx-file", action="append",
+                        help="Model file(s) inside --onnx-path, e.g. onnx/model.onnx onnx/model_qint8_avx2.onnx")
+    parser.add_argument("--sample", type=int, default=500, help="Stored chunks to compare")
+    parser.add_argument("--synthetic", type=int, help="Use chunks of N synthetic decks instead of the store")
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--threads", type=int)
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per backend (best is kept)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Max pairwise cosine delta")
+    parser.add_argument("--output", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.synthetic) if args.synthetic else stored_texts(args.sample)
+    if not texts:
+        parser.error("No stored chunks; ingest decks first or use --synthetic N")
+
+    report = compare(texts, args.onnx_file or [None], args.onnx_path, args.batch_size, args.threads,
+                     args.repeats, args.tolerance)
+    print(f"{report['texts']} texts, tolerance {report['tolerance']}")
+    print(json.dumps(report["backends"], indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if not all(b.get("within_tolerance", True) for b in report["backends"].values()):
+        sys.exit(1)
@@ -0,0 +1,46 @@
+import os
+import sys
+import pytest
+
+# Setup import path: project root plus the script folders the entry points add themselves
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+for path in (project_root, os.path.join(project_root, "ragpptxx"), os.path.join(project_root, "scripts"),
+             os.path.join(project_root, "benchmarks")):
+    if path not in sys.path:
+        sys.path.append(path)
+
+# Offline test runs: keep chromadb from trying to send telemetry
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+from stub_ollama import serve_stub
+
+@pytest.fixture
+def stub_ollama():
+    """Stub Ollama (scripts/stub_ollama.py) on a free port; its base URL is `server.url`."""
+    server = serve_stub()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def deck_store(tmp_path):
+    """A VectorStore holding three parsed synthetic decks (week 1), embedded offline.
+    Returns (store, ppt_ids)."""
+    from embeddings import VectorStore
+    from pipeline import process_document
+    from ingestion import store_decks
+    from synthetic import StubEmbedder, generate_decks
+
+    store = VectorStore(persist_path=str(tmp_path / "chroma"))
+    paths = generate_decks(str(tmp_path / "decks"), 3)
+    decks = [(path, process_document(path, "team", 1, verbose=False), None, None) for path in paths]
+    _, failures = store_decks(decks, store, StubEmbedder())
+    assert not failures
+    return store, [os.path.splitext(os.path.basename(p))[0] for p in paths]
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Retries of failed LLM calls happen immediately."""
+    monkeypatch.setattr("evaluation.evaluator.backoff_delay", lambda attempt: 0.0)
@@ -0,0 +1,26 @@
+import os
+import argparse
+
+from embeddings import ChunkEmbedder
+from embeddings.embedder import add_embedder_arguments, embedder_options
+
+def _options(*argv):
+    parser = argparse.ArgumentParser()
+    add_embedder_arguments(parser)
+    return embedder_options(parser.parse_args(argv))
+
+def test_flags_are_passed_explicitly(monkeypatch):
+    monkeypatch.delenv("PPT_EMBED_BACKEND", raising=False)
+    before = dict(os.environ)
+    embedder = ChunkEmbedder(**_options("--embed-backend", "onnx", "--onnx-path", "models/x",
+                                        "--onnx-file", "onnx/model_qint8_avx2.onnx", "--embed-threads", "2"))
+    assert (embedder.backend, embedder.onnx_path, embedder.onnx_file, embedder.threads) == \
+        ("onnx", "models/x", "onnx/model_qint8_avx2.onnx", 2)
+    assert dict(os.environ) == before  # nothing leaks to later embedders or child processes
+    assert ChunkEmbedder().backend == "torch"
+
+def test_unset_flags_fall_back_to_the_environment(monkeypatch):
+    monkeypatch.setenv("PPT_EMBED_BACKEND", "onnx")
+    monkeypatch.setenv("PPT_EMBED_THREADS", "3")
+    embedder = ChunkEmbedder(**_options("--onnx-file", "onnx/model.onnx"))
+    assert (embedder.backend, embedder.onnx_file, embedder.threads) == ("onnx", "onnx/model.onnx", 3)
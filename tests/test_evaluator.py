@@ -0,0 +1,86 @@
+import pytest
+import requests
+
+from evaluation import CircuitBreaker, IdeaEvaluator, LLMUnavailableError
+
+CRITERIA = ("problem_clarity", "solution_quality", "technical_feasibility", "team_capability")
+
+@pytest.mark.parametrize("stream, combined", [(False, False), (True, False), (True, True)],
+                         ids=["non-streaming", "streaming", "combined"])
+def test_evaluate_against_stub(stub_ollama, deck_store, stream, combined):
+    store, ppt_ids = deck_store
+    evaluator = IdeaEvaluator(ollama_url=stub_ollama.url, store=store, stream=stream, combined=combined)
+
+    result = evaluator.evaluate(ppt_ids[0])
+
+    assert result["ppt_id"] == ppt_ids[0]
+    assert result["week"] == 1
+    # the stub answers 6 for every criterion and +1 for uniqueness
+    assert all(result["scores"][key] == 6 for key in CRITERIA)
+    # the combined prompt is answered per criterion in one object
+    verdict = (lambda key: f"Stub {key} verdict.") if combined else (lambda key: "Stub criterion verdict.")
+    assert {key: result["explanation"][key] for key in CRITERIA} == {key: verdict(key) for key in CRITERIA}
+    assert result["explanation"]["uniqueness"] == "Stub uniqueness verdict."
+    expected = result["scores"]["uniqueness"] * 4.0 + 6 * (2.0 + 1.5 + 1.5 + 1.0)
+    assert result["total_score"] == pytest.approx(round(expected, 1))
+
+def test_evaluate_missing_deck_raises(stub_ollama, deck_store):
+    store, _ = deck_store
+    evaluator = IdeaEvaluator(ollama_url=stub_ollama.url, store=store)
+    with pytest.raises(ValueError, match="Missing sections"):
+        evaluator.evaluate("no_such_deck")
+
+def _failing(server, status):
+    """Answers every generate request with `status`; returns the list of requests seen."""
+    calls = []
+    server.fail_with = lambda payload: calls.append(payload) or status
+    return calls
+
+@pytest.mark.parametrize("stream", [False, True], ids=["non-streaming", "streaming"])
+def test_5xx_is_an_outage(stub_ollama, no_backoff, stream):
+    calls = _failing(stub_ollama, 500)
+    # _call_ollama never touches the store
+    evaluator = IdeaEvaluator(ollama_url=stub_ollama.url, store=object(), stream=stream, strict=True)
+
+    with pytest.raises(LLMUnavailableError):
+        evaluator._call_ollama("prompt", retries=3)
+    assert len(calls) == 3  # retried
+    assert evaluator.breaker.failures == 3
+
+    with pytest.raises(LLMUnavailableError):
+        evaluator._call_ollama("prompt", retries=3)
+    assert evaluator.breaker.state == CircuitBreaker.OPEN
+    # an open circuit fails fast without calling Ollama
+    with pytest.raises(LLMUnavailableError):
+        evaluator._call_ollama("prompt", retries=3)
+    assert len(calls) == 5
+
+    lenient = IdeaEvaluator(ollama_url=stub_ollama.url, store=object(), stream=stream)
+    assert lenient._call_ollama("prompt", retries=2) is None
+
+@pytest.mark.parametrize("stream", [False, True], ids=["non-streaming", "streaming"])
+def test_4xx_fails_the_call_not_the_service(stub_ollama, no_backoff, stream):
+    calls = _failing(stub_ollama, 400)
+    evaluator = IdeaEvaluator(ollama_url=stub_ollama.url, store=object(), stream=stream, strict=True)
+
+    with pytest.raises(requests.HTTPError) as info:
+        evaluator._call_ollama("prompt", retries=3)
+    assert info.value.response.status_code == 400
+    assert len(calls) == 1  # retrying would not help
+    assert evaluator.breaker.state == CircuitBreaker.CLOSED
+    assert evaluator.breaker.failures == 0
+
+    lenient = IdeaEvaluator(ollama_url=stub_ollama.url, store=object(), stream=stream)
+    assert lenient._call_ollama("prompt", retries=3) is None
+    assert len(calls) == 2
+
+def test_ping_requires_the_configured_model(stub_ollama):
+    assert IdeaEvaluator(model="tinyllama", ollama_url=stub_ollama.url, store=object()).ping()
+    assert not IdeaEvaluator(model="llama3", ollama_url=stub_ollama.url, store=object()).ping()
+    stub_ollama.down = True
+    assert not IdeaEvaluator(ollama_url=stub_ollama.url, store=object()).ping()
+
+def test_shared_embedder_is_used():
+    from synthetic import StubEmbedder
+    embedder = StubEmbedder()
+    assert IdeaEvaluator(store=object(), embedder=embedder).embedder is embedder
@@ -0,0 +1,56 @@
+import os
+import sys
+import json
+import numpy as np
+import pytest
+
+# Setup import path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from embeddings.exact_index import ExactIndex
+
+DIM = 8
+
+def _vector(seed):
+    v = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+def _add(index, ppt_id, seed):
+    index.add([f"{ppt_id}_idea_problem_1"], [_vector(seed)], [{"ppt_id": ppt_id, "week": 1}])
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_orphan_vectors_are_cut_off(tmp_path, dtype):
+    # crash between the two appends: vectors (and scales) written, meta.jsonl not
+    index = ExactIndex(str(tmp_path), dtype=dtype)
+    _add(index, "a", 0)
+    orphan, scale = index._quantize(_vector(99)[None, :])
+    with open(index._vectors_file, "ab") as f:
+        f.write(orphan.tobytes())
+    if scale is not None:
+        with open(index._file(ExactIndex.SCALES_FILE), "ab") as f:
+            f.write(scale.tobytes())
+
+    index = ExactIndex(str(tmp_path))
+    assert len(index) == 1
+    _add(index, "b", 1)
+
+    index = ExactIndex(str(tmp_path))
+    rows, sims = index.query(_vector(1), k=1)
+    assert index.ids[rows[0]] == "b_idea_problem_1"
+    assert sims[0] == pytest.approx(1.0, abs=0.02)
+
+def test_torn_meta_line_is_cut_off(tmp_path):
+    index = ExactIndex(str(tmp_path))
+    _add(index, "a", 0)
+    with open(index._file(ExactIndex.META_FILE), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"row": 1, "id": "x_idea_problem_1", "metadata": {}})[:20])
+
+    index = ExactIndex(str(tmp_path))
+    assert len(index) == 1
+    _add(index, "b", 1)
+    assert len(index) == 2
+
+    index = ExactIndex(str(tmp_path))
+    assert index.ids == ["a_idea_problem_1", "b_idea_problem_1"]
@@ -0,0 +1,245 @@
+import os
+import csv
+import signal
+import threading
+import multiprocessing
+import fitz
+import pytest
+
+import pipeline_runner
+from pipeline_runner import (PipelineRun, RunState, _Channel, _WeekGate, evaluate_stage, ingest_batch,
+                             retry_dead_letters, run_pipeline, score_stage)
+import evaluation.evaluator as evaluator_module
+from embeddings import VectorStore
+from evaluation import DeadLetterQueue, LLMUnavailableError
+from stub_ollama import serve_stub
+from synthetic import SECTION_HEADERS, StubEmbedder, generate_decks
+
+def _offline(setattr, tmp_path):
+    # stub embedder and a temporary store; `setattr` is monkeypatch.setattr or the builtin
+    setattr(pipeline_runner, "ChunkEmbedder", lambda cache=None, **options: StubEmbedder())
+    setattr(evaluator_module, "open_store", lambda: VectorStore(persist_path=str(tmp_path / "chroma")))
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    """run_pipeline kwargs for an offline run in tmp_path (stub embedder, temporary store)."""
+    _offline(monkeypatch.setattr, tmp_path)
+    return dict(parse_workers=2, eval_workers=2, state_path=str(tmp_path / "state.sqlite"), embed_cache=None,
+                llm_cache=None, manifest_path=str(tmp_path / "manifest.sqlite"),
+                exact_index=str(tmp_path / "exact_index"), rank=False, dead_letters=str(tmp_path / "dl.sqlite"),
+                scores_path=str(tmp_path / "scores.csv"), recovery_wait=0)
+
+def _jobs(tmp_path, n, weeks=1):
+    return [(path, "team", 1 + i % weeks) for i, path in enumerate(generate_decks(str(tmp_path / "decks"), n))]
+
+def _scored_ids(env):
+    with open(env["scores_path"], newline="", encoding="utf-8") as f:
+        return [row["id"] for row in csv.DictReader(f)]
+
+def _url(server):
+    return f"http://127.0.0.1:{server.server_port}"
+
+def test_run_scores_every_deck(tmp_path, env):
+    jobs = _jobs(tmp_path, 6, weeks=2)
+    server = serve_stub()
+    try:
+        summary = run_pipeline(jobs, ollama_url=_url(server), **env)
+        assert summary["scored"] == 6 and summary["failures"] == {} and summary["dead_lettered"] == []
+        assert sorted(_scored_ids(env)) == sorted(os.path.basename(p)[:-4] for p, _, _ in jobs)
+
+        again = run_pipeline(jobs, ollama_url=_url(server), **env)
+    finally:
+        server.shutdown()
+    assert again["skipped"] == 6
+    assert again["ingested"] == again["evaluated"] == again["scored"] == 0
+
+def _crashing_run(jobs, env, tmp_path, crash_at):
+    # child process: when the `crash_at`-th evaluation starts, it and its parser
+    # processes are killed without any cleanup
+    os.setpgrp()
+    _offline(setattr, tmp_path)
+    server = serve_stub()
+    evaluate, started = pipeline_runner.IdeaEvaluator.evaluate, []
+
+    def crashing(self, ppt_id):
+        started.append(ppt_id)
+        if len(started) >= crash_at:
+            os.killpg(os.getpgrp(), signal.SIGKILL)
+        return evaluate(self, ppt_id)
+
+    pipeline_runner.IdeaEvaluator.evaluate = crashing
+    run_pipeline(jobs, ollama_url=_url(server), **env)
+    os._exit(0)
+
+def test_crash_resumes_without_redoing_or_losing_decks(tmp_path, env):
+    jobs = _jobs(tmp_path, 8)
+    # spawn, not fork: earlier tests leave threads (chromadb, stub servers) a forked child could deadlock on
+    child = multiprocessing.get_context("spawn").Process(target=_crashing_run, args=(jobs, env, tmp_path, 5))
+    child.start()
+    child.join(120)
+    assert child.exitcode == -signal.SIGKILL
+
+    state = RunState(env["state_path"])
+    before = state.completed()
+    state.close()
+    done = {name: sum(name in stages for stages in before.values()) for name in ("ingested", "evaluated", "scored")}
+    assert done["ingested"] == 8 and 0 < done["evaluated"] < 8
+
+    server = serve_stub()
+    try:
+        summary = run_pipeline(jobs, ollama_url=_url(server), **env)
+    finally:
+        server.shutdown()
+    # every stage runs exactly for the decks that had not finished it
+    assert summary["skipped"] == done["scored"]
+    assert summary["ingested"] == 0
+    assert summary["evaluated"] == 8 - done["evaluated"]
+    assert summary["scored"] == 8 - done["scored"]
+    ids = _scored_ids(env)
+    assert sorted(set(ids)) == sorted(os.path.basename(p)[:-4] for p, _, _ in jobs)
+    # a crash between the CSV write and the state update may repeat one row (ranking dedups ids)
+    assert len(ids) - len(set(ids)) <= 1
+
+def _marked_deck(path, marker):
+    """A deck whose team section (and only that) contains `marker`."""
+    doc = fitz.open()
+    for section, headers in SECTION_HEADERS.items():
+        text = f"{headers[0]}\nWater quality: sensors alert farmers when the wells are unsafe to drink."
+        if section == "team_capability":
+            text += f" {marker} has shipped two pilots."
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(54, 54, page.rect.width - 54, page.rect.height - 54), text, fontsize=11)
+    doc.save(path)
+    doc.close()
+    return path
+
+def test_failing_deck_lands_in_the_dead_letter_queue(tmp_path, env, no_backoff):
+    jobs = _jobs(tmp_path, 4) + [(_marked_deck(str(tmp_path / "marked.pdf"), "Zebracorn"), "team", 1)]
+    server = serve_stub()
+    server.fail_with = lambda payload: 503 if "Zebracorn" in payload["prompt"] else None
+    env.update(eval_workers=1, llm_concurrency=1)
+    try:
+        summary = run_pipeline(jobs, ollama_url=_url(server), **env)
+        assert summary["dead_lettered"] == ["marked"]
+        assert summary["scored"] == 4 and summary["failures"] == {}
+        dlq = DeadLetterQueue(env["dead_letters"])
+        assert [(d["ppt_id"], d["week"]) for d in dlq.pending()] == [("marked", 1)]
+        assert "marked" not in _scored_ids(env)
+
+        # Ollama is fine again: the next run evaluates only the dead-lettered deck
+        server.fail_with = None
+        summary = run_pipeline(jobs, ollama_url=_url(server), **env)
+    finally:
+        server.shutdown()
+    assert summary["skipped"] == 4 and summary["evaluated"] == summary["scored"] == 1
+    assert summary["dead_lettered"] == []
+    assert dlq.pending() == []
+    dlq.close()
+
+def test_queues_stay_bounded(tmp_path, env, monkeypatch):
+    channels = []
+
+    class RecordingChannel(_Channel):
+        def __init__(self, maxsize, producers, consumers):
+            super().__init__(maxsize, producers, consumers)
+            self.maxsize, self.high_water = maxsize, 0
+            channels.append(self)
+
+        def put(self, item):
+            super().put(item)
+            self.high_water = max(self.high_water, self._queue.qsize())
+
+    monkeypatch.setattr(pipeline_runner, "_Channel", RecordingChannel)
+    server = serve_stub(delay=0.02)  # evaluation is the slow stage
+    try:
+        summary = run_pipeline(_jobs(tmp_path, 10), ollama_url=_url(server), queue_size=2, **env)
+    finally:
+        server.shutdown()
+    assert summary["scored"] == 10
+    assert len(channels) == 4
+    assert all(ch.high_water <= ch.maxsize == 2 for ch in channels)
+    assert max(ch.high_water for ch in channels) == 2  # backpressure engaged
+
+def _drain(channel):
+    channel.producer_done()
+    return list(channel)
+
+def test_week_gate_holds_decks_until_their_week_is_ingested():
+    channel = _Channel(10, producers=1, consumers=1)
+    gate = _WeekGate(channel, {1: 2})
+    gate.put(("a", 1))
+    gate.put(("x", 2))  # nothing left to ingest for week 2
+    gate.ingested(1)
+    gate.put(("b", 1))
+    assert channel._queue.qsize() == 1
+    gate.ingested(1)
+    assert _drain(channel) == [("x", 2), ("a", 1), ("b", 1)]
+
+def test_week_gate_release_all():
+    channel = _Channel(10, producers=1, consumers=1)
+    gate = _WeekGate(channel, {1: 5})
+    gate.put(("a", 1))
+    gate.release_all()
+    gate.put(("b", 1))
+    assert _drain(channel) == [("a", 1), ("b", 1)]
+
+def test_ingest_batch_failure_is_charged_to_its_decks(tmp_path, monkeypatch):
+    run = PipelineRun(RunState(str(tmp_path / "state.sqlite")), expected={1: 2})
+    chunks = lambda ppt_id: [{"ppt_id": ppt_id, "week": 1}]
+    monkeypatch.setattr(pipeline_runner, "store_decks", lambda decks, *args: (1, {"b.pdf": "RuntimeError: boom"}))
+
+    ingest_batch(run, [("a.pdf", chunks("a")), ("b.pdf", chunks("b"))])
+
+    assert run.failures == {"b": "ingest: RuntimeError: boom"}
+    assert run.counts["ingested"] == 1
+    assert set(run.state.completed()) == {("a", 1)}
+    run.eval_ch.producer_done()
+    assert _drain(run.eval_ch) == [("a", 1)]  # week complete: a stored, b failed
+
+def test_scorer_error_drains_the_queue(tmp_path):
+    run = PipelineRun(RunState(str(tmp_path / "state.sqlite")), queue_size=1)
+    scores_path = tmp_path / "missing" / "scores.csv"  # cannot be opened
+    scorer = threading.Thread(target=score_stage, args=(run, scores_path))
+    scorer.start()
+    for key in [("a", 1), ("b", 1), ("c", 1)]:
+        run.score_ch.put((key, {"total_score": 50}))  # would block on a dead consumer
+    run.score_ch.producer_done()
+    run.score_ch.producer_done()
+    scorer.join(5)
+    assert not scorer.is_alive()
+    assert set(run.failures) == {"a", "b", "c"}
+    assert run.state.completed() == {}
+
+class _DownEvaluator:
+    """Answers health checks but every evaluation fails as an outage."""
+    store = None
+
+    def __init__(self):
+        self.calls = 0
+
+    def wait_for_recovery(self, max_wait):
+        return True
+
+    def evaluate(self, ppt_id):
+        self.calls += 1
+        raise LLMUnavailableError("HTTPError: 503")
+
+def test_dead_letter_retries_stop_at_the_deadline(tmp_path):
+    evaluator = _DownEvaluator()
+    run = PipelineRun(RunState(str(tmp_path / "state.sqlite")), evaluator)
+    run.parked.append(("a", 1))
+    retry_dead_letters(run, recovery_wait=0)
+    assert run.parked == [("a", 1)]
+    assert evaluator.calls == 1
+
+def test_last_evaluator_retries_dead_letters(tmp_path):
+    evaluator = _DownEvaluator()
+    run = PipelineRun(RunState(str(tmp_path / "state.sqlite")), evaluator)
+    run.eval_ch.put(("a", 1))
+    run.eval_ch.producer_done()
+    run.eval_ch.producer_done()
+    evaluate_stage(run, recovery_wait=0)
+    assert evaluator.calls == 2  # first attempt + one retry round
+    assert run.parked == [("a", 1)]
+    run.score_ch.producer_done()
+    assert _drain(run.score_ch) == []
@@ -0,0 +1,91 @@
+import random
+import pandas as pd
+import pytest
+
+import ranking
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    """ranking.py reading and writing in tmp_path, with a top 20."""
+    for name, path in (("INPUT_FILE", "scores.csv"), ("OUTPUT_FILE", "ranked_results.csv"),
+                       ("STATE_FILE", "ranking_state.json")):
+        monkeypatch.setattr(ranking, name, tmp_path / path)
+    monkeypatch.setattr(ranking, "TOP_N", 20)
+    return tmp_path
+
+def _rows(n, seed, start=0, ids=None):
+    # coarse scores so there are many ties, also at the top-N cutoff; a repeated id
+    # never beats its first score, so "first row per id" and "best row per id" agree
+    rng = random.Random(seed)
+    ids = ids or [f"deck{i}" for i in range(start, start + n)]
+    return [(deck_id, rng.choice([40.0, 55.5, 60.0, 72.0, 80.0])) for deck_id in ids]
+
+def _write(path, rows, mode="w"):
+    with open(path, mode, encoding="utf-8") as f:
+        if mode == "w":
+            f.write("id,score\n")
+        f.writelines(f"{deck_id},{score}\n" for deck_id, score in rows)
+
+def _reference(files, rows):
+    """ranking.rank_results (the pandas version) over `rows`, in a separate folder."""
+    ref = files / "reference"
+    ref.mkdir(exist_ok=True)
+    _write(ref / "scores.csv", rows)
+    out = ref / "ranked_results.csv"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(ranking, "INPUT_FILE", ref / "scores.csv")
+        mp.setattr(ranking, "OUTPUT_FILE", out)
+        ranking.rank_results()
+    return pd.read_csv(out)
+
+def _ranked(files):
+    return pd.read_csv(files / "ranked_results.csv")
+
+@pytest.mark.parametrize("chunksize", [1, 7, 1000])
+def test_full_run_matches_pandas(files, chunksize):
+    rows = _rows(120, seed=1)
+    rows += [(deck_id, min(score, 40.0)) for deck_id, score in _rows(30, seed=2, ids=[r[0] for r in rows[:30]])]
+    _write(files / "scores.csv", rows)
+
+    ranking.rank_results_streaming(chunksize=chunksize, incremental=False)
+
+    pd.testing.assert_frame_equal(_ranked(files), _reference(files, rows))
+
+@pytest.mark.parametrize("chunksize", [3, 1000])
+def test_append_then_resume_matches_pandas(files, chunksize):
+    first = _rows(60, seed=3)
+    _write(files / "scores.csv", first)
+    ranking.rank_results_streaming(chunksize=chunksize)
+
+    appended = _rows(60, seed=4, start=60) + [(first[0][0], 40.0)]  # a worse re-score is ignored
+    _write(files / "scores.csv", appended, mode="a")
+    with open(files / "scores.csv", "a", encoding="utf-8") as f:
+        f.write("deck999,99")  # still being written: left for the next run
+    ranking.rank_results_streaming(chunksize=chunksize)
+
+    pd.testing.assert_frame_equal(_ranked(files), _reference(files, first + appended))
+
+def test_rewritten_prefix_forces_a_full_rebuild(files, caplog):
+    _write(files / "scores.csv", _rows(40, seed=5))
+    ranking.rank_results_streaming()
+
+    # same header, longer file, but different rows before the saved offset
+    rewritten = _rows(50, seed=6, start=500)
+    _write(files / "scores.csv", rewritten)
+    with caplog.at_level("INFO"):
+        ranking.rank_results_streaming()
+
+    assert "re-reading it from the start" in caplog.text
+    pd.testing.assert_frame_equal(_ranked(files), _reference(files, rewritten))
+    assert not _ranked(files)["id"].isin([f"deck{i}" for i in range(40)]).any()
+
+def test_ties_at_the_cutoff_go_to_the_first_row():
+    top = ranking.TopN(2)
+    for deck_id, score in [("a", 5.0), ("b", 7.0), ("c", 5.0), ("d", 7.0), ("b", 7.0)]:
+        top.push(deck_id, score, deck_id)
+    assert top.rows() == ["b", "d"]
+
+    top = ranking.TopN(3)
+    for deck_id, score in [("a", 5.0), ("b", 7.0), ("c", 5.0), ("d", 5.0), ("c", 9.0)]:
+        top.push(deck_id, score, deck_id)
+    assert top.rows() == ["c", "b", "a"]  # d ties with a but came later
@@ -0,0 +1,120 @@
+import time
+import pytest
+
+from evaluation.resilience import AdaptiveTimeout, CircuitBreaker, DeadLetterQueue, LLMUnavailableError
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.failure()
+
+def test_breaker_opens_after_threshold_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.before_call()
+    breaker.success()  # a success in between resets the count
+    for _ in range(2):
+        breaker.failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() > 0
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+
+def test_breaker_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    _open(breaker)
+    time.sleep(0.06)
+    assert breaker.retry_after() == 0
+
+    breaker.before_call()  # the probe
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()  # everyone else still fails fast
+
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+def test_breaker_failed_probe_reopens_for_longer():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05, max_reset_seconds=0.15)
+    _open(breaker)
+    for expected in (0.1, 0.15, 0.15):
+        time.sleep(breaker.retry_after() + 0.01)
+        breaker.before_call()
+        breaker.failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.reset_seconds == pytest.approx(expected)
+
+    time.sleep(breaker.retry_after() + 0.01)
+    breaker.before_call()
+    breaker.success()
+    assert breaker.reset_seconds == 0.05
+
+def test_wait_for_recovery():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    _open(breaker)
+    probes = []
+    # the probe is not due within max_wait: gives up without probing
+    assert not breaker.wait_for_recovery(lambda: probes.append(1) or True, max_wait=0)
+    assert probes == []
+
+    assert breaker.wait_for_recovery(lambda: probes.append(1) or True, max_wait=1)
+    assert probes == [1]
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    _open(breaker)
+    assert not breaker.wait_for_recovery(lambda: False, max_wait=0.08)
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_adaptive_timeout_uses_ceiling_until_min_samples():
+    timeouts = AdaptiveTimeout(ceiling=90, floor=10, multiplier=3, min_samples=5)
+    for _ in range(4):
+        timeouts.observe("a", 1.0)
+    assert timeouts.current("a") == 90
+    timeouts.observe("a", 1.0)
+    assert timeouts.current("a") == 10  # 3 x 1s, raised to the floor
+    assert timeouts.current("b") == 90  # per label
+
+def test_adaptive_timeout_p95_of_window():
+    timeouts = AdaptiveTimeout(ceiling=90, floor=1, multiplier=3, window=20, min_samples=5)
+    for _ in range(19):
+        timeouts.observe("a", 2.0)
+    timeouts.observe("a", 8.0)
+    assert timeouts.current("a") == pytest.approx(24.0)  # p95 of 20 samples is the slowest
+
+    for _ in range(20):
+        timeouts.observe("a", 4.0)  # the window forgets the 8s call
+    assert timeouts.current("a") == pytest.approx(12.0)
+
+    timeouts.observe("b", 1.0)
+    for _ in range(5):
+        timeouts.observe("b", 60.0)
+    assert timeouts.current("b") == 90  # clamped to the ceiling
+
+def test_dead_letter_queue_round_trip(tmp_path):
+    path = str(tmp_path / "dl.sqlite")
+    dlq = DeadLetterQueue(path)
+    dlq.add("a", 1, "ConnectionError: down")
+    dlq.add("b", 2, "ConnectionError: down")
+    dlq.add("a", 1, "HTTPError: 503")
+    dlq.close()
+
+    dlq = DeadLetterQueue(path)  # survives a restart
+    pending = dlq.pending()
+    assert [(d["ppt_id"], d["week"]) for d in pending] == [("a", 1), ("b", 2)]
+    assert pending[0]["attempts"] == 2
+    assert pending[0]["error"] == "HTTPError: 503"
+    assert pending[0]["first_failed"] <= pending[0]["last_failed"]
+    assert [d["ppt_id"] for d in dlq.pending(week=2)] == ["b"]
+
+    dlq.remove("a", 1)
+    dlq.remove("a", 1)  # removing twice is harmless
+    assert [d["ppt_id"] for d in dlq.pending()] == ["b"]
+    dlq.close()
@@ -0,0 +1,52 @@
+import sqlite3
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+import results_writer
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    """results_writer.py reading and writing in tmp_path."""
+    for name, path in (("INPUT_FILE", "ranked_results.csv"), ("STORE_FILE", "final_results.sqlite"),
+                       ("OUTPUT_FILE", "final_results.xlsx")):
+        monkeypatch.setattr(results_writer, name, tmp_path / path)
+    return tmp_path
+
+def _stored(files):
+    with sqlite3.connect(files / "final_results.sqlite") as conn:
+        return conn.execute("SELECT id, score, inserted_at FROM results ORDER BY rowid").fetchall()
+
+def test_legacy_import_rewrite_and_export(files, caplog):
+    # a final_results.xlsx written by the old pandas version
+    wb = Workbook()
+    wb.active.append(["id", "score", "team"])
+    wb.active.append(["deck1", 80.0, "Team A"])
+    wb.active.append(["deck2", 72.5, "Team B"])
+    wb.save(files / "final_results.xlsx")
+    pd.DataFrame({"id": ["deck2", "deck3"], "score": [99.0, 60.0]}).to_csv(files / "ranked_results.csv", index=False)
+
+    with caplog.at_level("INFO"):
+        results_writer.write_results()
+    assert "Imported 2 rows from existing final_results.xlsx" in caplog.text
+    assert "Skipped 1 rows whose id is already in the results store" in caplog.text
+    first = _stored(files)
+    # the stored row wins: deck2 keeps its legacy score
+    assert [(deck_id, score) for deck_id, score, _ in first] == [("deck1", 80.0), ("deck2", 72.5), ("deck3", 60.0)]
+
+    caplog.clear()
+    with caplog.at_level("INFO"):
+        results_writer.write_results()  # same ranked_results.csv again: nothing changes
+    assert "Skipped 2 rows" in caplog.text and "Appended 0 records, total records: 3" in caplog.text
+    assert _stored(files) == first
+
+    results_writer.export_excel()
+    exported = pd.read_excel(files / "final_results.xlsx")
+    assert exported.columns.tolist() == ["id", "score", "team"]
+    assert exported["id"].tolist() == ["deck1", "deck2", "deck3"]
+    assert exported["score"].tolist() == [80.0, 72.5, 60.0]
+    assert exported["team"].tolist()[:2] == ["Team A", "Team B"] and pd.isna(exported["team"][2])
+
+    # the exported workbook is not re-imported into a store that already has rows
+    results_writer.write_results()
+    assert _stored(files) == first
@@ -0,0 +1,61 @@
+import numpy as np
+
+from embeddings import ShardedVectorStore
+from embeddings.sharded_store import COMPACT_SUFFIX
+
+def _chunks(week, n):
+    return [{"ppt_id": f"deck{i}", "section": "problem", "week": week, "text": f"deck {i} problem"}
+            for i in range(n)]
+
+def _embeddings(n):
+    vectors = np.random.default_rng(0).random((n, 8), dtype=np.float32)
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).tolist()
+
+def _store(tmp_path, weeks=(1,), n=4):
+    store = ShardedVectorStore(str(tmp_path / "chroma"))
+    for week in weeks:
+        store.add_chunks(_chunks(week, n), _embeddings(n))
+    return store
+
+def _names(store):
+    return sorted(col.name for col in store.client.list_collections())
+
+def test_compact_week_keeps_live_rows(tmp_path):
+    store = _store(tmp_path, weeks=(1, 2))
+    store.delete_ppt("deck0", week=1)
+    assert store.compact_week(1) == 3
+    assert _names(store) == ["ppt_chunks_w1_problem", "ppt_chunks_w2_problem"]
+    assert sorted(store.collection.get(where={"week": 1})["ids"]) == [f"deck{i}_problem_1" for i in (1, 2, 3)]
+    assert store.collection.count() == 7
+
+def test_crash_after_dropping_the_shard_is_recovered_on_open(tmp_path):
+    store = _store(tmp_path)
+    shard = store.shard(1, "problem")
+    # compact_week died between dropping the shard and renaming the copy
+    copy = store.client.get_or_create_collection(name=shard.name + COMPACT_SUFFIX, metadata={"hnsw:space": "cosine"})
+    store._copy(shard, copy)
+    store.client.delete_collection(shard.name)
+    assert store.shards(refresh=True) == {}
+
+    reopened = ShardedVectorStore(str(tmp_path / "chroma"))
+    assert _names(reopened) == ["ppt_chunks_w1_problem"]
+    assert reopened.collection.count() == 4
+
+def test_crash_during_the_copy_is_rolled_back_on_open(tmp_path):
+    store = _store(tmp_path)
+    shard = store.shard(1, "problem")
+    # compact_week died while copying: the shard is intact, the copy partial
+    copy = store.client.get_or_create_collection(name=shard.name + COMPACT_SUFFIX, metadata={"hnsw:space": "cosine"})
+    page = shard.get(include=["embeddings", "documents", "metadatas"], limit=1)
+    copy.upsert(ids=page["ids"], embeddings=page["embeddings"], documents=page["documents"],
+                metadatas=page["metadatas"])
+
+    reopened = ShardedVectorStore(str(tmp_path / "chroma"))
+    assert _names(reopened) == ["ppt_chunks_w1_problem"]
+    assert reopened.collection.count() == 4
+    assert reopened.compact_week(1) == 4
+
+def test_sharded_store_initialises_as_a_vector_store(tmp_path):
+    store = ShardedVectorStore(str(tmp_path / "chroma"))
+    assert store.persist_path == str(tmp_path / "chroma")
+    assert _names(store) == []  # no unsharded collection is created
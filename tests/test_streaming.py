@@ -0,0 +1,89 @@
+import json
+import pytest
+
+from evaluation import IdeaEvaluator
+from evaluation.streaming import CRITERION_KEYS, JsonObjectScanner
+
+CRITERION = {"score": 7, "reason": "Clear problem."}
+COMBINED = {"problem_clarity": {"score": 6, "reason": "Scoped to \"rural\" wells."},
+            "solution_quality": {"score": 5, "reason": "Uses {sensor} data; see }{ notes."}}
+
+# text streamed by the model -> objects the scanner must report, in order
+CASES = {
+    "plain": ('{"score": 7, "reason": "Clear problem."}', [CRITERION]),
+    "escaped quotes": (r'{"score": 4, "reason": "Says \"AI\" \\ twice \""}',
+                       [{"score": 4, "reason": 'Says "AI" \\ twice "'}]),
+    "braces in strings": ('{"score": 3, "reason": "} not { the end }}"}',
+                          [{"score": 3, "reason": "} not { the end }}"}]),
+    "nested": (json.dumps(COMBINED), [COMBINED]),
+    "prose around": ('Sure! Here it is:\n```json\n{"score": 7, "reason": "Clear problem."}\n```\nHope this {helps',
+                     [CRITERION]),
+    "two objects": ('{"note": "draft"} then {"score": 7, "reason": "Clear problem."}', [{"note": "draft"}, CRITERION]),
+    "unparseable skipped": ('{score: 1} {"score": 7, "reason": "Clear problem."}', [CRITERION]),
+}
+
+def _splits(text):
+    """Every way of cutting `text` into two fragments, plus one character per fragment."""
+    yield from ([text[:i], text[i:]] for i in range(len(text) + 1))
+    yield list(text)
+
+def _scan(fragments):
+    scanner, found = JsonObjectScanner(), []
+    for fragment in fragments:
+        found.extend(scanner.feed(fragment))
+    return found
+
+@pytest.mark.parametrize("text, expected", CASES.values(), ids=CASES.keys())
+def test_scanner_is_independent_of_chunk_boundaries(text, expected):
+    for fragments in _splits(text):
+        assert _scan(fragments) == expected, fragments
+
+def test_scanner_reports_an_object_when_its_closing_brace_arrives():
+    scanner = JsonObjectScanner()
+    assert scanner.feed('{"score": 7, "reason": "a}') == []
+    assert scanner.feed('"') == []
+    assert scanner.feed("}") == [{"score": 7, "reason": "a}"}]
+    assert scanner.feed(" trailing {") == []
+
+class _Stream:
+    """Stands in for requests' streamed response: one NDJSON line per fragment."""
+
+    def __init__(self, fragments):
+        self.lines = [json.dumps({"response": f, "done": False}).encode() for f in fragments]
+        self.lines.append(json.dumps({"response": "", "done": True}).encode())
+        self.read = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        for line in self.lines:
+            self.read += 1
+            yield line
+
+STREAMED = {
+    # expect=CRITERION_KEYS: an object without score/reason is not the answer
+    "criterion": (CRITERION_KEYS, '{"note": "x}"} {"score": 7, "reason": "Clear problem."} {"score": 0}', CRITERION),
+    # expect=(): the first complete top-level object is the answer, nested ones included
+    "combined": ((), json.dumps(COMBINED) + ' {"score": 0}', COMBINED),
+}
+
+@pytest.mark.parametrize("expect, text, answer", STREAMED.values(), ids=STREAMED.keys())
+def test_stream_stops_at_the_expected_object(expect, text, answer):
+    evaluator = IdeaEvaluator(store=object())
+    end = text.index(json.dumps(answer)) + len(json.dumps(answer))
+    for fragments in _splits(text):
+        stream = _Stream(fragments)
+        evaluator.session.post = lambda *args, **kwargs: stream
+        m = {}
+        result, final = evaluator._stream({}, expect, m)
+        assert result == answer, fragments
+        # early stop: nothing after the fragment that closed the answer is read
+        assert stream.read == next(i for i in range(len(fragments) + 1) if len("".join(fragments[:i])) >= end)
+        assert m["early_stops"] == 1 and final == {}